@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""Measure how the lab targets hold up under the Slowloris workload.
+
+For each target service from Machines/docker-compose-simulation.yml the
+harness starts the target, probes it with ordinary GET requests, runs
+slowloris.py from a throwaway container on elk_net, and keeps probing after
+the attack until the target answers normally again.
+
+    python bench_resilience.py target-nginx target-httpd --json report.json --csv report.csv
+"""
+import argparse
+import csv
+import json
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+DOS_DIR = Path(__file__).resolve().parent
+BASE_DIR = DOS_DIR.parents[1]
+COMPOSE_FILE = BASE_DIR / "Machines" / "docker-compose-simulation.yml"
+LAB_NETWORK = "elk_net"
+TARGETS = ["target-nginx", "target-httpd"]
+
+CSV_FIELDS = [
+    "target",
+    "connections",
+    "baseline_p50_ms",
+    "time_to_exhaustion_s",
+    "held_connections_peak",
+    "held_connections_end",
+    "probe_p50_ms",
+    "probe_p99_ms",
+    "probe_failures",
+    "probes",
+    "recovery_time_s",
+]
+
+
+def compose(*args):
+    subprocess.run(
+        ["docker-compose", "-f", str(COMPOSE_FILE), *args],
+        cwd=COMPOSE_FILE.parent,
+        check=True,
+    )
+
+
+def lab_subnet():
+    return subprocess.check_output(
+        [
+            "docker",
+            "network",
+            "inspect",
+            "-f",
+            "{{(index .IPAM.Config 0).Subnet}}",
+            LAB_NETWORK,
+        ],
+        text=True,
+    ).strip()
+
+
+def container_ip(name):
+    return subprocess.check_output(
+        [
+            "docker",
+            "inspect",
+            "-f",
+            f'{{{{(index .NetworkSettings.Networks "{LAB_NETWORK}").IPAddress}}}}',
+            name,
+        ],
+        text=True,
+    ).strip()
+
+
+def probe_once(url, timeout):
+    """Latency in seconds of one fresh GET, or None if it failed"""
+    started = time.monotonic()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            response.read()
+        return time.monotonic() - started
+    except Exception:
+        return None
+
+
+def wait_http(url, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if probe_once(url, 2) is not None:
+            return True
+        time.sleep(1)
+    return False
+
+
+class Prober(threading.Thread):
+    """Second client issuing legitimate requests at a fixed rate"""
+
+    def __init__(self, url, interval, timeout):
+        super().__init__(daemon=True)
+        self.url = url
+        self.interval = interval
+        self.timeout = timeout
+        self.samples = []
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            started = time.monotonic()
+            self.samples.append((started, probe_once(self.url, self.timeout)))
+            self.stopped.wait(max(0, self.interval - (time.monotonic() - started)))
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+    def between(self, start, end):
+        return [(t, latency) for t, latency in self.samples if start <= t < end]
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(pct / 100 * len(values)) - 1))
+    return values[index]
+
+
+def to_ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+def healthy(latency, threshold):
+    return latency is not None and latency <= threshold
+
+
+def run_attack(target, args):
+    """Run slowloris.py on elk_net; return its JSON stats reports"""
+    cmd = [
+        "docker",
+        "run",
+        "--rm",
+        "--name",
+        f"lnadlse-bench-slowloris-{target}",
+        "--network",
+        LAB_NETWORK,
+        "--ulimit",
+        f"nofile={args.connections + 1024}",
+        "-v",
+        f"{DOS_DIR}:/work:ro",
+        args.attacker_image,
+        "python",
+        "-u",
+        "/work/slowloris.py",
+        target,
+        "--lab-subnet",
+        lab_subnet(),
+        "--connections",
+        str(args.connections),
+        "--ramp",
+        str(args.ramp),
+        "--interval",
+        str(args.interval),
+        "--duration",
+        str(args.duration),
+        "--stats-interval",
+        str(args.stats_interval),
+        "--stats-json",
+        "-",
+    ]
+    reports = []
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    for line in process.stdout:
+        if line.startswith("{"):
+            reports.append(json.loads(line))
+        else:
+            print(f"    {line.rstrip()}")
+    if process.wait() != 0:
+        raise RuntimeError(f"slowloris exited with status {process.returncode}")
+    return reports
+
+
+def run_scenario(target, args):
+    print(f"[*] {target}: starting target")
+    compose("up", "-d", target)
+    url = args.probe_url or f"http://{container_ip(target)}/"
+    if not wait_http(url, 60):
+        raise RuntimeError(f"{target} did not answer on {url}")
+
+    prober = Prober(url, args.probe_interval, args.probe_timeout)
+    prober.start()
+    try:
+        print(f"[*] {target}: baseline for {args.baseline:g}s")
+        time.sleep(args.baseline)
+        attack_start = time.monotonic()
+        print(f"[*] {target}: slowloris with {args.connections} connections")
+        reports = run_attack(target, args)
+        attack_end = time.monotonic()
+
+        print(f"[*] {target}: waiting up to {args.recovery_timeout:g}s for recovery")
+        recovered_at = None
+        while time.monotonic() - attack_end < args.recovery_timeout:
+            good = [
+                t
+                for t, latency in prober.between(attack_end, time.monotonic())
+                if healthy(latency, args.exhaustion_latency)
+            ]
+            if good:
+                recovered_at = good[0]
+                break
+            time.sleep(args.probe_interval)
+    finally:
+        prober.stop()
+        if not args.keep:
+            compose("rm", "-sf", target)
+
+    baseline = [
+        latency
+        for _, latency in prober.between(attack_start - args.baseline, attack_start)
+        if latency is not None
+    ]
+    during = prober.between(attack_start, attack_end)
+    exhausted = next(
+        (t for t, latency in during if not healthy(latency, args.exhaustion_latency)),
+        None,
+    )
+    succeeded = [latency for _, latency in during if latency is not None]
+    running = [report for report in reports if not report.get("final")]
+    return {
+        "target": target,
+        "connections": args.connections,
+        "baseline_p50_ms": to_ms(percentile(baseline, 50)),
+        "time_to_exhaustion_s": (
+            None if exhausted is None else round(exhausted - attack_start, 2)
+        ),
+        "held_connections_peak": max(
+            (report["peak_held"] for report in reports), default=0
+        ),
+        "held_connections_end": running[-1]["held"] if running else 0,
+        "probe_p50_ms": to_ms(percentile(succeeded, 50)),
+        "probe_p99_ms": to_ms(percentile(succeeded, 99)),
+        "probe_failures": len(during) - len(succeeded),
+        "probes": len(during),
+        "recovery_time_s": (
+            None if recovered_at is None else round(recovered_at - attack_end, 2)
+        ),
+        "stats": reports,
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Slowloris resilience benchmark for the lab targets"
+    )
+    parser.add_argument(
+        "targets", nargs="*", default=TARGETS, help="compose services to compare"
+    )
+    parser.add_argument("-c", "--connections", type=int, default=2000)
+    parser.add_argument("--ramp", type=float, default=500)
+    parser.add_argument("--interval", type=float, default=10)
+    parser.add_argument(
+        "--duration", type=float, default=60, help="seconds the attack runs"
+    )
+    parser.add_argument("--stats-interval", type=float, default=1)
+    parser.add_argument(
+        "--baseline", type=float, default=10, help="seconds probed before the attack"
+    )
+    parser.add_argument("--probe-interval", type=float, default=0.5)
+    parser.add_argument("--probe-timeout", type=float, default=5)
+    parser.add_argument(
+        "--exhaustion-latency",
+        type=float,
+        default=2,
+        help="probe latency (s) above which the target counts as exhausted",
+    )
+    parser.add_argument("--recovery-timeout", type=float, default=120)
+    parser.add_argument(
+        "--probe-url", help="URL probed instead of the target's elk_net address"
+    )
+    parser.add_argument(
+        "--attacker-image",
+        default="python:3.12-slim",
+        help="image running slowloris.py on elk_net",
+    )
+    parser.add_argument(
+        "--keep", action="store_true", help="leave targets running afterwards"
+    )
+    parser.add_argument("--json", help="write the full report to this file")
+    parser.add_argument("--csv", help="write one summary row per target to this file")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    results = []
+    for target in args.targets:
+        try:
+            results.append(run_scenario(target, args))
+        except (RuntimeError, subprocess.CalledProcessError) as e:
+            print(f"[!] {target}: {e}")
+
+    for result in results:
+        print(
+            f"[*] {result['target']}: exhausted after {result['time_to_exhaustion_s']}s, "
+            f"held {result['held_connections_peak']} connections, "
+            f"p50 {result['probe_p50_ms']}ms p99 {result['probe_p99_ms']}ms, "
+            f"{result['probe_failures']}/{result['probes']} probes failed, "
+            f"recovered after {result['recovery_time_s']}s"
+        )
+    if args.json:
+        settings = {key: value for key, value in vars(args).items() if key not in ("json", "csv")}
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": settings, "results": results}, f, indent=2)
+        print(f"[*] JSON report written to {args.json}")
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(results)
+        print(f"[*] CSV report written to {args.csv}")
+    if len(results) < len(args.targets):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
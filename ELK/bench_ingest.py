@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""End-to-end ingestion benchmark for the Filebeat -> Elasticsearch path.
+
+Appends synthetic access-log lines to a running target container at fixed
+rates, polls Elasticsearch for marker lines to measure write-to-searchable
+latency, and samples es01 CPU/heap while it runs. Run from the ELK directory:
+
+    python bench_ingest.py --target target-nginx --rates 100 500 1000
+    python bench_ingest.py --compare bench_results/ingest-<previous>.json
+"""
+import argparse
+import json
+import random
+import re
+import subprocess
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+from make import es_request
+
+# Access logs Filebeat ships from each target image
+TARGET_LOGS = {
+    "target-nginx": "/var/log/nginx/access.log",
+    "target-httpd": "/usr/local/apache2/logs/access_log",
+}
+RESULTS_DIR = Path("bench_results")
+POLL_INTERVAL = 0.25
+# Writes per second; each batch is one write to the container
+BATCHES_PER_SECOND = 10
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    index = min(len(values) - 1, max(0, round(pct / 100 * len(values)) - 1))
+    return values[index]
+
+
+def access_line(path):
+    timestamp = datetime.now(timezone.utc).strftime("%d/%b/%Y:%H:%M:%S +0000")
+    return (
+        f'10.0.4.{random.randint(2, 254)} - - [{timestamp}] "GET {path} HTTP/1.1" '
+        f'200 {random.randint(200, 5000)} "-" "lnadlse-bench/1.0"\n'
+    )
+
+
+def run_query(run_id, kind=None):
+    """Match this run's lines (optionally one kind), parsed or raw message"""
+    path = f"/lnadlse-bench/{run_id}/" + (f"{kind}/" if kind else "")
+    return {
+        "bool": {
+            "should": [
+                {"prefix": {"url.original": path}},
+                {"match_phrase": {"message": path.strip("/")}},
+            ],
+            "minimum_should_match": 1,
+        }
+    }
+
+
+class EsSampler(threading.Thread):
+    """Sample es01 process CPU and JVM heap once per second"""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.cpu = []
+        self.heap = []
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(1):
+            try:
+                stats = es_request("GET", "/_nodes/stats/process,jvm", timeout=5)
+            except OSError:
+                continue
+            for node in stats["nodes"].values():
+                self.cpu.append(node["process"]["cpu"]["percent"])
+                self.heap.append(node["jvm"]["mem"]["heap_used_percent"])
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+def write_lines(target, log_path, run_id, rate, duration, markers):
+    """Append rate lines/s for duration seconds; record marker write times"""
+    process = subprocess.Popen(
+        ["docker", "exec", "-i", target, "sh", "-c", f"cat >> {log_path}"],
+        stdin=subprocess.PIPE,
+        text=True,
+    )
+    per_batch = max(1, round(rate / BATCHES_PER_SECOND))
+    started = time.monotonic()
+    written = 0
+    batch = 0
+    while time.monotonic() - started < duration:
+        lines = [
+            access_line(f"/lnadlse-bench/{run_id}/data/{written + i}")
+            for i in range(per_batch)
+        ]
+        if batch % BATCHES_PER_SECOND == 0:
+            # One marker per second carries its own write timestamp
+            marker = str(len(markers))
+            lines[0] = access_line(f"/lnadlse-bench/{run_id}/marker/{marker}")
+            markers[marker] = time.monotonic()
+        process.stdin.write("".join(lines))
+        process.stdin.flush()
+        written += per_batch
+        batch += 1
+        time.sleep(max(0, started + batch / BATCHES_PER_SECOND - time.monotonic()))
+    process.stdin.close()
+    process.wait()
+    return written, time.monotonic() - started
+
+
+def run_rate(args, rate):
+    run_id = uuid.uuid4().hex[:12]
+    markers = {}
+    seen = {}
+    sampler = EsSampler()
+    sampler.start()
+    print(f"[*] {rate} lines/s for {args.duration:g}s (run {run_id})")
+
+    writer_result = {}
+
+    def write():
+        writer_result["written"], _ = write_lines(
+            args.target, TARGET_LOGS[args.target], run_id, rate, args.duration, markers
+        )
+
+    writer = threading.Thread(target=write)
+    started = time.monotonic()
+    writer.start()
+
+    marker_pattern = re.compile(rf"/lnadlse-bench/{run_id}/marker/(\d+)")
+    while True:
+        try:
+            hits = es_request(
+                "POST",
+                f"/{args.index}/_search",
+                {
+                    "size": 1000,
+                    "_source": ["url.original", "message"],
+                    "query": run_query(run_id, "marker"),
+                },
+            )["hits"]["hits"]
+        except OSError as e:
+            print(f"[!] Search failed: {e}")
+            hits = []
+        now = time.monotonic()
+        for hit in hits:
+            match = marker_pattern.search(json.dumps(hit["_source"]))
+            if match and match.group(1) not in seen:
+                seen[match.group(1)] = now
+        if not writer.is_alive() and len(seen) >= len(markers):
+            break
+        if not writer.is_alive() and now - started > args.duration + args.drain_timeout:
+            print(f"[!] {len(markers) - len(seen)} markers not searchable in time")
+            break
+        time.sleep(POLL_INTERVAL)
+    writer.join()
+    sampler.stop()
+
+    elapsed = time.monotonic() - started
+    count = es_request(
+        "POST", f"/{args.index}/_count", {"query": run_query(run_id)}
+    )["count"]
+    latencies = [seen[m] - markers[m] for m in seen if m in markers]
+    return {
+        "rate": rate,
+        "run_id": run_id,
+        "written": writer_result.get("written", 0),
+        "indexed": count,
+        "elapsed_s": round(elapsed, 2),
+        "docs_per_s": round(count / elapsed, 1),
+        "markers": len(markers),
+        "markers_searchable": len(seen),
+        "latency_p50_s": round(percentile(latencies, 50) or 0, 3),
+        "latency_p99_s": round(percentile(latencies, 99) or 0, 3),
+        "es_cpu_avg": round(sum(sampler.cpu) / len(sampler.cpu), 1) if sampler.cpu else None,
+        "es_cpu_max": max(sampler.cpu, default=None),
+        "es_heap_max": max(sampler.heap, default=None),
+    }
+
+
+def compare(current, previous_path):
+    previous = {
+        result["rate"]: result
+        for result in json.loads(Path(previous_path).read_text())["results"]
+    }
+    print(f"[*] Compared with {previous_path}:")
+    for result in current:
+        old = previous.get(result["rate"])
+        if not old:
+            continue
+        print(
+            f"    {result['rate']:>6}/s  docs/s {old['docs_per_s']} -> {result['docs_per_s']}  "
+            f"p99 {old['latency_p99_s']}s -> {result['latency_p99_s']}s"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Filebeat -> Elasticsearch ingest benchmark")
+    parser.add_argument("--target", choices=sorted(TARGET_LOGS), default="target-nginx")
+    parser.add_argument(
+        "--rates", type=int, nargs="+", default=[100, 500, 1000], help="lines per second"
+    )
+    parser.add_argument("--duration", type=float, default=30, help="seconds per rate")
+    parser.add_argument(
+        "--drain-timeout",
+        type=float,
+        default=60,
+        help="seconds to wait for the last markers after writing stops",
+    )
+    parser.add_argument("--index", default="filebeat-*")
+    parser.add_argument("--output", help="results file (default: bench_results/ingest-<time>.json)")
+    parser.add_argument("--compare", help="previous results file to compare against")
+    args = parser.parse_args()
+
+    results = []
+    for rate in args.rates:
+        result = run_rate(args, rate)
+        results.append(result)
+        print(
+            f"[*] {rate}/s: {result['indexed']}/{result['written']} indexed, "
+            f"{result['docs_per_s']} docs/s, latency p50 {result['latency_p50_s']}s "
+            f"p99 {result['latency_p99_s']}s, ES cpu max {result['es_cpu_max']}% "
+            f"heap max {result['es_heap_max']}%"
+        )
+
+    output = Path(
+        args.output or RESULTS_DIR / f"ingest-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(
+        json.dumps(
+            {
+                "target": args.target,
+                "duration": args.duration,
+                "index": args.index,
+                "created": datetime.now(timezone.utc).isoformat(),
+                "results": results,
+            },
+            indent=2,
+        )
+    )
+    print(f"[*] Results written to {output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,81 @@
 #!/usr/bin/env python3
+import base64
+import json
+import os
+import re
+import ssl
 import subprocess
+import sys
+import threading
 import time
-import re
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+try:
+    import docker
+except ImportError:
+    # Only needed by install to pull images (pip install -r ../Web/requirements.txt)
+    docker = None
+
 ENV_PATH = Path(".env")
 DOCKER_NETWORK = "elk_net"
 ELASTIC_VERSION = "9.0.0"
 
+DEFAULT_WAIT_TIMEOUT = 300
+
+# Compose override with the extra Elasticsearch nodes (install --nodes N)
+NODES_COMPOSE_FILE = Path("docker-compose.nodes.yml")
+# Beats in the simulation containers read ES_HOSTS from here
+MACHINES_ENV_PATH = Path(__file__).resolve().parent.parent / "Machines" / ".env"
+
+# Compose project the volumes belong to (compose defaults to the folder name)
+PROJECT_NAME = os.getenv(
+    "COMPOSE_PROJECT_NAME", Path(__file__).resolve().parent.name.lower()
+)
+SNAPSHOT_DIR = Path("snapshots")
+DEFAULT_SNAPSHOT = "default"
+# Elasticsearch endpoint used by check and the benchmarks
+ES_URL = os.getenv("ES_URL", "https://localhost:9200")
+
+# Lifecycle for the beats data streams. The policies use the beats' own policy
+# names, so templates the beats load later pick them up without changes.
+ILM_POLICIES = ["packetbeat", "filebeat"]
+# Roll the write index over at this primary shard size or age
+ILM_ROLLOVER_SIZE = os.getenv("ILM_ROLLOVER_SIZE", "5gb")
+ILM_ROLLOVER_AGE = os.getenv("ILM_ROLLOVER_AGE", "1d")
+# Force-merge indices this long after rollover
+ILM_WARM_AGE = os.getenv("ILM_WARM_AGE", "2d")
+# Delete indices this long after rollover
+ILM_RETENTION = os.getenv("ILM_RETENTION", "7d")
+# Replicas per beats index (0 on a single node, otherwise it stays yellow)
+ILM_REPLICAS = int(os.getenv("ILM_REPLICAS", "0"))
+
+TEMPLATE_READ_ONLY_FIELDS = (
+    "created_date",
+    "created_date_millis",
+    "modified_date",
+    "modified_date_millis",
+)
+
+# Images pulled by install: the ELK services and the Machines base images
+ELASTICSEARCH_IMAGE = (
+    f"docker.elastic.co/elasticsearch/elasticsearch:{ELASTIC_VERSION}"
+)
+KIBANA_IMAGE = f"docker.elastic.co/kibana/kibana:{ELASTIC_VERSION}"
+REQUIRED_IMAGES = [
+    ELASTICSEARCH_IMAGE,
+    KIBANA_IMAGE,
+    "nginx:latest",
+    "httpd:latest",
+    "kalilinux/kali-rolling:latest",
+]
+PULL_RETRIES = 3
+PULL_PROGRESS_INTERVAL = 2
+# Image used to run tar against the volumes (already pulled by install)
+HELPER_IMAGE = ELASTICSEARCH_IMAGE
+
 
 def get_docker_ip(container_name):
     try:
@@ -35,6 +103,82 @@ def get_elastic_password():
                 return line.strip().split("=")[1]
     return ""
 
+
+def get_env_value(key, default=None, path=ENV_PATH):
+    if not path.exists():
+        return default
+    for line in path.read_text().splitlines():
+        if line.startswith(f"{key}="):
+            return line.split("=", 1)[1].strip()
+    return default
+
+
+def set_env_values(values, path=ENV_PATH):
+    """Set (or with None, remove) KEY=value lines in an env file"""
+    lines = path.read_text().splitlines() if path.exists() else []
+    remaining = dict(values)
+    updated = []
+    for line in lines:
+        key = line.split("=", 1)[0]
+        if "=" in line and not line.startswith("#") and key in remaining:
+            value = remaining.pop(key)
+            if value is not None:
+                updated.append(f"{key}={value}")
+        else:
+            updated.append(line)
+    updated += [f"{key}={value}" for key, value in remaining.items() if value is not None]
+    path.write_text("\n".join(updated) + "\n")
+
+
+def es_nodes():
+    """Elasticsearch node names configured by install --nodes"""
+    return get_env_value("ES_NODES", "es01").split(",")
+
+
+def health_services():
+    """Services with compose healthchecks, in start order"""
+    return ["setup", *es_nodes(), "kibana"]
+
+
+def snapshot_volumes():
+    """Volumes holding certs, ES data and Kibana state for warm starts"""
+    return ["certs", *(f"esdata{node[2:]}" for node in es_nodes()), "kibanadata"]
+
+
+def es_request(method, path, body=None, timeout=10, url=None):
+    """Call the Elasticsearch REST API as 'elastic' and return the decoded JSON.
+
+    Raises urllib.error.HTTPError / URLError on failure. The lab uses
+    self-signed certs, so certificate verification is disabled.
+    """
+    data = None
+    headers = {}
+    if body is not None:
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body)
+        data = body.encode()
+        bulk = path.rstrip("/").endswith("_bulk")
+        headers["Content-Type"] = (
+            "application/x-ndjson" if bulk else "application/json"
+        )
+    request = urllib.request.Request(
+        f"{(url or ES_URL).rstrip('/')}/{path.lstrip('/')}",
+        data=data,
+        headers=headers,
+        method=method,
+    )
+    credentials = f"elastic:{get_elastic_password()}".encode()
+    request.add_header(
+        "Authorization", "Basic " + base64.b64encode(credentials).decode()
+    )
+    context = ssl.create_default_context()
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    with urllib.request.urlopen(request, timeout=timeout, context=context) as response:
+        payload = response.read()
+    return json.loads(payload) if payload else None
+
+
 def containers_exist():
     """Check if any containers are defined in docker-compose and exist."""
     result = subprocess.run(
@@ -42,7 +186,229 @@ def containers_exist():
     )
     return bool(result.stdout.strip())
 
-def install():
+
+class PullProgress:
+    """Aggregate per-layer pull events into one progress line per image"""
+
+    def __init__(self, images):
+        self.lock = threading.Lock()
+        self.layers = {image: {} for image in images}
+        self.state = {image: "waiting" for image in images}
+
+    def update(self, image, event):
+        layer = event.get("id")
+        status = event.get("status", "")
+        if not layer or status.startswith(("Pulling from", "Digest", "Status")):
+            return
+        with self.lock:
+            entry = self.layers[image].setdefault(
+                layer, {"current": 0, "total": 0, "done": False}
+            )
+            detail = event.get("progressDetail") or {}
+            if status == "Downloading" and detail.get("total"):
+                entry["current"] = detail.get("current", 0)
+                entry["total"] = detail["total"]
+            elif status in ("Download complete", "Pull complete", "Already exists"):
+                entry["current"] = entry["total"]
+                entry["done"] = status != "Download complete"
+
+    def set_state(self, image, state):
+        with self.lock:
+            self.state[image] = state
+
+    def summary(self):
+        with self.lock:
+            parts = []
+            for image, layers in self.layers.items():
+                state = self.state[image]
+                if state == "pulling" and layers:
+                    current = sum(layer["current"] for layer in layers.values())
+                    total = sum(layer["total"] for layer in layers.values())
+                    done = sum(layer["done"] for layer in layers.values())
+                    state = (
+                        f"{current / 1024 / 1024:.0f}/{total / 1024 / 1024:.0f} MiB "
+                        f"{done}/{len(layers)} layers"
+                    )
+                parts.append(f"{image.rsplit('/', 1)[-1]} {state}")
+            return " | ".join(parts)
+
+
+def pull_image(client, image, progress):
+    """Pull one image, retrying transient failures with backoff"""
+    repository, tag = image.rsplit(":", 1)
+    for attempt in range(1, PULL_RETRIES + 1):
+        started = time.monotonic()
+        progress.set_state(image, "pulling")
+        try:
+            for event in client.api.pull(repository, tag, stream=True, decode=True):
+                if "error" in event:
+                    raise docker.errors.APIError(event["error"])
+                progress.update(image, event)
+            progress.set_state(image, "done")
+            return image, True, time.monotonic() - started, None
+        except docker.errors.NotFound as e:
+            # Wrong name or tag; retrying will not help
+            progress.set_state(image, "failed")
+            return image, False, time.monotonic() - started, str(e)
+        except Exception as e:
+            if attempt == PULL_RETRIES:
+                progress.set_state(image, "failed")
+                return image, False, time.monotonic() - started, str(e)
+            delay = 2**attempt
+            progress.set_state(image, f"retrying in {delay}s")
+            print(f"[!] Pull of {image} failed ({e}), retrying in {delay}s")
+            time.sleep(delay)
+
+
+def pull_images(images=REQUIRED_IMAGES):
+    """Pull the missing images concurrently through the Docker SDK"""
+    if docker is None:
+        print("[!] Docker SDK not installed: pip install -r ../Web/requirements.txt")
+        return False
+
+    client = docker.from_env(timeout=300, max_pool_size=max(len(images), 1))
+    missing = []
+    for image in images:
+        try:
+            client.images.get(image)
+            print(f"[=] {image} already present")
+        except docker.errors.ImageNotFound:
+            missing.append(image)
+    if not missing:
+        return True
+
+    print(f"[*] Pulling {len(missing)} images concurrently...")
+    progress = PullProgress(missing)
+    finished = threading.Event()
+
+    def report_progress():
+        while not finished.wait(PULL_PROGRESS_INTERVAL):
+            print(f"[*] {progress.summary()}")
+
+    reporter = threading.Thread(target=report_progress, daemon=True)
+    reporter.start()
+    try:
+        with ThreadPoolExecutor(max_workers=len(missing)) as pool:
+            results = list(
+                pool.map(lambda image: pull_image(client, image, progress), missing)
+            )
+    finally:
+        finished.set()
+        client.close()
+
+    for image, ok, elapsed, error in results:
+        if ok:
+            print(f"[*] {image} pulled in {elapsed:.1f}s")
+        else:
+            print(f"[!] {image} failed: {error}")
+    return all(ok for _, ok, _, _ in results)
+
+
+def node_service(node, nodes, mem_limit_var):
+    """Compose override lines for one generated Elasticsearch node"""
+    seeds = ",".join(other for other in nodes if other != node)
+    volume = f"esdata{node[2:]}"
+    lines = [
+        f"  {node}:",
+        "    depends_on:",
+        "      setup:",
+        "        condition: service_healthy",
+        "    image: docker.elastic.co/elasticsearch/elasticsearch:${STACK_VERSION}",
+        "    labels:",
+        "      lnadlse.cluster: elk",
+        "      lnadlse.role: elasticsearch",
+        "    networks:",
+        "      - elk_net",
+        "    volumes:",
+        "      - certs:/usr/share/elasticsearch/config/certs",
+        f"      - {volume}:/usr/share/elasticsearch/data",
+        "    environment:",
+        f"      - node.name={node}",
+        "      - cluster.name=${CLUSTER_NAME}",
+        f"      - cluster.initial_master_nodes={','.join(nodes)}",
+        f"      - discovery.seed_hosts={seeds}",
+        "      - ELASTIC_PASSWORD=${ELASTIC_PASSWORD}",
+        "      - bootstrap.memory_lock=true",
+        "      - xpack.security.enabled=true",
+        "      - xpack.security.http.ssl.enabled=true",
+        f"      - xpack.security.http.ssl.key=certs/{node}/{node}.key",
+        f"      - xpack.security.http.ssl.certificate=certs/{node}/{node}.crt",
+        "      - xpack.security.http.ssl.certificate_authorities=certs/ca/ca.crt",
+        "      - xpack.security.transport.ssl.enabled=true",
+        f"      - xpack.security.transport.ssl.key=certs/{node}/{node}.key",
+        f"      - xpack.security.transport.ssl.certificate=certs/{node}/{node}.crt",
+        "      - xpack.security.transport.ssl.certificate_authorities=certs/ca/ca.crt",
+        "      - xpack.security.transport.ssl.verification_mode=certificate",
+        "      - xpack.license.self_generated.type=${LICENSE}",
+        "      - xpack.ml.use_auto_machine_memory_percent=true",
+        f"    mem_limit: ${{{mem_limit_var}}}",
+        "    ulimits:",
+        "      memlock:",
+        "        soft: -1",
+        "        hard: -1",
+        "    healthcheck:",
+        "      test:",
+        "        [",
+        '          "CMD-SHELL",',
+        "          \"curl -s --cacert config/certs/ca/ca.crt https://localhost:9200 | grep -q 'missing authentication credentials'\",",
+        "        ]",
+        "      interval: 10s",
+        "      timeout: 10s",
+        "      retries: 120",
+    ]
+    return lines
+
+
+def write_nodes_override(count):
+    """Generate the compose override for an N node cluster (N=1 removes it)"""
+    nodes = [f"es{index:02d}" for index in range(1, count + 1)]
+    if count == 1:
+        if NODES_COMPOSE_FILE.exists():
+            NODES_COMPOSE_FILE.unlink()
+        set_env_values({"ES_NODES": None, "ES_NODE_MEM_LIMIT": None, "COMPOSE_FILE": None})
+        set_env_values({"ES_HOSTS": None}, MACHINES_ENV_PATH)
+        print("[*] Single-node Elasticsearch")
+        return nodes
+
+    hosts = [f"https://{node}:9200" for node in nodes]
+    lines = [
+        f"# Generated by 'make.py install --nodes {count}', re-run install to change",
+        "services:",
+        "  es01:",
+        "    environment:",
+        f"      - cluster.initial_master_nodes={','.join(nodes)}",
+        f"      - discovery.seed_hosts={','.join(nodes[1:])}",
+        "    mem_limit: ${ES_NODE_MEM_LIMIT}",
+    ]
+    for node in nodes[1:]:
+        lines += node_service(node, nodes, "ES_NODE_MEM_LIMIT")
+    lines += [
+        "  kibana:",
+        "    environment:",
+        f"      - ELASTICSEARCH_HOSTS={json.dumps(hosts, separators=(',', ':'))}",
+        "",
+        "volumes:",
+    ]
+    for node in nodes[1:]:
+        lines += [f"  esdata{node[2:]}:", "    driver: local"]
+    NODES_COMPOSE_FILE.write_text("\n".join(lines) + "\n")
+
+    set_env_values(
+        {
+            "ES_NODES": ",".join(nodes),
+            "ES_NODE_MEM_LIMIT": get_env_value("ES_NODE_MEM_LIMIT")
+            or get_env_value("MEM_LIMIT", "1073741824"),
+            # docker-compose picks both files up from .env
+            "COMPOSE_FILE": os.pathsep.join(["docker-compose.yml", str(NODES_COMPOSE_FILE)]),
+        }
+    )
+    set_env_values({"ES_HOSTS": ",".join(hosts)}, MACHINES_ENV_PATH)
+    print(f"[*] Generated {NODES_COMPOSE_FILE} with nodes {', '.join(nodes)}")
+    return nodes
+
+
+def install(nodes=None):
+    started = time.monotonic()
     print("[*] Setting up ELK stack...")
 
     if not ENV_PATH.exists():
@@ -54,6 +420,8 @@ def install():
         r"STACK_VERSION=.*", f"STACK_VERSION={ELASTIC_VERSION}", content
     )
     ENV_PATH.write_text(new_content)
+    if nodes:
+        write_nodes_override(nodes)
 
     # Create docker network if not exists
     print("[*] Creating docker network...")
@@ -66,23 +434,106 @@ def install():
     else:
         print(f"[*] Docker network {DOCKER_NETWORK} already exists")
 
+    pulled = pull_images()
+
     print("[*] Setted ELK stack")
+    print(f"[*] Install finished in {time.monotonic() - started:.1f}s")
+    if not pulled:
+        print("[!] Some images failed to pull, re-run 'install' to retry")
     print("[*] Run 'start' to start the stack")
 
-    image_names = [f"docker.elastic.co/elasticsearch/elasticsearch:{ELASTIC_VERSION}", f"docker.elastic.co/kibana/kibana:{ELASTIC_VERSION}"]
-    for image_name in image_names:
-        if not subprocess.run(["docker", "images", "-q", image_name], capture_output=True, text=True).stdout.strip():
-            print(f"[*] Pulling {image_name} image...")
-            subprocess.run(["docker", "pull", image_name])
-            print(f"[*] {image_name} image pulled")
-
 
 def show():
     print("Kibana IP:", get_docker_ip("elk-kibana-1"))
-    print("Elasticsearch IP:", get_docker_ip("elk-es01-1"))
+    for node in es_nodes():
+        print(f"Elasticsearch {node} IP:", get_docker_ip(f"elk-{node}-1"))
 
 
-def start():
+def get_service_states(services):
+    """Return {service: State dict} for the compose containers of services"""
+    ids = {}
+    for service in services:
+        result = subprocess.run(
+            ["docker-compose", "ps", "-a", "-q", service],
+            capture_output=True,
+            text=True,
+        )
+        container_id = result.stdout.strip().splitlines()
+        if container_id:
+            ids[container_id[0]] = service
+    if not ids:
+        return {}
+    result = subprocess.run(
+        ["docker", "inspect", *ids], capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        return {}
+    return {ids[info["Id"]]: info["State"] for info in json.loads(result.stdout)}
+
+
+def service_ready(state):
+    """Return (ready, failed, description) for one service state"""
+    health = (state.get("Health") or {}).get("Status")
+    if state.get("Status") == "exited":
+        # setup finishes once certs and the kibana_system password are in place
+        if state.get("ExitCode") == 0:
+            return True, False, "completed"
+        return False, True, f"exited ({state.get('ExitCode')})"
+    if health == "healthy":
+        return True, False, "healthy"
+    if health is None and state.get("Running"):
+        return True, False, "running"
+    return False, False, health or state.get("Status", "unknown")
+
+
+def wait_healthy(timeout=DEFAULT_WAIT_TIMEOUT, services=None):
+    """Poll compose healthchecks until all services are ready or timeout"""
+    services = services or health_services()
+    print(f"[*] Waiting for {', '.join(services)} to become healthy (timeout {timeout}s)...")
+    started = time.monotonic()
+    ready_after = {}
+    last_status = {}
+    delay = 0.5
+    while True:
+        states = get_service_states(services)
+        for service in services:
+            if service in ready_after:
+                continue
+            state = states.get(service)
+            if state is None:
+                last_status[service] = "not created"
+                continue
+            ready, failed, description = service_ready(state)
+            last_status[service] = description
+            if failed:
+                print(f"[!] {service} {description}")
+                print_health_report(services, ready_after, last_status)
+                return False
+            if ready:
+                ready_after[service] = time.monotonic() - started
+                print(f"[*] {service} {description} after {ready_after[service]:.1f}s")
+
+        if len(ready_after) == len(services):
+            print_health_report(services, ready_after, last_status)
+            return True
+        if time.monotonic() - started >= timeout:
+            print(f"[!] Timed out after {timeout}s")
+            print_health_report(services, ready_after, last_status)
+            return False
+        time.sleep(min(delay, max(0, timeout - (time.monotonic() - started))))
+        delay = min(delay * 1.5, 10)
+
+
+def print_health_report(services, ready_after, last_status):
+    print("[*] Time to healthy:")
+    for service in services:
+        if service in ready_after:
+            print(f"    {service:<8} {last_status[service]:<10} {ready_after[service]:6.1f}s")
+        else:
+            print(f"    {service:<8} {last_status.get(service, 'unknown'):<10}      -")
+
+
+def start(timeout=DEFAULT_WAIT_TIMEOUT):
     if containers_exist():
         print("[*] Starting existing containers...")
         subprocess.run(["docker-compose", "start"])
@@ -90,10 +541,124 @@ def start():
         print("[*] No containers found, running 'docker-compose up -d'...")
         subprocess.run(["docker-compose", "up", "-d"])
 
-    print("[*] Waiting for services to initialize...")
-    time.sleep(30)
+    healthy = wait_healthy(timeout)
     show()
     check()
+    if healthy:
+        ilm()
+    return healthy
+
+
+def ilm_policy():
+    return {
+        "policy": {
+            "_meta": {"managed_by": "lnadlse ELK/make.py"},
+            "phases": {
+                "hot": {
+                    "actions": {
+                        "rollover": {
+                            "max_primary_shard_size": ILM_ROLLOVER_SIZE,
+                            "max_age": ILM_ROLLOVER_AGE,
+                        },
+                        "set_priority": {"priority": 100},
+                    }
+                },
+                "warm": {
+                    "min_age": ILM_WARM_AGE,
+                    "actions": {
+                        "forcemerge": {"max_num_segments": 1},
+                        "set_priority": {"priority": 50},
+                    },
+                },
+                "delete": {"min_age": ILM_RETENTION, "actions": {"delete": {}}},
+            },
+        }
+    }
+
+
+def install_lifecycle():
+    """Install the ILM policies and apply them to beats templates and indices"""
+    print(
+        f"[*] Installing ILM policies (rollover {ILM_ROLLOVER_SIZE}/{ILM_ROLLOVER_AGE}, "
+        f"force-merge after {ILM_WARM_AGE}, delete after {ILM_RETENTION})"
+    )
+    index_settings = {
+        "number_of_shards": "1",
+        "number_of_replicas": str(ILM_REPLICAS),
+    }
+    for beat in ILM_POLICIES:
+        es_request("PUT", f"/_ilm/policy/{beat}", ilm_policy())
+
+        # Templates exist once a beat has connected; patch them in place
+        try:
+            templates = es_request("GET", f"/_index_template/{beat}-*")
+        except urllib.error.HTTPError as e:
+            if e.code != 404:
+                raise
+            templates = {"index_templates": []}
+        for template in templates["index_templates"]:
+            body = template["index_template"]
+            # Read-only bookkeeping fields are rejected by PUT
+            for key in TEMPLATE_READ_ONLY_FIELDS:
+                body.pop(key, None)
+            settings = body.setdefault("template", {}).setdefault("settings", {})
+            index = settings.setdefault("index", {})
+            index.update(index_settings)
+            index.setdefault("lifecycle", {})["name"] = beat
+            es_request("PUT", f"/_index_template/{template['name']}", body)
+            print(f"[*] Updated index template {template['name']}")
+        if not templates["index_templates"]:
+            print(
+                f"[=] No {beat} template yet; new {beat} data streams use the "
+                f"'{beat}' policy, run 'make.py ilm' again to set shards/replicas"
+            )
+
+        # Existing backing indices join the policy right away
+        es_request(
+            "PUT",
+            f"/.ds-{beat}-*,{beat}-*/_settings",
+            {"index": {"lifecycle.name": beat, "number_of_replicas": ILM_REPLICAS}},
+        )
+    print("[*] ILM policies installed")
+
+
+def ilm():
+    try:
+        install_lifecycle()
+        return True
+    except OSError as e:
+        print(f"[!] Failed to install ILM policies: {e}")
+        return False
+
+
+def indices():
+    """Print size, doc count and lifecycle phase of the indices"""
+    try:
+        rows = es_request("GET", "/_cat/indices/*,.ds-*?format=json&bytes=b&s=index")
+        explain = es_request("GET", "/*,.ds-*/_ilm/explain?only_managed=true")
+    except OSError as e:
+        print(f"[!] Failed to read indices: {e}")
+        return
+    phases = {
+        name: info.get("phase", "-") for name, info in explain["indices"].items()
+    }
+    print(f"{'index':<48} {'health':<7} {'phase':<7} {'docs':>12} {'size':>10}")
+    total_docs = total_bytes = 0
+    for row in rows:
+        docs = int(row.get("docs.count") or 0)
+        size = int(row.get("store.size") or 0)
+        total_docs += docs
+        total_bytes += size
+        print(
+            f"{row['index']:<48} {row['health']:<7} {phases.get(row['index'], '-'):<7} "
+            f"{docs:>12} {size / 1024 / 1024:>8.1f}MB"
+        )
+    total_mb = total_bytes / 1024 / 1024
+    print(f"{'total':<64} {total_docs:>12} {total_mb:>8.1f}MB")
+
+
+def wait(timeout=DEFAULT_WAIT_TIMEOUT):
+    return wait_healthy(timeout)
 
 
 def stop():
@@ -104,17 +669,201 @@ def remove():
     subprocess.run(["docker-compose", "down", "-v"])
 
 
+def volume_name(volume):
+    return f"{PROJECT_NAME}_{volume}"
+
+
+def running_services():
+    result = subprocess.run(
+        ["docker-compose", "ps", "-q", "--status", "running"],
+        capture_output=True,
+        text=True,
+    )
+    return bool(result.stdout.strip())
+
+
+def volume_exists(volume):
+    """docker run -v would silently create a missing volume; check first"""
+    result = subprocess.run(
+        ["docker", "volume", "inspect", volume_name(volume)],
+        capture_output=True,
+    )
+    return result.returncode == 0
+
+
+def archive_volume(volume, archive):
+    """Stream one volume into a gzipped tar archive"""
+    started = time.monotonic()
+    with open(archive, "wb") as f:
+        subprocess.run(
+            [
+                "docker",
+                "run",
+                "--rm",
+                "--user",
+                "0:0",
+                "--entrypoint",
+                "tar",
+                "-v",
+                f"{volume_name(volume)}:/volume:ro",
+                HELPER_IMAGE,
+                "-czf",
+                "-",
+                "-C",
+                "/volume",
+                ".",
+            ],
+            stdout=f,
+            check=True,
+        )
+    return volume, time.monotonic() - started, archive.stat().st_size
+
+
+def extract_volume(volume, archive):
+    """Recreate one volume and stream the archive back into it"""
+    started = time.monotonic()
+    subprocess.run(
+        [
+            "docker",
+            "volume",
+            "create",
+            "--label",
+            f"com.docker.compose.project={PROJECT_NAME}",
+            "--label",
+            f"com.docker.compose.volume={volume}",
+            volume_name(volume),
+        ],
+        capture_output=True,
+        check=True,
+    )
+    with open(archive, "rb") as f:
+        subprocess.run(
+            [
+                "docker",
+                "run",
+                "--rm",
+                "-i",
+                "--user",
+                "0:0",
+                "--entrypoint",
+                "tar",
+                "-v",
+                f"{volume_name(volume)}:/volume",
+                HELPER_IMAGE,
+                "-xzpf",
+                "-",
+                "-C",
+                "/volume",
+            ],
+            stdin=f,
+            check=True,
+        )
+    return volume, time.monotonic() - started, archive.stat().st_size
+
+
+def valid_snapshot_name(name):
+    if re.fullmatch(r"[A-Za-z0-9_.-]+", name) and name not in (".", ".."):
+        return True
+    print(f"[!] Invalid snapshot name: {name}")
+    return False
+
+
+def snapshot(name=DEFAULT_SNAPSHOT, timeout=DEFAULT_WAIT_TIMEOUT):
+    """Archive the ELK volumes into snapshots/<name>"""
+    if not valid_snapshot_name(name):
+        return False
+    volumes = snapshot_volumes()
+    missing = [volume_name(volume) for volume in volumes if not volume_exists(volume)]
+    if missing:
+        print(
+            f"[!] Volume(s) {', '.join(missing)} do not exist; "
+            "run 'python make.py start' once before taking a snapshot"
+        )
+        return False
+    target = SNAPSHOT_DIR / name
+    target.mkdir(parents=True, exist_ok=True)
+    # ES and Kibana must be stopped for a consistent copy of their data
+    was_running = running_services()
+    if was_running:
+        print("[*] Stopping ELK stack for a consistent snapshot...")
+        subprocess.run(["docker-compose", "stop"], check=True)
+
+    print(f"[*] Writing snapshot '{name}' to {target}")
+    ok = True
+    try:
+        with ThreadPoolExecutor(max_workers=len(volumes)) as pool:
+            results = list(
+                pool.map(
+                    lambda volume: archive_volume(volume, target / f"{volume}.tar.gz"),
+                    volumes,
+                )
+            )
+        for volume, elapsed, size in results:
+            print(f"    {volume:<12} {size / 1024 / 1024:8.1f} MiB {elapsed:6.1f}s")
+        (target / "manifest.json").write_text(
+            json.dumps(
+                {
+                    "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                    "stack_version": ELASTIC_VERSION,
+                    "volumes": volumes,
+                },
+                indent=2,
+            )
+        )
+        print(f"[*] Snapshot '{name}' written")
+    except subprocess.CalledProcessError as e:
+        print(f"[!] Snapshot failed: {e}")
+        ok = False
+
+    if was_running:
+        ok = start(timeout) and ok
+    return ok
+
+
+def restore(name=DEFAULT_SNAPSHOT, timeout=DEFAULT_WAIT_TIMEOUT):
+    """Replace the ELK volumes with snapshots/<name> and start the stack"""
+    if not valid_snapshot_name(name):
+        return False
+    source = SNAPSHOT_DIR / name
+    manifest_path = source / "manifest.json"
+    if not manifest_path.exists():
+        print(f"[!] Snapshot '{name}' not found in {SNAPSHOT_DIR}")
+        return False
+    manifest = json.loads(manifest_path.read_text())
+    if manifest.get("stack_version") != ELASTIC_VERSION:
+        print(
+            f"[!] Snapshot '{name}' was taken with {manifest.get('stack_version')}, "
+            f"stack is {ELASTIC_VERSION}"
+        )
+        return False
+
+    print("[*] Removing ELK containers and volumes...")
+    subprocess.run(["docker-compose", "down", "-v"], check=True)
+    print(f"[*] Restoring snapshot '{name}'...")
+    try:
+        with ThreadPoolExecutor(max_workers=len(manifest["volumes"])) as pool:
+            results = list(
+                pool.map(
+                    lambda volume: extract_volume(volume, source / f"{volume}.tar.gz"),
+                    manifest["volumes"],
+                )
+            )
+    except subprocess.CalledProcessError as e:
+        print(f"[!] Restore failed: {e}")
+        return False
+    for volume, elapsed, size in results:
+        print(f"    {volume:<12} {size / 1024 / 1024:8.1f} MiB {elapsed:6.1f}s")
+
+    subprocess.run(["docker-compose", "up", "-d"])
+    return wait_healthy(timeout)
+
+
 def check():
     print("[*] Checking Elasticsearch connection...")
-    password = get_elastic_password()
     try:
-        output = subprocess.check_output(
-            ["curl", "-s", "-k", "https://localhost:9200", "-u", f"elastic:{password}"],
-            text=True,
-        )
-        print(output)
-    except subprocess.CalledProcessError:
-        print("[!] Connection failed")
+        print(json.dumps(es_request("GET", "/"), indent=2))
+    except OSError as e:
+        print(f"[!] Connection failed: {e}")
 
 
 def main():
@@ -122,10 +871,53 @@ def main():
 
     parser = argparse.ArgumentParser()
     parser.add_argument(
-        "action", choices=["install", "start", "stop", "remove", "show", "check"]
+        "action",
+        choices=[
+            "install",
+            "start",
+            "stop",
+            "remove",
+            "show",
+            "check",
+            "wait",
+            "snapshot",
+            "restore",
+            "ilm",
+            "indices",
+        ],
+    )
+    parser.add_argument(
+        "--timeout",
+        type=int,
+        default=DEFAULT_WAIT_TIMEOUT,
+        help="seconds 'start'/'wait' wait for services to become healthy",
+    )
+    parser.add_argument(
+        "--nodes",
+        type=int,
+        help="install: number of Elasticsearch nodes (1 = single node)",
+    )
+    parser.add_argument(
+        "--name",
+        default=DEFAULT_SNAPSHOT,
+        help="snapshot name for 'snapshot'/'restore'",
     )
     args = parser.parse_args()
 
+    if args.action == "install":
+        if args.nodes is not None and args.nodes < 1:
+            parser.error("--nodes must be at least 1")
+        install(args.nodes)
+        return
+    if args.action in ("snapshot", "restore"):
+        commands = {"snapshot": snapshot, "restore": restore}
+        sys.exit(0 if commands[args.action](args.name, args.timeout) else 1)
+
+    if args.action in ("start", "wait"):
+        # Exit non-zero so scripts can chain on a healthy stack
+        waiters = {"start": start, "wait": wait}
+        sys.exit(0 if waiters[args.action](args.timeout) else 1)
+
     actions = {
         "install": install,
         "start": start,
@@ -133,6 +925,8 @@ def main():
         "remove": remove,
         "show": show,
         "check": check,
+        "ilm": ilm,
+        "indices": indices,
     }
     actions[args.action]()
 
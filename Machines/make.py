@@ -1,15 +1,142 @@
 #!/usr/bin/env python3
+import contextlib
+import functools
+import hashlib
+import json
 import os
 import platform
+import re
+import shutil
 import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
 
 BASE_DIRS = {"Targeted": "./Targeted", "Attacker": "./Attacker"}
 
 DOCKER_NETWORK = "elk_net"
 
+# Labels the Web app uses to find lab containers (inherited from the image)
+LAB_LABELS = {"targeted": "target", "attacker": "attacker"}
+
 # 默认构建的 Dockerfile 路径
 DEFAULT_BUILDS = {"targeted": "./Targeted/nginx", "attacker": "./Attacker/novnc"}
 
+# Per-image build logs written by 'install --all'
+BUILD_LOG_DIR = "./logs"
+# Seconds between progress summaries while parallel builds run
+PROGRESS_INTERVAL = 10
+
+# Beats tarballs shared by the target images through the beats base image
+BEATS_VERSION = "9.0.0"
+BEATS = ("packetbeat", "filebeat")
+BEATS_DOCKERFILE = "./Beats/Dockerfile"
+BEATS_IMAGE = "lnadlse-beats"
+# Local artifact cache, one subdirectory per architecture
+ARTIFACT_CACHE = os.getenv(
+    "LNADLSE_ARTIFACT_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "lnadlse", "artifacts"),
+)
+# Download base URL, or a local directory holding the tarballs and .sha512 files
+ARTIFACT_MIRROR = os.getenv(
+    "LNADLSE_ARTIFACT_MIRROR", "https://artifacts.elastic.co/downloads/beats"
+)
+
+# Image label holding the hash of build context, Dockerfile and arch
+BUILD_HASH_LABEL = "lnadlse.build-hash"
+
+# Beats output/queue tuning profiles. All of them are written to
+# beats-profiles/<name>.yml in the target images; BEATS_PROFILE picks one when
+# the container starts (the image default is chosen with --beats-profile).
+BEATS_PROFILES = {
+    # Beats 9.0 defaults
+    "balanced": {
+        "output.elasticsearch.worker": 1,
+        "output.elasticsearch.bulk_max_size": 1600,
+        "output.elasticsearch.compression_level": 1,
+        "queue.mem.events": 3200,
+        "queue.mem.flush.min_events": 1600,
+        "queue.mem.flush.timeout": "10s",
+    },
+    # Small bulks flushed right away so events become searchable quickly
+    "low-latency": {
+        "output.elasticsearch.worker": 1,
+        "output.elasticsearch.bulk_max_size": 256,
+        "output.elasticsearch.compression_level": 0,
+        "queue.mem.events": 2048,
+        "queue.mem.flush.min_events": 0,
+        "queue.mem.flush.timeout": "1s",
+    },
+    # Large bulks over several connections so attack traffic is not dropped
+    "high-throughput": {
+        "output.elasticsearch.worker": 4,
+        "output.elasticsearch.bulk_max_size": 3200,
+        "output.elasticsearch.compression_level": 1,
+        "queue.mem.events": 12800,
+        "queue.mem.flush.min_events": 3200,
+        "queue.mem.flush.timeout": "5s",
+    },
+    # Small queue and stronger compression for memory-constrained hosts
+    "low-memory": {
+        "output.elasticsearch.worker": 1,
+        "output.elasticsearch.bulk_max_size": 512,
+        "output.elasticsearch.compression_level": 3,
+        "queue.mem.events": 1024,
+        "queue.mem.flush.min_events": 512,
+        "queue.mem.flush.timeout": "5s",
+    },
+}
+DEFAULT_BEATS_PROFILE = os.getenv("BEATS_PROFILE", "balanced")
+BEATS_PROFILE_DIR = "beats-profiles"
+# Beats write to <beat>-<BEATS_INDEX_INFIX><version>; lab tenants set the infix
+BEATS_INDEX_TEMPLATE = "{beat}-${{BEATS_INDEX_INFIX:}}%{{[agent.version]}}"
+
+# Multi-tenant labs ('make.py lab ...'): one compose project and network per tenant
+LABS_DIR = "./labs"
+LAB_REGISTRY = os.path.join(LABS_DIR, "registry.json")
+# Held while a 'lab' command reads, places and writes the registry
+LAB_REGISTRY_LOCK = os.path.join(LABS_DIR, "registry.lock")
+LAB_NAME_PATTERN = re.compile(r"[a-z0-9][a-z0-9-]{0,19}")
+# Host ports: each lab gets LAB_PORTS_PER_SLOT consecutive ports from LAB_PORT_BASE
+LAB_PORT_BASE = int(os.getenv("LAB_PORT_BASE", "20000"))
+LAB_PORTS_PER_SLOT = 10
+# Container port -> offset within the lab's port range
+LAB_PORT_OFFSETS = {"80": 0, "22": 1, "8080": 2, "5901": 3, "3389": 4}
+# Ports published by each image; attackers reuse the simulation compose layout
+LAB_IMAGE_PORTS = {
+    "nginx": ["80"],
+    "httpd": ["80"],
+    "kali-novnc": ["22", "5901", "8080"],
+    "kali-xrdp": ["3389", "22"],
+    "kali-x11": ["22"],
+}
+# Resource limits per lab container; the scheduler admits labs against these
+LAB_SIZES = {
+    "target": {"cpus": float(os.getenv("LAB_TARGET_CPUS", "0.25")), "memory": os.getenv("LAB_TARGET_MEMORY", "256m")},
+    "attacker": {"cpus": float(os.getenv("LAB_ATTACKER_CPUS", "1")), "memory": os.getenv("LAB_ATTACKER_MEMORY", "1g")},
+}
+# Host share kept back for ELK, the Web app and the OS
+LAB_RESERVED_CPUS = float(os.getenv("LAB_RESERVED_CPUS", "2"))
+LAB_RESERVED_MEMORY = os.getenv("LAB_RESERVED_MEMORY", "6g")
+# CPU limits are caps, not reservations; mostly idle labs can share cores
+LAB_CPU_OVERCOMMIT = float(os.getenv("LAB_CPU_OVERCOMMIT", "4"))
+# Explicit budgets override the values derived from the Docker host
+LAB_CPU_BUDGET = os.getenv("LAB_CPU_BUDGET")
+LAB_MEMORY_BUDGET = os.getenv("LAB_MEMORY_BUDGET")
+# ES_HOSTS written here by 'ELK/make.py install --nodes N'
+MACHINES_ENV_PATH = ".env"
+
+beats_base_lock = threading.Lock()
+
 
 def get_system_architecture():
     """Detect system architecture and return corresponding beat architecture identifier"""
@@ -47,15 +174,194 @@ def select_path(paths):
     return paths[int(choice) - 1]
 
 
-def build_image(path, image_prefix):
-    # Get system architecture
-    arch = get_system_architecture()
-
+def image_tag(path, image_prefix):
     # Convert tag to lowercase
     if image_prefix == "attacker":
-        tag = f"{image_prefix}-kali-{os.path.basename(path)}".lower()
-    else:
-        tag = f"{image_prefix}-{os.path.basename(path)}".lower()
+        return f"{image_prefix}-kali-{os.path.basename(path)}".lower()
+    return f"{image_prefix}-{os.path.basename(path)}".lower()
+
+
+def artifact_name(beat, arch):
+    return f"{beat}-{BEATS_VERSION}-linux-{arch}.tar.gz"
+
+
+def file_sha512(path):
+    digest = hashlib.sha512()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fetch_artifact(beat, name, dest):
+    """Copy or download name (and its .sha512) from the mirror into dest"""
+    mirror = ARTIFACT_MIRROR
+    if mirror.startswith("file://"):
+        mirror = mirror[len("file://") :]
+    if os.path.isdir(mirror):
+        # Offline: accept a flat directory or the artifacts.elastic.co layout
+        for src_dir in (mirror, os.path.join(mirror, beat)):
+            src = os.path.join(src_dir, name)
+            if os.path.exists(src):
+                shutil.copyfile(src, dest)
+                return
+        raise FileNotFoundError(f"{name} not found in {mirror}")
+    url = f"{mirror.rstrip('/')}/{beat}/{name}"
+    print(f"[*] Downloading {url}")
+    with urllib.request.urlopen(url, timeout=60) as response, open(dest, "wb") as f:
+        shutil.copyfileobj(response, f, 1024 * 1024)
+
+
+def ensure_artifacts(arch):
+    """Make sure the verified beats tarballs for arch are in the local cache"""
+    cache_dir = os.path.join(ARTIFACT_CACHE, arch)
+    os.makedirs(cache_dir, exist_ok=True)
+    checksums = {}
+    for beat in BEATS:
+        name = artifact_name(beat, arch)
+        path = os.path.join(cache_dir, name)
+        checksum_path = f"{path}.sha512"
+        if not os.path.exists(checksum_path):
+            fetch_artifact(beat, f"{name}.sha512", f"{checksum_path}.part")
+            os.replace(f"{checksum_path}.part", checksum_path)
+        with open(checksum_path, "r", encoding="utf-8") as f:
+            expected = f.read().split()[0].lower()
+
+        if os.path.exists(path) and file_sha512(path) == expected:
+            print(f"[=] Cached {name}")
+        else:
+            fetch_artifact(beat, name, f"{path}.part")
+            actual = file_sha512(f"{path}.part")
+            if actual != expected:
+                os.remove(f"{path}.part")
+                raise ValueError(f"Checksum mismatch for {name}")
+            os.replace(f"{path}.part", path)
+            print(f"[+] Cached {name} (sha512 verified)")
+        checksums[name] = expected
+    return cache_dir, checksums
+
+
+def image_label(tag, label):
+    """Value of a label on a local image; None if the image does not exist"""
+    result = subprocess.run(
+        [
+            "docker",
+            "image",
+            "inspect",
+            "-f",
+            f'{{{{index .Config.Labels "{label}"}}}}',
+            tag,
+        ],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        return None
+    return result.stdout.strip()
+
+
+def beats_image_tag(arch):
+    return f"{BEATS_IMAGE}:{BEATS_VERSION}-{arch}"
+
+
+def ensure_beats_base(arch):
+    """Build the beats base image from the artifact cache unless it is current"""
+    with beats_base_lock:
+        cache_dir, checksums = ensure_artifacts(arch)
+        tag = beats_image_tag(arch)
+        fingerprint = hashlib.sha256(
+            json.dumps(checksums, sort_keys=True).encode()
+        ).hexdigest()
+        if image_label(tag, "lnadlse.artifacts") == fingerprint:
+            print(f"[=] Beats base image {tag} is up to date")
+            return tag
+        print(f"[*] Building beats base image {tag}")
+        subprocess.run(
+            [
+                "docker",
+                "build",
+                "-t",
+                tag,
+                "--build-arg",
+                f"BEATS_VERSION={BEATS_VERSION}",
+                "--build-arg",
+                f"BEATS_ARCH={arch}",
+                "--label",
+                f"lnadlse.artifacts={fingerprint}",
+                "-f",
+                os.path.abspath(BEATS_DOCKERFILE),
+                cache_dir,
+            ],
+            check=True,
+        )
+        return tag
+
+
+def fetch_artifacts(arch=None):
+    """Populate the artifact cache, e.g. before moving it to an offline host"""
+    arch = arch or get_system_architecture()
+    try:
+        cache_dir, _ = ensure_artifacts(arch)
+    except Exception as e:
+        print(f"[!] Error fetching artifacts: {str(e)}")
+        return False
+    print(f"[*] Artifacts for {arch} cached in {cache_dir}")
+    return True
+
+
+def build_context_hash(path, dockerfile_content, arch):
+    """Hash of every file in the build context, the final Dockerfile and arch"""
+    digest = hashlib.sha256()
+    digest.update(arch.encode())
+    digest.update(dockerfile_content.encode())
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            if name in ("Dockerfile", "Dockerfile.temp"):
+                continue
+            file_path = os.path.join(root, name)
+            digest.update(os.path.relpath(file_path, path).encode())
+            with open(file_path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_beats_profiles(directory):
+    """Render every beats profile as a YAML override file into directory"""
+    os.makedirs(directory, exist_ok=True)
+    for name, settings in BEATS_PROFILES.items():
+        with open(os.path.join(directory, f"{name}.yml"), "w", encoding="utf-8") as f:
+            f.write(f"# Generated by Machines/make.py: beats profile '{name}'\n")
+            for key, value in sorted(settings.items()):
+                f.write(f"{key}: {value}\n")
+    # Index naming; with BEATS_INDEX_INFIX unset these are the beats defaults
+    for beat in BEATS:
+        index = BEATS_INDEX_TEMPLATE.format(beat=beat)
+        with open(os.path.join(directory, f"index-{beat}.yml"), "w", encoding="utf-8") as f:
+            f.write(f"# Generated by Machines/make.py: {beat} index per lab tenant\n")
+            f.write(f'output.elasticsearch.index: "{index}"\n')
+            f.write(f'setup.template.name: "{index}"\n')
+            f.write(f'setup.template.pattern: "{index}"\n')
+
+
+def list_profiles():
+    for name, settings in BEATS_PROFILES.items():
+        default = " (default)" if name == DEFAULT_BEATS_PROFILE else ""
+        print(f"{name}{default}")
+        for key, value in settings.items():
+            print(f"    {key}: {value}")
+
+
+def build_image(
+    path, image_prefix, arch=None, log_path=None, force=False, beats_profile=None
+):
+    """Build one image; return "rebuilt", "up to date" or False on failure"""
+    # Get system architecture
+    arch = arch or get_system_architecture()
+    beats_profile = beats_profile or DEFAULT_BEATS_PROFILE
+
+    tag = image_tag(path, image_prefix)
     dockerfile_path = os.path.join(path, "Dockerfile")
 
     # Check if Dockerfile exists
@@ -65,26 +371,48 @@ def build_image(path, image_prefix):
 
     # Create temporary Dockerfile
     temp_dockerfile = os.path.join(path, "Dockerfile.temp")
+    profile_dir = os.path.join(path, BEATS_PROFILE_DIR)
     try:
         with open(dockerfile_path, "r", encoding="utf-8") as f:
             content = f.read()
 
-        # Replace packetbeat architecture
-        content = content.replace(
-            "packetbeat-9.0.0-linux-replacearch", f"packetbeat-9.0.0-linux-{arch}"
-        )
-        content = content.replace(
-            "filebeat-9.0.0-linux-replacearch", f"filebeat-9.0.0-linux-{arch}"
-        )
+        # Replace beats architecture (tarball paths and base image tag)
+        content = content.replace("replacearch", arch)
+        if BEATS_PROFILE_DIR in content:
+            # Generated before hashing so profile changes trigger a rebuild
+            content = content.replace("replaceprofile", beats_profile)
+            write_beats_profiles(profile_dir)
+        build_hash = build_context_hash(path, content, arch)
+        if not force and image_label(tag, BUILD_HASH_LABEL) == build_hash:
+            print(f"[=] Image {tag} is up to date")
+            return "up to date"
+        if BEATS_IMAGE in content:
+            ensure_beats_base(arch)
 
         with open(temp_dockerfile, "w", encoding="utf-8") as f:
             f.write(content)
 
         print(f"[*] Building image: {tag} for architecture: {arch}")
-        subprocess.run(
-            ["docker", "build", "-t", tag, path, "-f", temp_dockerfile], check=True
-        )
-        return True
+        labels = [
+            "--label",
+            "lnadlse.cluster=simulation",
+            "--label",
+            f"lnadlse.role={LAB_LABELS.get(image_prefix, image_prefix)}",
+            "--label",
+            f"{BUILD_HASH_LABEL}={build_hash}",
+        ]
+        cmd = ["docker", "build", "-t", tag, *labels, path, "-f", temp_dockerfile]
+        if log_path is None:
+            subprocess.run(cmd, check=True)
+        else:
+            # Plain BuildKit progress keeps the log readable when not on a TTY
+            env = dict(os.environ, DOCKER_BUILDKIT="1")
+            cmd.insert(2, "--progress=plain")
+            with open(log_path, "w", encoding="utf-8") as log:
+                subprocess.run(
+                    cmd, stdout=log, stderr=subprocess.STDOUT, env=env, check=True
+                )
+        return "rebuilt"
     except Exception as e:
         print(f"[!] Error building image: {str(e)}")
         return False
@@ -92,6 +420,8 @@ def build_image(path, image_prefix):
         # Clean up temporary file
         if os.path.exists(temp_dockerfile):
             os.remove(temp_dockerfile)
+        if os.path.isdir(profile_dir):
+            shutil.rmtree(profile_dir)
 
 
 def ensure_network():
@@ -111,7 +441,7 @@ def ensure_network():
         print(f"[*] Docker network {DOCKER_NETWORK} already exists")
 
 
-def install():
+def install(force=False, beats_profile=None):
     ensure_network()
 
     print("Select what to build:")
@@ -132,7 +462,9 @@ def install():
         print("[*] Building default images (Nginx + noVNC Kali)...")
         success = True
         for prefix, path in DEFAULT_BUILDS.items():
-            if not build_image(path, prefix):
+            if not build_image(
+                path, prefix, force=force, beats_profile=beats_profile
+            ):
                 success = False
                 print(f"[!] Failed to build {prefix} image")
         if not success:
@@ -154,7 +486,9 @@ def install():
             print(f"[!] No Dockerfiles found in {path}")
             continue
         selected = select_path(docker_paths)
-        if selected and not build_image(selected, prefix):
+        if selected and not build_image(
+            selected, prefix, force=force, beats_profile=beats_profile
+        ):
             success = False
             print(f"[!] Failed to build {prefix} image")
 
@@ -162,6 +496,95 @@ def install():
         print("[!] Some images failed to build, please check error messages")
 
 
+def tail_file(path, lines=20):
+    try:
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            return f.readlines()[-lines:]
+    except OSError:
+        return []
+
+
+def install_all(jobs, force=False, beats_profile=None):
+    """Build every Targeted and Attacker image concurrently with BuildKit"""
+    ensure_network()
+    arch = get_system_architecture()
+    builds = [
+        (prefix, path)
+        for prefix, key in (("targeted", "Targeted"), ("attacker", "Attacker"))
+        for path in sorted(find_docker_builds(BASE_DIRS[key]))
+    ]
+    if not builds:
+        print("[!] No Dockerfiles found")
+        return False
+
+    os.makedirs(BUILD_LOG_DIR, exist_ok=True)
+    jobs = max(1, min(jobs, len(builds)))
+    print(f"[*] Building {len(builds)} images with {jobs} parallel jobs")
+    print(f"[*] Build logs: {os.path.abspath(BUILD_LOG_DIR)}")
+
+    started = time.monotonic()
+    lock = threading.Lock()
+    running = {}
+    results = {}
+    finished = threading.Event()
+
+    def run(prefix, path):
+        tag = image_tag(path, prefix)
+        log_path = os.path.join(BUILD_LOG_DIR, f"{tag}.log")
+        with lock:
+            running[tag] = time.monotonic()
+        status = build_image(
+            path,
+            prefix,
+            arch=arch,
+            log_path=log_path,
+            force=force,
+            beats_profile=beats_profile,
+        )
+        with lock:
+            elapsed = time.monotonic() - running.pop(tag)
+            results[tag] = (status, elapsed, log_path)
+        return tag
+
+    def report_progress():
+        while not finished.wait(PROGRESS_INTERVAL):
+            with lock:
+                now = time.monotonic()
+                active = ", ".join(
+                    f"{tag} {now - since:.0f}s" for tag, since in running.items()
+                )
+                done = len(results)
+            print(
+                f"[*] {done}/{len(builds)} done, {now - started:.0f}s elapsed"
+                + (f" | building: {active}" if active else "")
+            )
+
+    progress = threading.Thread(target=report_progress, daemon=True)
+    progress.start()
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(run, prefix, path) for prefix, path in builds]
+        for future in as_completed(futures):
+            tag = future.result()
+            status, elapsed, log_path = results[tag]
+            marker = {"rebuilt": "+", "up to date": "="}.get(status, "!")
+            print(f"[{marker}] {tag} {status or 'FAILED'} in {elapsed:.1f}s")
+            if not status:
+                for line in tail_file(log_path):
+                    print(f"    {line.rstrip()}")
+    finished.set()
+
+    wall = time.monotonic() - started
+    serial = sum(elapsed for _, elapsed, _ in results.values())
+    print(f"[*] Build summary ({wall:.1f}s wall, {serial:.1f}s summed build time):")
+    for tag in sorted(results):
+        status, elapsed, log_path = results[tag]
+        print(f"    {tag:<24} {status or 'FAILED':<10} {elapsed:7.1f}s  {log_path}")
+    failed = [tag for tag, (status, _, _) in results.items() if not status]
+    if failed:
+        print(f"[!] {len(failed)} image(s) failed: {', '.join(sorted(failed))}")
+    return not failed
+
+
 def create_network():
     print(f"[*] Checking Docker network '{DOCKER_NETWORK}'...")
     result = subprocess.run(["docker", "network", "ls"], capture_output=True, text=True)
@@ -187,13 +610,455 @@ def remove():
     subprocess.run(["docker-compose", "down", "-v"])
 
 
+def parse_size(value):
+    """'256m' / '1g' / bytes -> bytes"""
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([kmgt]?)b?", str(value).strip().lower())
+    if not match:
+        raise ValueError(f"Invalid size: {value}")
+    number, unit = match.groups()
+    return int(float(number) * 1024 ** " kmgt".index(unit or " "))
+
+
+def format_size(size):
+    return f"{size / 1024 ** 3:.1f}GiB"
+
+
+def host_resources():
+    """(cpus, memory bytes) of the Docker host, which may be a VM"""
+    try:
+        output = subprocess.check_output(
+            ["docker", "info", "--format", "{{.NCPU}} {{.MemTotal}}"], text=True
+        )
+        cpus, memory = output.split()
+        return int(cpus), int(memory)
+    except (OSError, subprocess.CalledProcessError, ValueError):
+        return os.cpu_count() or 1, os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+
+
+def load_labs():
+    if not os.path.exists(LAB_REGISTRY):
+        return {}
+    with open(LAB_REGISTRY, encoding="utf-8") as f:
+        return json.load(f)
+
+
+@contextlib.contextmanager
+def registry_lock():
+    """Exclusive lock so concurrent 'lab' commands never share a slot"""
+    os.makedirs(LABS_DIR, exist_ok=True)
+    with open(LAB_REGISTRY_LOCK, "a+") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def save_labs(labs):
+    os.makedirs(LABS_DIR, exist_ok=True)
+    temp_path = f"{LAB_REGISTRY}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(labs, f, indent=2, sort_keys=True)
+    # Readers (the Web app) never see a half-written registry
+    os.replace(temp_path, LAB_REGISTRY)
+
+
+def lab_capacity(labs):
+    """CPU and memory budgets for labs and how much is already placed"""
+    cpus, memory = host_resources()
+    cpu_budget = (
+        float(LAB_CPU_BUDGET)
+        if LAB_CPU_BUDGET
+        else max(0.0, cpus - LAB_RESERVED_CPUS) * LAB_CPU_OVERCOMMIT
+    )
+    memory_budget = (
+        parse_size(LAB_MEMORY_BUDGET)
+        if LAB_MEMORY_BUDGET
+        else max(0, memory - parse_size(LAB_RESERVED_MEMORY))
+    )
+    return {
+        "host_cpus": cpus,
+        "host_memory": memory,
+        "cpu_budget": cpu_budget,
+        "memory_budget": memory_budget,
+        "cpu_used": sum(lab["cpus"] for lab in labs.values()),
+        "memory_used": sum(lab["memory"] for lab in labs.values()),
+    }
+
+
+def lab_request(attacker):
+    """(cpus, memory bytes) one lab asks for"""
+    roles = ["target"] + (["attacker"] if attacker else [])
+    return (
+        sum(LAB_SIZES[role]["cpus"] for role in roles),
+        sum(parse_size(LAB_SIZES[role]["memory"]) for role in roles),
+    )
+
+
+def schedule_lab(labs, attacker):
+    """Pick a port slot for a new lab, or return an error if it does not fit"""
+    cpus, memory = lab_request(attacker)
+    capacity = lab_capacity(labs)
+    if capacity["cpu_used"] + cpus > capacity["cpu_budget"]:
+        return None, (
+            f"CPU budget exhausted: {capacity['cpu_used']:g} of "
+            f"{capacity['cpu_budget']:g} CPUs placed, lab needs {cpus:g}"
+        )
+    if capacity["memory_used"] + memory > capacity["memory_budget"]:
+        return None, (
+            f"memory budget exhausted: {format_size(capacity['memory_used'])} of "
+            f"{format_size(capacity['memory_budget'])} placed, lab needs {format_size(memory)}"
+        )
+    used = {lab["slot"] for lab in labs.values()}
+    slot = next(index for index in range(len(used) + 1) if index not in used)
+    return slot, None
+
+
+def elk_containers():
+    """(container, service) for the running ES nodes and Kibana"""
+    try:
+        output = subprocess.check_output(
+            [
+                "docker",
+                "ps",
+                "--filter",
+                "label=lnadlse.cluster=elk",
+                "--format",
+                '{{.Names}} {{.Label "com.docker.compose.service"}} {{.Label "lnadlse.role"}}',
+            ],
+            text=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return []
+    containers = []
+    for line in output.splitlines():
+        name, service, role = (line.split() + ["", "", ""])[:3]
+        if role in ("elasticsearch", "kibana"):
+            containers.append((name, service))
+    return containers
+
+
+def connect_elk(network):
+    """Attach ES and Kibana to a lab network under their compose service names"""
+    containers = elk_containers()
+    if not containers:
+        print("[!] ELK is not running; start it and run 'make.py lab create' again")
+        return False
+    for container, service in containers:
+        result = subprocess.run(
+            ["docker", "network", "connect", "--alias", service, network, container],
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0 and "already exists" not in result.stderr:
+            print(f"[!] Failed to connect {container} to {network}: {result.stderr.strip()}")
+            return False
+    return True
+
+
+def disconnect_elk(network):
+    for container, _ in elk_containers():
+        subprocess.run(
+            ["docker", "network", "disconnect", "-f", network, container],
+            capture_output=True,
+        )
+
+
+def es_hosts():
+    """Elasticsearch URLs for the beats (all nodes after ELK install --nodes)"""
+    if os.path.exists(MACHINES_ENV_PATH):
+        with open(MACHINES_ENV_PATH, encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("ES_HOSTS=") and line.split("=", 1)[1].strip():
+                    return line.split("=", 1)[1].strip()
+    return "https://es01:9200"
+
+
+def lab_compose(tenant, lab):
+    """Compose project for one lab (JSON, which compose reads as YAML)"""
+    project = f"lab-{tenant}"
+    base_port = LAB_PORT_BASE + lab["slot"] * LAB_PORTS_PER_SLOT
+    services = {}
+    machines = [("target", "targeted", lab["target"])]
+    if lab["attacker"]:
+        machines.append(("attacker", "attacker", lab["attacker"]))
+    for role, image_prefix, kind in machines:
+        name = f"{project}-{role}-{kind}"
+        service = {
+            "image": image_tag(kind.replace("kali-", ""), image_prefix),
+            "container_name": name,
+            # Beats report this as host.name, so every tenant's data is distinct
+            "hostname": name,
+            "labels": {
+                "lnadlse.cluster": "lab",
+                "lnadlse.role": role,
+                "lnadlse.tenant": tenant,
+            },
+            "networks": ["lab"],
+            "ports": [
+                f"{base_port + LAB_PORT_OFFSETS[port]}:{port}"
+                for port in LAB_IMAGE_PORTS[kind]
+            ],
+            "cpus": LAB_SIZES[role]["cpus"],
+            "mem_limit": LAB_SIZES[role]["memory"],
+        }
+        if role == "target":
+            service["environment"] = {
+                "ES_HOSTS": es_hosts(),
+                "BEATS_INDEX_INFIX": f"{tenant}-",
+            }
+        else:
+            service.update(
+                privileged=True,
+                cap_add=["net_admin"],
+                tmpfs=["/run", "/tmp"],
+                security_opt=["label:disable"],
+                volumes=["/dev/net:/dev/net:z", "./data:/data"],
+            )
+        services[role] = service
+    return {
+        "name": project,
+        "services": services,
+        "networks": {
+            "lab": {
+                "name": project,
+                "driver": "bridge",
+                "labels": {"lnadlse.tenant": tenant},
+            }
+        },
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def get_docker_compose_command():
+    """'docker compose' plugin if installed, else standalone docker-compose"""
+    for command in (["docker", "compose"], ["docker-compose"]):
+        try:
+            subprocess.run(command + ["version"], capture_output=True, check=True)
+            return command
+        except (OSError, subprocess.CalledProcessError):
+            continue
+    raise SystemExit(
+        "[!] Neither 'docker compose' plugin nor 'docker-compose' command found"
+    )
+
+
+def lab_compose_command(tenant, *args):
+    return get_docker_compose_command() + [
+        "-p",
+        f"lab-{tenant}",
+        "-f",
+        os.path.join(LABS_DIR, tenant, "docker-compose.json"),
+        *args,
+    ]
+
+
+def lab_create(tenant, target=None, attacker=None):
+    """Place, generate and start one tenant's lab.
+
+    Re-running it for an existing tenant restarts that lab; a different
+    target or attacker is refused (remove the lab first). A new lab is only
+    recorded in the registry once it is up and attached to ELK, so a failed
+    create leaves no slot or budget behind.
+    """
+    if not LAB_NAME_PATTERN.fullmatch(tenant):
+        print("[!] Tenant names are 1-20 characters of a-z, 0-9 and '-'")
+        return False
+    with registry_lock():
+        labs = load_labs()
+        lab = labs.get(tenant)
+        if lab is not None:
+            for option, value in (("target", target), ("attacker", attacker)):
+                if value is not None and value != lab[option]:
+                    print(
+                        f"[!] Lab '{tenant}' exists with {option} {lab[option] or 'none'}; "
+                        f"run 'make.py lab remove {tenant}' first to change it"
+                    )
+                    return False
+            return start_lab(tenant, lab, labs, created=False)
+        target = target or "nginx"
+        slot, error = schedule_lab(labs, attacker)
+        if error:
+            print(f"[!] Cannot place lab '{tenant}': {error}")
+            return False
+        cpus, memory = lab_request(attacker)
+        lab = {
+            "slot": slot,
+            "target": target,
+            "attacker": attacker,
+            "cpus": cpus,
+            "memory": memory,
+            "network": f"lab-{tenant}",
+            "index_prefix": {beat: f"{beat}-{tenant}-" for beat in BEATS},
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        }
+        return start_lab(tenant, lab, labs, created=True)
+
+
+def start_lab(tenant, lab, labs, created):
+    """Write the compose project and bring it up; called with the registry lock"""
+    base_port = LAB_PORT_BASE + lab["slot"] * LAB_PORTS_PER_SLOT
+    compose = lab_compose(tenant, lab)
+    lab["containers"] = [s["container_name"] for s in compose["services"].values()]
+    lab["ports"] = {
+        f"{role}:{port}": base_port + LAB_PORT_OFFSETS[port]
+        for role, service in compose["services"].items()
+        for port in (mapping.split(":")[1] for mapping in service["ports"])
+    }
+
+    lab_dir = os.path.join(LABS_DIR, tenant)
+    os.makedirs(os.path.join(lab_dir, "data"), exist_ok=True)
+    with open(os.path.join(lab_dir, "docker-compose.json"), "w", encoding="utf-8") as f:
+        json.dump(compose, f, indent=2)
+
+    print(f"[*] Starting lab '{tenant}' (slot {lab['slot']}, ports {base_port}-{base_port + LAB_PORTS_PER_SLOT - 1})")
+    started = subprocess.run(lab_compose_command(tenant, "up", "-d")).returncode == 0
+    if not started:
+        print(f"[!] Failed to start lab '{tenant}'")
+    if not (started and connect_elk(lab["network"])):
+        if created:
+            # Leave nothing behind that would hold the slot, ports or budget
+            teardown_lab(tenant, lab)
+        return False
+
+    labs[tenant] = lab
+    save_labs(labs)
+    for key, port in sorted(lab["ports"].items()):
+        print(f"    {key:<16} -> localhost:{port}")
+    print(f"[+] Lab '{tenant}' running; beats write to packetbeat-{tenant}-* and filebeat-{tenant}-*")
+    return True
+
+
+def teardown_lab(tenant, lab):
+    # The network can only be removed once ES and Kibana have left it
+    disconnect_elk(lab["network"])
+    if subprocess.run(lab_compose_command(tenant, "down", "-v")).returncode != 0:
+        return False
+    shutil.rmtree(os.path.join(LABS_DIR, tenant), ignore_errors=True)
+    return True
+
+
+def lab_remove(tenant):
+    with registry_lock():
+        labs = load_labs()
+        lab = labs.get(tenant)
+        if lab is None:
+            print(f"[!] No lab named '{tenant}'")
+            return False
+        print(f"[*] Removing lab '{tenant}'...")
+        if not teardown_lab(tenant, lab):
+            print(f"[!] Failed to remove lab '{tenant}'")
+            return False
+        del labs[tenant]
+        save_labs(labs)
+    print(f"[+] Lab '{tenant}' removed")
+    return True
+
+
+def lab_list():
+    labs = load_labs()
+    capacity = lab_capacity(labs)
+    for tenant, lab in sorted(labs.items()):
+        machines = lab["target"] + (f" + {lab['attacker']}" if lab["attacker"] else "")
+        ports = ", ".join(f"{key}={port}" for key, port in sorted(lab["ports"].items()))
+        print(f"{tenant:<20} slot {lab['slot']:<3} {machines:<24} {ports}")
+    print(
+        f"[*] {len(labs)} labs, CPU {capacity['cpu_used']:g}/{capacity['cpu_budget']:g}, "
+        f"memory {format_size(capacity['memory_used'])}/{format_size(capacity['memory_budget'])}"
+    )
+
+
+def lab(args):
+    if args.lab_action == "create":
+        return lab_create(args.tenant, args.target, args.attacker)
+    if args.lab_action == "remove":
+        tenants = sorted(load_labs()) if args.all else [args.tenant]
+        return all([lab_remove(tenant) for tenant in tenants])
+    lab_list()
+    return True
+
+
 def main():
     import argparse
 
     parser = argparse.ArgumentParser()
-    parser.add_argument("action", choices=["install", "start", "stop", "remove"])
+    parser.add_argument(
+        "action",
+        choices=["install", "start", "stop", "remove", "artifacts", "profiles", "lab"],
+    )
+    parser.add_argument(
+        "lab_action",
+        nargs="?",
+        choices=["create", "remove", "list"],
+        help="lab: what to do with a tenant's lab",
+    )
+    parser.add_argument("tenant", nargs="?", help="lab: tenant (student or team) name")
+    parser.add_argument(
+        "--all",
+        action="store_true",
+        help="install: build every image non-interactively; lab remove: every lab",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=min(4, os.cpu_count() or 1),
+        help="install --all: number of images built in parallel",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="install: rebuild images even if their build hash is unchanged",
+    )
+    parser.add_argument(
+        "--beats-profile",
+        choices=sorted(BEATS_PROFILES),
+        help="install: beats profile the target images use by default",
+    )
+    parser.add_argument(
+        "--arch",
+        choices=["x86_64", "arm64"],
+        help="artifacts: architecture to cache (default: this host)",
+    )
+    parser.add_argument(
+        "--target",
+        choices=["nginx", "httpd"],
+        help="lab create: target machine (default: nginx, or the existing lab's)",
+    )
+    parser.add_argument(
+        "--attacker",
+        choices=["kali-novnc", "kali-xrdp", "kali-x11"],
+        help="lab create: attacker machine (default: none, attack from elsewhere)",
+    )
     args = parser.parse_args()
 
+    if args.action == "lab":
+        if args.lab_action is None:
+            parser.error("lab needs one of: create, remove, list")
+        if args.lab_action in ("create", "remove") and not args.tenant and not (
+            args.lab_action == "remove" and args.all
+        ):
+            parser.error(f"lab {args.lab_action} needs a tenant name")
+        sys.exit(0 if lab(args) else 1)
+    if args.action == "artifacts":
+        sys.exit(0 if fetch_artifacts(args.arch) else 1)
+    if args.action == "install" and args.all:
+        ok = install_all(args.jobs, force=args.force, beats_profile=args.beats_profile)
+        sys.exit(0 if ok else 1)
+    if args.action == "install":
+        install(force=args.force, beats_profile=args.beats_profile)
+        return
+    if args.action == "profiles":
+        list_profiles()
+        return
+
     actions = {"install": install, "start": start, "stop": stop, "remove": remove}
 
     actions[args.action]()
@@ -1,298 +1,364 @@
+import functools
+import json
 import os
 import re
 import subprocess
 import sys
+import threading
 import time
 
-import docker
-import requests
 from dotenv import load_dotenv
-from flask import Flask, jsonify, render_template, request
-from requests.exceptions import RequestException
+from flask import Blueprint, Flask, Response, current_app, jsonify, render_template, request
+
+from events import STREAM_HEARTBEAT, EventBroker, diff_state, format_sse
+from jobs import JobError, JobManager, run_command
+from metrics import WINDOWS, AttackMetrics, MetricsError
 
 # Load environment variables
 load_dotenv()
 
-app = Flask(__name__)
-
 # Get Elasticsearch password
 ELASTIC_PASSWORD = os.getenv("ELASTIC_PASSWORD", "changeme")
-app.config["TEMPLATES_AUTO_RELOAD"] = True
-
-
-def get_docker_socket_path():
-    """Get Docker socket path"""
-    # Check different platforms and tools
-    socket_paths = {
-        "darwin": [
-            "~/.orbstack/run/docker.sock",  # OrbStack
-            "/var/run/docker.sock",  # Docker Desktop
-            "~/.docker/run/docker.sock",  # Colima
-        ],
-        "linux": [
-            "/var/run/docker.sock",  # Standard Linux
-            "/run/user/1000/docker.sock",  # User-level Docker
-        ],
-        "win32": [
-            "//./pipe/docker_engine",  # Windows Docker Desktop
-        ],
-    }
-
-    # Get current platform
-    platform = sys.platform
-    if platform not in socket_paths:
-        platform = "linux"  # Default to Linux path
 
-    # Check all possible paths
-    for path in socket_paths[platform]:
-        if os.path.exists(path):
-            return path
+bp = Blueprint("lab", __name__)
+
+
+class LabServices:
+    """Docker, inventory, Elasticsearch and background workers for one app.
+
+    Nothing here touches the Docker socket or Elasticsearch until a route
+    needs it: the first ``start()`` imports the client modules, builds the
+    components, wires the inventory listeners and starts the background
+    threads, once, under a lock. ``init_ms`` records how long that took.
+    The job queue and the push broker are plain in-process objects and are
+    created with the app.
+    """
+
+    def __init__(self, elastic_password, lifecycle_workers=1):
+        self.elastic_password = elastic_password
+        # Dashboard push channel (/api/stream)
+        self.broker = EventBroker()
+        self.published_state = {"containers": {}, "networks": {}, "labs": []}
+        self.publish_lock = threading.Lock()
+        # Background jobs for lab lifecycle operations
+        self.jobs = JobManager(max_workers=lifecycle_workers)
+        self.started = False
+        self.init_ms = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        if self.started:
+            return self
+        with self._lock:
+            if self.started:
+                return self
+            began = time.perf_counter()
+            # Imported here so loading the app does not pull in docker/requests
+            from container_stats import STATS_POOL_SIZE, StatsCollector
+            from detector import SlowlorisDetector
+            from docker_client import SharedDockerClient, docker_client
+            from elk_health import ElkHealthMonitor
+            from es_pool import EsNodePool
+            from inventory import ContainerInventory
+
+            self.docker_client = docker_client
+            # Container/network inventory kept current from the Docker event stream
+            self.inventory = ContainerInventory(docker_client)
+            self.inventory.add_listener(self.publish_inventory_changes)
+            # Per-container CPU/memory/network history; the long-lived stats
+            # streams get their own client so they never tie up the route pool
+            self.stats_collector = StatsCollector(
+                SharedDockerClient(pool_size=STATS_POOL_SIZE, timeout=None),
+                self.inventory,
+                publish=self.broker.publish,
+            )
+            self.inventory.add_listener(self.stats_collector.sync)
+            # Requests to Elasticsearch rotate over all nodes (make.py install --nodes)
+            self.es_pool = EsNodePool(
+                self.resolve_es_hosts, ("elastic", self.elastic_password)
+            )
+            # ELK readiness probed in the background over keep-alive sessions
+            self.elk_monitor = ElkHealthMonitor(
+                self.resolve_elk_host, self.elastic_password, es_pool=self.es_pool
+            )
+            self.inventory.add_listener(self.refresh_elk_health)
+            # Per-target aggregations, cached per time bucket and shared by all viewers
+            self.attack_metrics = AttackMetrics(self.es_pool)
+            # Live Slowloris detection; alerts are pushed to /api/stream clients
+            self.detector = SlowlorisDetector(self.es_pool, self.broker.publish)
+
+            self.inventory.start()
+            self.stats_collector.start()
+            self.elk_monitor.start()
+            self.detector.start()
+            self.init_ms = round((time.perf_counter() - began) * 1000, 1)
+            print(f"Lab services started in {self.init_ms}ms")
+            self.started = True
+        return self
+
+    def publish_inventory_changes(self, *_):
+        """Diff the inventory against what clients have seen and push the changes"""
+        with self.publish_lock:
+            current = {
+                "containers": {
+                    record["short_id"]: format_container(record)
+                    for record in self.inventory.containers()
+                },
+                "networks": {
+                    network["id"]: network for network in self.inventory.networks()
+                },
+            }
+            for name, items in current.items():
+                diff = diff_state(self.published_state[name], items)
+                if diff:
+                    self.broker.publish(name, diff)
+                self.published_state[name] = items
+        self.publish_labs()
+
+    def publish_labs(self):
+        """Push the tenant labs whenever the registry or their containers change"""
+        with self.publish_lock:
+            labs = lab_records(load_lab_registry(), self.inventory)
+            if labs != self.published_state["labs"]:
+                self.broker.publish("labs", labs)
+                self.published_state["labs"] = labs
+
+    def resolve_elk_host(self, container_name):
+        """Get the address used to reach an ELK container"""
+        if sys.platform == "win32":
+            return "localhost"
+        record = self.inventory.get(container_name)
+        if record is None:
+            return None
+        ip = record["ip_addresses"].get("elk_net")
+        return ip if ip and ip != "N/A" else None
+
+    def resolve_es_hosts(self):
+        """Addresses of every running Elasticsearch node in the ELK cluster"""
+        if sys.platform == "win32":
+            return ["localhost"]
+        hosts = []
+        for record in self.inventory.by_cluster("elk"):
+            if record["role"] != "elasticsearch" or record["status"] != "running":
+                continue
+            ip = record["ip_addresses"].get("elk_net")
+            if ip and ip != "N/A":
+                hosts.append(ip)
+        return hosts
 
-    # If no socket found, return default path
-    return socket_paths[platform][0]
+    def refresh_elk_health(self, kind, action, record):
+        """Re-probe as soon as an ELK container changes state"""
+        if record is None or record["cluster"] == "elk":
+            self.elk_monitor.refresh()
 
 
-def init_docker_client():
-    """Initialize Docker client"""
-    try:
-        socket_path = get_docker_socket_path()
-        client = docker.DockerClient(base_url=f"unix://{socket_path}")
-        # Test connection
-        client.ping()
-        return client
-    except Exception as e:
-        print(f"Docker client initialization failed: {str(e)}")
-        return None
+def lab():
+    """The current app's services, started on first use"""
+    return current_app.extensions["lab"].start()
 
 
-# Initialize Docker client
-try:
-    client = init_docker_client()
-except Exception as e:
-    print(f"Docker client initialization failed: {str(e)}")
-    client = None
+def create_app(config=None):
+    """Build the Flask app; Docker and Elasticsearch are connected lazily"""
+    app = Flask(__name__)
+    app.config["TEMPLATES_AUTO_RELOAD"] = True
+    app.config["ELASTIC_PASSWORD"] = ELASTIC_PASSWORD
+    app.config["LIFECYCLE_WORKERS"] = int(os.getenv("LIFECYCLE_WORKERS", "1"))
+    app.config.update(config or {})
+    app.extensions["lab"] = LabServices(
+        app.config["ELASTIC_PASSWORD"], app.config["LIFECYCLE_WORKERS"]
+    )
+    app.register_blueprint(bp)
+    return app
 
 
-@app.route("/")
+@bp.route("/")
 def index():
     return render_template("index.html")
 
 
-@app.route("/api/networks", methods=["GET"])
+# Define container connection information template
+CONNECTION_TEMPLATES = {
+    "target": {  # Match target-nginx
+        "type": "Web",
+        "url_template": "http://{ip}:80",
+        "credentials": None,
+    },
+    "elk-es": {  # Match elk-es01-1
+        "type": "Web",
+        "url_template": "https://{ip}:9200",
+        "credentials": {"username": "elastic", "password": ELASTIC_PASSWORD},
+    },
+    "elk-kibana": {  # Match elk-kibana-1
+        "type": "Web",
+        "url_template": "http://{ip}:5601",
+        "credentials": {"username": "elastic", "password": ELASTIC_PASSWORD},
+    },
+    "attacker": {  # Match attacker-kali-novnc
+        "type": "Web VNC",
+        "url_template": "http://{ip}:8080/vnc.html",
+        "credentials": {"username": "kali", "password": "kalilinux"},
+    },
+}
+
+
+def get_connection_info(record):
+    """Build connection information for a lab container record"""
+    container_name = record["name"].lower()
+    # Check if container name matches template name (ignoring digit suffix)
+    base_name = "".join(c for c in container_name if not c.isdigit()).rstrip("-")
+    ip_addresses = record["ip_addresses"]
+    for template_name, template in CONNECTION_TEMPLATES.items():
+        if template_name in base_name:
+            # Use IP address from elk_net network (if exists)
+            ip = ip_addresses.get("elk_net", next(iter(ip_addresses.values()), "N/A"))
+            if ip == "N/A":
+                return None
+            return {
+                "type": template["type"],
+                "url": template["url_template"].format(ip=ip),
+                "credentials": template["credentials"],
+            }
+    return None
+
+
+def format_container(record):
+    """Convert an inventory record into the /api/containers payload"""
+    return {
+        "id": record["short_id"],
+        "name": record["name"],
+        "status": record["status"],
+        "image": record["image"],
+        "ip_addresses": record["ip_addresses"],
+        "cluster": record["cluster"],
+        "tenant": record.get("tenant"),
+        "connection": get_connection_info(record),
+    }
+
+
+@bp.route("/api/networks", methods=["GET"])
 def get_networks():
     try:
-        client = docker.from_env()
-        networks = client.networks.list()
-        network_list = []
-
-        # Define related container name prefixes
-        elk_prefixes = ["elk", "elasticsearch", "logstash", "kibana"]
-        simulation_prefixes = ["target", "attacker"]
-
-        # Get all related containers
-        containers = client.containers.list(all=True)
-        relevant_containers = []
-        for container in containers:
-            container_name = container.name.lower()
-            is_elk = any(prefix in container_name for prefix in elk_prefixes)
-            is_simulation = any(
-                prefix in container_name for prefix in simulation_prefixes
-            )
-            if is_elk or is_simulation:
-                relevant_containers.append(container)
-
-        # Get networks related to containers
-        for network in networks:
-            network_containers = []
-            for container in relevant_containers:
-                try:
-                    # Check if container is in this network
-                    container_info = container.attrs
-                    container_networks = container_info.get("NetworkSettings", {}).get(
-                        "Networks", {}
-                    )
-                    if network.name in container_networks:
-                        network_containers.append(
-                            {
-                                "id": container.id[:12],
-                                "name": container.name,
-                                "status": container.status,
-                            }
-                        )
-                except Exception as e:
-                    print(f"Error getting container info: {e}")
-                    continue
-
-            # Only add networks containing relevant containers
-            if network_containers:
-                network_list.append(
-                    {
-                        "id": network.id[:12],
-                        "name": network.name,
-                        "driver": network.attrs["Driver"],
-                        "containers": network_containers,
-                    }
-                )
-
-        return jsonify(network_list)
+        inventory = lab().inventory
+        inventory.ensure_synced()
+        return jsonify(inventory.networks())
     except Exception as e:
         print(f"Error in get_networks: {e}")
         return jsonify({"error": str(e)}), 500
 
 
-@app.route("/api/containers", methods=["GET"])
+@bp.route("/api/containers", methods=["GET"])
 def get_containers():
     try:
-        client = docker.from_env()
-        containers = client.containers.list(all=True)
-        container_list = []
-
-        # Define related container name prefixes
-        elk_prefixes = ["elk", "elasticsearch", "logstash", "kibana"]
-        simulation_prefixes = ["target", "attacker"]
-
-        # Define container connection information template
-        connection_templates = {
-            "target": {  # Match target-nginx
-                "type": "Web",
-                "url_template": "http://{ip}:80",
-                "credentials": None,
-            },
-            "elk-es": {  # Match elk-es01-1
-                "type": "Web",
-                "url_template": "https://{ip}:9200",
-                "credentials": {"username": "elastic", "password": ELASTIC_PASSWORD},
-            },
-            "elk-kibana": {  # Match elk-kibana-1
-                "type": "Web",
-                "url_template": "http://{ip}:5601",
-                "credentials": {"username": "elastic", "password": ELASTIC_PASSWORD},
-            },
-            "attacker": {  # Match attacker-kali-novnc
-                "type": "Web VNC",
-                "url_template": "http://{ip}:8080/vnc.html",
-                "credentials": {"username": "kali", "password": "kalilinux"},
-            },
-        }
-
-        for container in containers:
-            container_name = container.name.lower()
-            is_elk = any(prefix in container_name for prefix in elk_prefixes)
-            is_simulation = any(
-                prefix in container_name for prefix in simulation_prefixes
-            )
-
-            if not (is_elk or is_simulation):
-                continue
-
-            # Get container IP addresses
-            ip_addresses = {}
-            try:
-                container_info = container.attrs
-                networks = container_info.get("NetworkSettings", {}).get("Networks", {})
-                for network_name, network_info in networks.items():
-                    ip_addresses[network_name] = network_info.get("IPAddress", "N/A")
-            except Exception as e:
-                print(f"Error getting container IP: {e}")
-
-            # Determine container cluster
-            cluster = "elk" if is_elk else "simulation"
-
-            # Get connection information
-            connection = None
-            for template_name, template in connection_templates.items():
-                # Check if container name matches template name (ignoring digit suffix)
-                base_name = "".join(
-                    c for c in container_name if not c.isdigit()
-                ).rstrip("-")
-                if template_name in base_name:
-                    print(
-                        f"Found matching template for {container_name}: {template_name}"
-                    )
-                    # Use IP address from elk_net network (if exists)
-                    ip = ip_addresses.get(
-                        "elk_net", next(iter(ip_addresses.values()), "N/A")
-                    )
-                    # platform = sys.platform
-                    # if platform == "win32":
-                    #     ip = "localhost"
-                    if ip != "N/A":
-                        connection = {
-                            "type": template["type"],
-                            "url": template["url_template"].format(ip=ip),
-                            "credentials": template["credentials"],
-                        }
-                        print(f"Generated connection info: {connection}")
-                    else:
-                        print(f"No IP address found for {container_name}")
-                    break
-
-            container_data = {
-                "id": container.id[:12],
-                "name": container.name,
-                "status": container.status,
-                "image": container.image.tags[0]
-                if container.image.tags
-                else container.image.id[:12],
-                "ip_addresses": ip_addresses,
-                "cluster": cluster,
-                "connection": connection,
-            }
-            print(f"Container data: {container_data}")
-            container_list.append(container_data)
-
-        return jsonify(container_list)
+        inventory = lab().inventory
+        inventory.ensure_synced()
+        return jsonify([format_container(record) for record in inventory.containers()])
     except Exception as e:
         print(f"Error in get_containers: {e}")
         return jsonify({"error": str(e)}), 500
 
 
-@app.route("/api/start_elk", methods=["POST"])
-def start_elk():
+@bp.route("/api/stream", methods=["GET"])
+def stream():
     try:
-        # Check if ELK environment is already running
-        client = docker.from_env()
-        elk_containers = [
-            container
-            for container in client.containers.list(all=True)
-            if any(
-                prefix in container.name.lower()
-                for prefix in ["elk", "elasticsearch", "logstash", "kibana"]
-            )
-        ]
-
-        if elk_containers:
-            running_containers = [
-                container
-                for container in elk_containers
-                if container.status == "running"
-            ]
-            if running_containers:
-                return jsonify(
-                    {
-                        "status": "warning",
-                        "message": "ELK Stack is already running",
-                    }
-                )
-
-        # Start ELK environment
-        elk_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "ELK")
-        compose_cmd = get_docker_compose_command()
-        subprocess.run(compose_cmd + ["up", "-d"], cwd=elk_dir, check=True)
-
-        return jsonify(
-            {
-                "status": "success",
-                "message": "ELK Stack started successfully",
-            }
-        )
+        services = lab()
+        services.inventory.ensure_synced()
+        services.publish_inventory_changes()
     except Exception as e:
-        print(f"Error starting ELK Stack: {str(e)}")
-        return jsonify(
-            {"status": "error", "message": f"Error starting ELK Stack: {str(e)}"}
-        ), 500
-
+        print(f"Error in stream: {e}")
+        return jsonify({"error": str(e)}), 500
 
+    # Subscribe under the publish lock so the snapshot and the diffs line up
+    with services.publish_lock:
+        subscription = services.broker.subscribe()
+        snapshot = {
+            "containers": list(services.published_state["containers"].values()),
+            "networks": list(services.published_state["networks"].values()),
+            "alerts": services.detector.alerts()["active"],
+            "stats": services.stats_collector.latest(),
+            "labs": services.published_state["labs"],
+        }
+    return Response(
+        services.broker.stream(subscription, ("snapshot", snapshot)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ELK_DIR = os.path.join(BASE_DIR, "ELK")
+MACHINES_DIR = os.path.join(BASE_DIR, "Machines")
+ELK_COMPOSE_FILE = "docker-compose.yml"
+SIMULATION_COMPOSE_FILE = "docker-compose-simulation.yml"
+# Tenant labs created and placed by 'Machines/make.py lab'
+LAB_REGISTRY = os.path.join(MACHINES_DIR, "labs", "registry.json")
+LAB_NAME_PATTERN = re.compile(r"[a-z0-9][a-z0-9-]{0,19}")
+
+# "native" drives the compose files through the Docker SDK, "cli" shells out
+COMPOSE_DRIVER = os.getenv("LAB_COMPOSE_DRIVER", "native")
+
+TARGET_TYPES = ["nginx", "httpd"]
+ATTACKER_TYPES = ["kali-novnc", "kali-xrdp", "kali-x11"]
+
+
+def submit_job(key, description, func, *args):
+    """Queue a lifecycle job and answer with its id right away"""
+    job, created = current_app.extensions["lab"].jobs.submit(
+        key, description, func, *args
+    )
+    return jsonify(
+        {
+            "status": "accepted",
+            "job_id": job.id,
+            "coalesced": not created,
+            "message": description,
+        }
+    ), 202
+
+
+@bp.route("/api/jobs", methods=["GET"])
+def list_jobs():
+    jobs = current_app.extensions["lab"].jobs
+    return jsonify([job.to_dict() for job in jobs.list()])
+
+
+@bp.route("/api/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    job = current_app.extensions["lab"].jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict(since=request.args.get("since", 0, type=int)))
+
+
+@bp.route("/api/jobs/<job_id>/stream", methods=["GET"])
+def stream_job(job_id):
+    job = current_app.extensions["lab"].jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    offset = request.args.get("since", 0, type=int)
+
+    def generate(offset):
+        yield "retry: 2000\n\n"
+        while True:
+            lines, offset = job.wait_output(offset, STREAM_HEARTBEAT)
+            if lines:
+                yield format_sse("output", {"lines": lines, "next_offset": offset})
+            if job.done:
+                lines, offset = job.output_since(offset)
+                if lines:
+                    yield format_sse("output", {"lines": lines, "next_offset": offset})
+                yield format_sse("done", job.to_dict())
+                return
+            if not lines:
+                yield ": keep-alive\n\n"
+
+    return Response(
+        generate(offset),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@functools.lru_cache(maxsize=None)
 def get_docker_compose_command():
     """Get docker-compose command"""
     # Check if docker compose plugin is installed
@@ -313,431 +379,561 @@ def get_docker_compose_command():
                 "Neither 'docker compose' plugin nor 'docker-compose' command found"
             )
 
-def check_elk_status(max_retries=5, retry_delay=10):
-    """Check if ELK environment is running properly, with retry mechanism"""
-    for attempt in range(max_retries):
-        try:
-            print(f"Checking ELK environment (Attempt {attempt + 1})")
-
-            # Get Elasticsearch IP
-            try:
-                es_container = client.containers.get("elk-es01-1")
-                es_networks = es_container.attrs.get("NetworkSettings", {}).get(
-                    "Networks", {}
-                )
-                es_ip = next(
-                    (
-                        info.get("IPAddress")
-                        for name, info in es_networks.items()
-                        if name == "elk_net"
-                    ),
-                    None,
-                )
-            except Exception as e:
-                print(f"Failed to get es IP: {str(e)}")
-                es_ip = None
-
-            platform = sys.platform
-            if platform == "win32":
-                es_ip = "localhost"
-
-            if not es_ip:
-                print("Unable to get Elasticsearch IP")
-                if attempt < max_retries - 1:
-                    time.sleep(retry_delay)
-                    continue
-                return False, {
-                    "code": "ES_IP_NOT_FOUND",
-                    "message": "Unable to get Elasticsearch IP",
-                    "details": "Elasticsearch container might not be running or network configuration is incorrect",
-                }
 
-            # Check if Elasticsearch is running
-            es_url = f"https://{es_ip}:9200"
-            print(f"Checking Elasticsearch: {es_url}")
-            es_response = requests.get(
-                es_url, auth=("elastic", ELASTIC_PASSWORD), verify=False, timeout=10
-            )
-            if es_response.status_code != 200:
-                print(
-                    f"Elasticsearch not ready, status code: {es_response.status_code}"
-                )
-                if attempt < max_retries - 1:
-                    time.sleep(retry_delay)
-                    continue
-                return False, {
-                    "code": "ES_NOT_READY",
-                    "message": "Elasticsearch not running properly",
-                    "details": f"Status code: {es_response.status_code}, Response: {es_response.text}",
-                }
+def compose_file_args(project_dir, compose_file):
+    """-f options for the compose file plus every COMPOSE_FILE entry.
 
-            # Get Kibana IP
-            try:
-                kibana_container = client.containers.get("elk-kibana-1")
-                kibana_networks = kibana_container.attrs.get("NetworkSettings", {}).get(
-                    "Networks", {}
-                )
-                kibana_ip = next(
-                    (
-                        info.get("IPAddress")
-                        for name, info in kibana_networks.items()
-                        if name == "elk_net"
-                    ),
-                    None,
-                )
-            except Exception as e:
-                print(f"Failed to get Kibana IP: {str(e)}")
-                kibana_ip = None
-
-            platform = sys.platform
-            if platform == "win32":
-                kibana_ip = "localhost"
-
-            if not kibana_ip:
-                print("Unable to get Kibana IP")
-                if attempt < max_retries - 1:
-                    time.sleep(retry_delay)
-                    continue
-                return False, {
-                    "code": "KIBANA_IP_NOT_FOUND",
-                    "message": "Unable to get Kibana IP",
-                    "details": "Kibana container might not be running or network configuration is incorrect",
-                }
+    An explicit -f makes the compose CLI ignore COMPOSE_FILE from .env,
+    which is where 'ELK/make.py install --nodes N' adds the extra nodes.
+    The list comes from compose_engine, so both drivers start the same files.
+    """
+    from compose_engine import compose_files, load_env_file
 
-            # Check if Kibana is running
-            kibana_url = f"http://{kibana_ip}:5601"
-            print(f"Checking Kibana: {kibana_url}")
-            kibana_response = requests.get(kibana_url, timeout=10)
-            if kibana_response.status_code != 200:
-                print(f"Kibana not ready, status code: {kibana_response.status_code}")
-                if attempt < max_retries - 1:
-                    time.sleep(retry_delay)
-                    continue
-                return False, {
-                    "code": "KIBANA_NOT_READY",
-                    "message": "Kibana not running properly",
-                    "details": f"Status code: {kibana_response.status_code}, Response: {kibana_response.text}",
-                }
+    compose_path = os.path.abspath(os.path.join(project_dir, compose_file))
+    env = {**load_env_file(os.path.join(project_dir, ".env")), **os.environ}
+    args = []
+    for path in compose_files(compose_path, env):
+        args += ["-f", path]
+    return args
 
-            return True, {
-                "code": "SUCCESS",
-                "message": "ELK environment running properly",
-                "details": "All components are running and properly configured",
-            }
-        except RequestException as e:
-            print(f"Check failed (Attempt {attempt + 1}): {str(e)}")
-            if attempt < max_retries - 1:
-                print(f"Waiting {retry_delay} seconds before retrying...")
-                time.sleep(retry_delay)
-            else:
-                return False, {
-                    "code": "REQUEST_FAILED",
-                    "message": "ELK environment check failed",
-                    "details": str(e),
-                }
-    return False, {
-        "code": "CHECK_TIMEOUT",
-        "message": "ELK environment check timeout",
-        "details": f"Failed after {max_retries} attempts with {retry_delay}s delay between attempts",
-    }
 
+def compose_up(job, project_dir, compose_file, services=None):
+    """Create and start compose services with the configured driver"""
+    from compose_engine import ComposeError, load_project
+    from docker_client import docker_client
 
-@app.route("/api/start_target", methods=["POST"])
-def start_target():
+    if COMPOSE_DRIVER == "cli":
+        compose_cmd = get_docker_compose_command()
+        run_command(
+            job,
+            compose_cmd
+            + compose_file_args(project_dir, compose_file)
+            + ["up", "-d"]
+            + (services or []),
+            cwd=project_dir,
+        )
+        return
+    project = load_project(os.path.join(project_dir, compose_file))
     try:
-        # First check ELK environment status
-        elk_ok, elk_message = check_elk_status()
-        if not elk_ok:
-            return jsonify(
-                {
-                    "status": "error",
-                    "message": f"Cannot start target machine: {elk_message}",
-                }
-            ), 400
+        project.up(docker_client.get(), services, log=job.log)
+    except ComposeError as e:
+        raise JobError(
+            "DOCKER_COMPOSE_FAILED", "Docker Compose operation failed", str(e)
+        )
 
-        target_type = request.json.get("type")
-        if target_type not in ["nginx", "httpd"]:
-            return jsonify({"error": "Invalid target type"}), 400
 
-        machines_dir = os.path.join(
-            os.path.dirname(os.path.dirname(__file__)), "Machines"
-        )
+def compose_down(job, project_dir, compose_file):
+    """Remove compose services, networks and volumes with the configured driver"""
+    from compose_engine import load_project
+    from docker_client import docker_client
+
+    if COMPOSE_DRIVER == "cli":
         compose_cmd = get_docker_compose_command()
-        subprocess.run(
-            compose_cmd
-            + [
-                "-f",
-                "docker-compose-simulation.yml",
-                "up",
-                "-d",
-                # "--build",
-                f"target-{target_type}",
-            ],
-            cwd=machines_dir,
-            check=True,
+        run_command(
+            job,
+            compose_cmd + compose_file_args(project_dir, compose_file) + ["down", "-v"],
+            cwd=project_dir,
         )
+        return
+    project = load_project(os.path.join(project_dir, compose_file))
+    project.down(docker_client.get(), remove_volumes=True, log=job.log)
 
-        return jsonify(
-            {
-                "status": "success",
-                "message": f"{target_type} target machine started successfully",
-            }
-        )
-    except Exception as e:
-        return jsonify({"status": "error", "message": str(e)}), 500
 
+def check_elk_status():
+    """Return the cached ELK readiness state without blocking"""
+    return lab().elk_monitor.status()
 
-@app.route("/api/start_attacker", methods=["POST"])
-def start_attacker():
-    try:
-        # First check ELK environment status
-        elk_ok, elk_message = check_elk_status()
-        if not elk_ok:
-            return jsonify(
-                {
-                    "status": "error",
-                    "message": f"Cannot start attacker machine: {elk_message}",
-                }
-            ), 400
 
-        attacker_type = request.json.get("type")
-        if attacker_type not in ["kali-novnc", "kali-xrdp", "kali-x11"]:
-            return jsonify({"error": "Invalid attacker type"}), 400
+@bp.route("/api/elk/health", methods=["GET"])
+def elk_health():
+    return jsonify(lab().elk_monitor.snapshot())
 
-        machines_dir = os.path.join(
-            os.path.dirname(os.path.dirname(__file__)), "Machines"
-        )
-        compose_cmd = get_docker_compose_command()
-        subprocess.run(
-            compose_cmd
-            + [
-                "-f",
-                "docker-compose-simulation.yml",
-                "up",
-                "-d",
-                # "--build",
-                f"attacker-{attacker_type}",
-            ],
-            cwd=machines_dir,
-            check=True,
-        )
+
+def is_target(name):
+    """Simulation targets plus every tenant lab's target"""
+    if name in [f"target-{target_type}" for target_type in TARGET_TYPES]:
+        return True
+    record = lab().inventory.get(name)
+    return record is not None and record["cluster"] == "lab" and record["role"] == "target"
+
+
+def metrics_response(target, panel=None):
+    if not is_target(target):
+        return jsonify({"status": "error", "message": f"Unknown target: {target}"}), 404
+    window = request.args.get("window", "15m")
+    if window not in WINDOWS:
         return jsonify(
             {
-                "status": "success",
-                "message": f"{attacker_type} attacker machine started successfully",
+                "status": "error",
+                "message": f"Invalid window, use one of: {', '.join(WINDOWS)}",
             }
-        )
-    except Exception as e:
-        return jsonify({"status": "error", "message": str(e)}), 500
+        ), 400
+    try:
+        if panel is None:
+            data = lab().attack_metrics.summary(target, window)
+        else:
+            data = lab().attack_metrics.panel(panel, target, window)
+    except MetricsError as e:
+        return jsonify({"status": "error", "message": str(e)}), 502
+    return jsonify({"target": target, "window": window, **({panel: data} if panel else data)})
 
 
-@app.route("/api/stop_all", methods=["POST"])
-def stop_all():
+@bp.route("/api/alerts", methods=["GET"])
+def get_alerts():
+    return jsonify(lab().detector.alerts())
+
+
+@bp.route("/api/metrics/<target>", methods=["GET"])
+def target_metrics(target):
+    return metrics_response(target)
+
+
+@bp.route("/api/metrics/<target>/<panel>", methods=["GET"])
+def target_metrics_panel(target, panel):
+    if panel not in AttackMetrics.PANELS:
+        return jsonify({"status": "error", "message": f"Unknown panel: {panel}"}), 404
+    return metrics_response(target, panel)
+
+
+def compose_simulation_up(job, services):
+    compose_up(job, MACHINES_DIR, SIMULATION_COMPOSE_FILE, services)
+
+
+def list_lab(cluster=None):
+    """Lab containers straight from the daemon (jobs run outside a request)"""
+    from docker_client import docker_client
+    from lab_query import list_lab_containers
+
+    return docker_client.call(
+        lambda client: list_lab_containers(client, cluster=cluster)
+    )
+
+
+def force_remove_containers(job, containers):
+    """Stop and remove containers left behind after compose down"""
+    from teardown import teardown_containers
+
+    return teardown_containers(containers, log=job.log)
+
+
+def run_start_elk(job):
+    compose_up(job, ELK_DIR, ELK_COMPOSE_FILE)
+    return {"status": "success", "message": "ELK Stack started successfully"}
+
+
+def run_start_target(job, target_type):
+    compose_simulation_up(job, [f"target-{target_type}"])
+    return {
+        "status": "success",
+        "message": f"{target_type} target machine started successfully",
+    }
+
+
+def run_start_attacker(job, attacker_type):
+    compose_simulation_up(job, [f"attacker-{attacker_type}"])
+    return {
+        "status": "success",
+        "message": f"{attacker_type} attacker machine started successfully",
+    }
+
+
+def run_start_simulation(job, target_type, attacker_type):
+    # Start both target and attacker machines simultaneously
+    compose_simulation_up(job, [f"target-{target_type}", f"attacker-{attacker_type}"])
+    return {
+        "status": "success",
+        "message": f"Simulation environment started with target: {target_type}, attacker: {attacker_type}",
+        "details": {"target_type": target_type, "attacker_type": attacker_type},
+    }
+
+
+def load_lab_registry():
+    if not os.path.exists(LAB_REGISTRY):
+        return {}
+    with open(LAB_REGISTRY, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def run_lab_command(job, args, code, message):
     try:
-        compose_cmd = get_docker_compose_command()
+        run_command(job, [sys.executable, "-u", "make.py", "lab"] + args, cwd=MACHINES_DIR)
+    except subprocess.CalledProcessError as e:
+        raise JobError(code, message, f"make.py lab exited with status {e.returncode}")
+
+
+def lab_records(registry, inventory):
+    """Registry entries with the current status of each lab container"""
+    return [
+        {
+            "tenant": tenant,
+            **details,
+            "status": {
+                name: (inventory.get(name) or {}).get("status", "missing")
+                for name in details.get("containers", [])
+            },
+        }
+        for tenant, details in sorted(registry.items())
+    ]
 
-        # Stop ELK
-        elk_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "ELK")
-        subprocess.run(compose_cmd + ["down", "-v"], cwd=elk_dir, check=True)
 
-        # Stop simulation environment
-        machines_dir = os.path.join(
-            os.path.dirname(os.path.dirname(__file__)), "Machines"
-        )
-        subprocess.run(
-            compose_cmd + ["-f", "docker-compose-simulation.yml", "down", "-v"],
-            cwd=machines_dir,
-            check=True,
+def run_create_lab(job, services, tenant, target_type, attacker_type):
+    args = ["create", tenant, "--target", target_type]
+    if attacker_type:
+        args += ["--attacker", attacker_type]
+    try:
+        run_lab_command(
+            job, args, "LAB_CREATE_FAILED", f"Failed to create lab '{tenant}'"
         )
+    finally:
+        services.publish_labs()
+    return {
+        "status": "success",
+        "message": f"Lab '{tenant}' started",
+        "details": load_lab_registry().get(tenant),
+    }
 
-        # Force stop any remaining containers
-        client = docker.from_env()
-        containers = client.containers.list(all=True)
-        for container in containers:
-            try:
-                container.stop()
-                container.remove()
-            except Exception as e:
-                print(f"Error stopping container {container.name}: {e}")
 
-        return jsonify(
-            {"status": "success", "message": "All services stopped successfully"}
+def run_remove_lab(job, services, tenant):
+    try:
+        run_lab_command(
+            job, ["remove", tenant], "LAB_REMOVE_FAILED", f"Failed to remove lab '{tenant}'"
         )
-    except Exception as e:
-        return jsonify({"status": "error", "message": str(e)}), 500
+    finally:
+        services.publish_labs()
+    return {"status": "success", "message": f"Lab '{tenant}' removed"}
 
 
-@app.route("/api/stop_simulation", methods=["POST"])
-def stop_simulation():
-    try:
-        compose_cmd = get_docker_compose_command()
+def run_stop_all(job, services):
+    # Tenant labs first; their networks still have ES and Kibana attached
+    if load_lab_registry():
+        try:
+            run_lab_command(
+                job,
+                ["remove", "--all"],
+                "LAB_REMOVE_FAILED",
+                "Failed to remove tenant labs",
+            )
+        finally:
+            services.publish_labs()
+
+    # Stop ELK
+    compose_down(job, ELK_DIR, ELK_COMPOSE_FILE)
+
+    # Stop simulation environment
+    compose_down(job, MACHINES_DIR, SIMULATION_COMPOSE_FILE)
+
+    # Force stop any remaining lab containers
+    containers = list_lab()
+    report = force_remove_containers(job, containers)
+    return {
+        "status": "success",
+        "message": "All services stopped successfully",
+        "containers": report,
+    }
+
+
+def run_stop_simulation(job):
+    # Stop simulation environment
+    compose_down(job, MACHINES_DIR, SIMULATION_COMPOSE_FILE)
+
+    # Force stop any remaining simulation containers
+    containers = list_lab(cluster="simulation")
+    report = force_remove_containers(job, containers)
+    return {
+        "status": "success",
+        "message": "Simulation environment stopped successfully",
+        "containers": report,
+    }
 
-        # Stop simulation environment
-        machines_dir = os.path.join(
-            os.path.dirname(os.path.dirname(__file__)), "Machines"
+
+def run_stop_elk(job):
+    # Stop ELK
+    compose_down(job, ELK_DIR, ELK_COMPOSE_FILE)
+
+    # Force stop any remaining ELK containers
+    containers = list_lab(cluster="elk")
+    report = force_remove_containers(job, containers)
+    return {
+        "status": "success",
+        "message": "ELK Stack stopped successfully",
+        "containers": report,
+    }
+
+
+def run_reset_elk_snapshot(job, name):
+    # make.py recreates the volumes from the archives and waits for health
+    try:
+        run_command(
+            job,
+            [sys.executable, "-u", "make.py", "restore", "--name", name],
+            cwd=ELK_DIR,
         )
-        subprocess.run(
-            compose_cmd + ["-f", "docker-compose-simulation.yml", "down", "-v"],
-            cwd=machines_dir,
-            check=True,
+    except subprocess.CalledProcessError as e:
+        raise JobError(
+            "SNAPSHOT_RESTORE_FAILED",
+            f"Failed to reset ELK Stack to snapshot '{name}'",
+            f"make.py restore exited with status {e.returncode}",
         )
+    return {
+        "status": "success",
+        "message": f"ELK Stack reset to snapshot '{name}'",
+    }
 
-        # Force stop any remaining simulation containers
-        client = docker.from_env()
-        containers = client.containers.list(all=True)
-        simulation_prefixes = ["target", "attacker"]
-        for container in containers:
-            container_name = container.name.lower()
-            if any(prefix in container_name for prefix in simulation_prefixes):
-                try:
-                    container.stop()
-                    container.remove()
-                except Exception as e:
-                    print(f"Error stopping container {container.name}: {e}")
 
+@bp.route("/api/start_elk", methods=["POST"])
+def start_elk():
+    try:
+        # Check if ELK environment is already running
+        inventory = lab().inventory
+        inventory.ensure_synced()
+        running_containers = [
+            container
+            for container in inventory.by_cluster("elk")
+            if container["status"] == "running"
+        ]
+        if running_containers:
+            return jsonify(
+                {
+                    "status": "warning",
+                    "message": "ELK Stack is already running",
+                }
+            )
+
+        return submit_job("start_elk", "Starting ELK Stack", run_start_elk)
+    except Exception as e:
+        print(f"Error starting ELK Stack: {str(e)}")
+        return jsonify(
+            {"status": "error", "message": f"Error starting ELK Stack: {str(e)}"}
+        ), 500
+
+
+@bp.route("/api/start_target", methods=["POST"])
+def start_target():
+    # First check ELK environment status
+    elk_ok, elk_message = check_elk_status()
+    if not elk_ok:
         return jsonify(
             {
-                "status": "success",
-                "message": "Simulation environment stopped successfully",
+                "status": "error",
+                "message": f"Cannot start target machine: {elk_message['message']}",
+                "error": elk_message,
             }
-        )
-    except Exception as e:
-        return jsonify({"status": "error", "message": str(e)}), 500
+        ), 400
 
+    target_type = request.json.get("type")
+    if target_type not in TARGET_TYPES:
+        return jsonify({"error": "Invalid target type"}), 400
 
-@app.route("/api/stop_elk", methods=["POST"])
-def stop_elk():
-    try:
-        compose_cmd = get_docker_compose_command()
+    return submit_job(
+        f"start_target:{target_type}",
+        f"Starting {target_type} target machine",
+        run_start_target,
+        target_type,
+    )
 
-        # Stop ELK
-        elk_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "ELK")
-        subprocess.run(compose_cmd + ["down", "-v"], cwd=elk_dir, check=True)
-
-        # Force stop any remaining ELK containers
-        client = docker.from_env()
-        containers = client.containers.list(all=True)
-        elk_prefixes = ["elk", "elasticsearch", "logstash", "kibana"]
-        for container in containers:
-            container_name = container.name.lower()
-            if any(prefix in container_name for prefix in elk_prefixes):
-                try:
-                    container.stop()
-                    container.remove()
-                except Exception as e:
-                    print(f"Error stopping container {container.name}: {e}")
 
+@bp.route("/api/start_attacker", methods=["POST"])
+def start_attacker():
+    # First check ELK environment status
+    elk_ok, elk_message = check_elk_status()
+    if not elk_ok:
         return jsonify(
-            {"status": "success", "message": "ELK Stack stopped successfully"}
-        )
-    except Exception as e:
-        return jsonify({"status": "error", "message": str(e)}), 500
+            {
+                "status": "error",
+                "message": f"Cannot start attacker machine: {elk_message['message']}",
+                "error": elk_message,
+            }
+        ), 400
 
+    attacker_type = request.json.get("type")
+    if attacker_type not in ATTACKER_TYPES:
+        return jsonify({"error": "Invalid attacker type"}), 400
 
-@app.route("/api/start_simulation", methods=["POST"])
-def start_simulation():
-    try:
-        # Check ELK environment status
-        elk_ok, elk_status = check_elk_status()
-        if not elk_ok:
-            return jsonify({"status": "error", "error": elk_status}), 400
+    return submit_job(
+        f"start_attacker:{attacker_type}",
+        f"Starting {attacker_type} attacker machine",
+        run_start_attacker,
+        attacker_type,
+    )
 
-        target_type = request.json.get("target_type")
-        attacker_type = request.json.get("attacker_type")
 
-        if not target_type or not attacker_type:
-            return jsonify(
-                {
-                    "status": "error",
-                    "error": {
-                        "code": "MISSING_PARAMETERS",
-                        "message": "Required parameters missing",
-                        "details": "Both target_type and attacker_type are required",
-                    },
-                }
-            ), 400
+@bp.route("/api/stop_all", methods=["POST"])
+def stop_all():
+    return submit_job("stop_all", "Stopping all services", run_stop_all, lab())
 
-        if target_type not in ["nginx", "httpd"]:
-            return jsonify(
-                {
-                    "status": "error",
-                    "error": {
-                        "code": "INVALID_TARGET_TYPE",
-                        "message": "Invalid target type",
-                        "details": f"Target type must be one of: nginx, httpd. Got: {target_type}",
-                    },
-                }
-            ), 400
 
-        if attacker_type not in ["kali-novnc", "kali-xrdp", "kali-x11"]:
-            return jsonify(
-                {
-                    "status": "error",
-                    "error": {
-                        "code": "INVALID_ATTACKER_TYPE",
-                        "message": "Invalid attacker type",
-                        "details": f"Attacker type must be one of: kali-novnc, kali-xrdp, kali-x11. Got: {attacker_type}",
-                    },
-                }
-            ), 400
+@bp.route("/api/stop_simulation", methods=["POST"])
+def stop_simulation():
+    return submit_job(
+        "stop_simulation", "Stopping simulation environment", run_stop_simulation
+    )
 
-        machines_dir = os.path.join(
-            os.path.dirname(os.path.dirname(__file__)), "Machines"
-        )
-        compose_cmd = get_docker_compose_command()
 
-        # Start both target and attacker machines simultaneously
-        subprocess.run(
-            compose_cmd
-            + [
-                "-f",
-                "docker-compose-simulation.yml",
-                "up",
-                "-d",
-                # "--build",
-                f"target-{target_type}",
-                f"attacker-{attacker_type}",
-            ],
-            cwd=machines_dir,
-            check=True,
-        )
+@bp.route("/api/stop_elk", methods=["POST"])
+def stop_elk():
+    return submit_job("stop_elk", "Stopping ELK Stack", run_stop_elk)
+
 
+@bp.route("/api/elk/reset_snapshot", methods=["POST"])
+def reset_elk_snapshot():
+    name = (request.get_json(silent=True) or {}).get("name", "default")
+    if not re.fullmatch(r"[A-Za-z0-9_.-]+", name) or name in (".", ".."):
+        return jsonify({"status": "error", "message": "Invalid snapshot name"}), 400
+    if not os.path.exists(os.path.join(ELK_DIR, "snapshots", name, "manifest.json")):
         return jsonify(
             {
-                "status": "success",
-                "message": f"Simulation environment started with target: {target_type}, attacker: {attacker_type}",
-                "details": {"target_type": target_type, "attacker_type": attacker_type},
+                "status": "error",
+                "message": f"Snapshot '{name}' not found, run 'python make.py snapshot' in ELK first",
             }
-        )
-    except subprocess.CalledProcessError as e:
+        ), 404
+    return submit_job(
+        "reset_elk_snapshot",
+        f"Resetting ELK Stack to snapshot '{name}'",
+        run_reset_elk_snapshot,
+        name,
+    )
+
+
+@bp.route("/api/start_simulation", methods=["POST"])
+def start_simulation():
+    # Check ELK environment status
+    elk_ok, elk_status = check_elk_status()
+    if not elk_ok:
+        return jsonify({"status": "error", "error": elk_status}), 400
+
+    target_type = request.json.get("target_type")
+    attacker_type = request.json.get("attacker_type")
+
+    if not target_type or not attacker_type:
         return jsonify(
             {
                 "status": "error",
                 "error": {
-                    "code": "DOCKER_COMPOSE_FAILED",
-                    "message": "Failed to start simulation environment",
-                    "details": f"Docker Compose command failed: {str(e)}",
+                    "code": "MISSING_PARAMETERS",
+                    "message": "Required parameters missing",
+                    "details": "Both target_type and attacker_type are required",
                 },
             }
-        ), 500
-    except Exception as e:
+        ), 400
+
+    if target_type not in TARGET_TYPES:
         return jsonify(
             {
                 "status": "error",
                 "error": {
-                    "code": "UNKNOWN_ERROR",
-                    "message": "An unexpected error occurred",
-                    "details": str(e),
+                    "code": "INVALID_TARGET_TYPE",
+                    "message": "Invalid target type",
+                    "details": f"Target type must be one of: nginx, httpd. Got: {target_type}",
                 },
             }
-        ), 500
+        ), 400
 
+    if attacker_type not in ATTACKER_TYPES:
+        return jsonify(
+            {
+                "status": "error",
+                "error": {
+                    "code": "INVALID_ATTACKER_TYPE",
+                    "message": "Invalid attacker type",
+                    "details": f"Attacker type must be one of: kali-novnc, kali-xrdp, kali-x11. Got: {attacker_type}",
+                },
+            }
+        ), 400
+
+    return submit_job(
+        f"start_simulation:{target_type}:{attacker_type}",
+        f"Starting simulation environment ({target_type} + {attacker_type})",
+        run_start_simulation,
+        target_type,
+        attacker_type,
+    )
 
-@app.route("/api/containers/<container_id>/stop", methods=["POST"])
+
+@bp.route("/api/labs", methods=["GET"])
+def list_labs():
+    try:
+        inventory = lab().inventory
+        inventory.ensure_synced()
+        return jsonify(lab_records(load_lab_registry(), inventory))
+    except Exception as e:
+        print(f"Error in list_labs: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@bp.route("/api/labs", methods=["POST"])
+def create_lab():
+    elk_ok, elk_status = check_elk_status()
+    if not elk_ok:
+        return jsonify({"status": "error", "error": elk_status}), 400
+
+    data = request.get_json(silent=True) or {}
+    tenant = data.get("tenant") or ""
+    target_type = data.get("target_type", "nginx")
+    attacker_type = data.get("attacker_type") or None
+    if not LAB_NAME_PATTERN.fullmatch(tenant):
+        return jsonify(
+            {
+                "status": "error",
+                "message": "Tenant names are 1-20 characters of a-z, 0-9 and '-'",
+            }
+        ), 400
+    if target_type not in TARGET_TYPES:
+        return jsonify({"status": "error", "message": "Invalid target type"}), 400
+    if attacker_type is not None and attacker_type not in ATTACKER_TYPES:
+        return jsonify({"status": "error", "message": "Invalid attacker type"}), 400
+    if tenant in load_lab_registry():
+        return jsonify(
+            {
+                "status": "error",
+                "message": f"Lab '{tenant}' already exists; remove it first to change it",
+            }
+        ), 409
+
+    return submit_job(
+        f"create_lab:{tenant}",
+        f"Creating lab '{tenant}'",
+        run_create_lab,
+        lab(),
+        tenant,
+        target_type,
+        attacker_type,
+    )
+
+
+@bp.route("/api/labs/<tenant>", methods=["DELETE"])
+def remove_lab(tenant):
+    if tenant not in load_lab_registry():
+        return jsonify({"status": "error", "message": f"No lab named '{tenant}'"}), 404
+    return submit_job(
+        f"remove_lab:{tenant}", f"Removing lab '{tenant}'", run_remove_lab, lab(), tenant
+    )
+
+
+@bp.route("/api/containers/<container_id>/stats", methods=["GET"])
+def get_container_stats(container_id):
+    services = lab()
+    record = services.inventory.get(container_id)
+    if record is None:
+        return jsonify({"error": f"Unknown container: {container_id}"}), 404
+    try:
+        seconds = float(request.args.get("seconds", "300"))
+        points = int(request.args.get("points", "0")) or None
+    except ValueError:
+        return jsonify({"error": "seconds and points must be numbers"}), 400
+    if seconds <= 0 or (points is not None and points < 0):
+        return jsonify({"error": "seconds and points must be positive"}), 400
+    history = services.stats_collector.history(record["id"], seconds, points)
+    if history is None:
+        return jsonify({"error": f"No stats collected for {record['name']}"}), 404
+    return jsonify({"id": record["short_id"], "name": record["name"], **history})
+
+
+@bp.route("/api/containers/<container_id>/stop", methods=["POST"])
 def stop_container(container_id):
     try:
-        client = docker.from_env()
-        container = client.containers.get(container_id)
+        container = lab().docker_client.call(
+            lambda client: client.containers.get(container_id)
+        )
         container.stop()
         return jsonify({"success": True})
     except Exception as e:
@@ -745,5 +941,6 @@ def stop_container(container_id):
 
 
 if __name__ == "__main__":
+    # Development server; see wsgi.py and gunicorn.conf.py for production
     debug_mode = os.getenv("FLASK_DEBUG", "false").lower() == "true"
-    app.run(host="0.0.0.0", port=5000, debug=debug_mode)
+    create_app().run(host="0.0.0.0", port=5000, debug=debug_mode, threaded=True)
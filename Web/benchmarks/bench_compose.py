@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Start/stop latency of lab services: compose CLI vs the native compose engine.
+
+Run from the Web directory with the images already built:
+
+    python benchmarks/bench_compose.py --services target-nginx attacker-kali-novnc
+
+Each round brings the services up and then removes them with both drivers.
+The CLI driver also pays for the ``docker compose version`` probe the routes
+used to run before every call.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compose_engine import ComposeProject  # noqa: E402
+from docker_client import SharedDockerClient  # noqa: E402
+
+MACHINES_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "Machines",
+)
+COMPOSE_FILE = "docker-compose-simulation.yml"
+
+
+def cli_up(services):
+    subprocess.run(["docker", "compose", "version"], capture_output=True, check=True)
+    subprocess.run(
+        ["docker", "compose", "-f", COMPOSE_FILE, "up", "-d"] + services,
+        cwd=MACHINES_DIR,
+        capture_output=True,
+        check=True,
+    )
+
+
+def cli_down(services):
+    subprocess.run(["docker", "compose", "version"], capture_output=True, check=True)
+    subprocess.run(
+        ["docker", "compose", "-f", COMPOSE_FILE, "down", "-v"],
+        cwd=MACHINES_DIR,
+        capture_output=True,
+        check=True,
+    )
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - started
+
+
+def report(name, samples):
+    print(
+        f"{name:<12} n={len(samples)} mean={statistics.mean(samples):6.2f}s "
+        f"min={min(samples):6.2f}s max={max(samples):6.2f}s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--services", nargs="+", default=["target-nginx"])
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    client = SharedDockerClient().get()
+    # Parse outside the timed region: the routes reuse the cached project
+    project = ComposeProject(os.path.join(MACHINES_DIR, COMPOSE_FILE))
+    quiet = lambda line: None  # noqa: E731
+
+    results = {"cli up": [], "cli down": [], "native up": [], "native down": []}
+    for _ in range(args.rounds):
+        results["cli up"].append(timed(cli_up, args.services))
+        results["cli down"].append(timed(cli_down, args.services))
+        results["native up"].append(
+            timed(lambda: project.up(client, args.services, log=quiet))
+        )
+        results["native down"].append(
+            timed(lambda: project.down(client, remove_volumes=True, log=quiet))
+        )
+
+    for name, samples in results.items():
+        report(name, samples)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""Per-request Docker API latency: fresh client per request vs shared pooled client.
+
+Run from the Web directory against a live Docker daemon:
+
+    python benchmarks/bench_docker_client.py --requests 200 --concurrency 8
+
+"per-request" reproduces the old route behaviour (``docker.from_env()`` and a
+container listing on every call); "shared" uses the pooled client from
+``docker_client.py`` that the routes use now.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import docker
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docker_client import SharedDockerClient  # noqa: E402
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def per_request_call():
+    client = docker.from_env()
+    try:
+        client.containers.list(all=True)
+    finally:
+        client.close()
+
+
+def run(name, func, total, concurrency):
+    def timed(_):
+        started = time.perf_counter()
+        func()
+        return (time.perf_counter() - started) * 1000
+
+    # Warm up once so image/lib loading is not measured
+    func()
+    wall_started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(timed, range(total)))
+    wall = time.perf_counter() - wall_started
+
+    print(
+        f"{name:<12} n={total:<5} mean={statistics.mean(samples):7.2f}ms "
+        f"p50={percentile(samples, 50):7.2f}ms p99={percentile(samples, 99):7.2f}ms "
+        f"throughput={total / wall:7.1f} req/s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--pool-size", type=int, default=10)
+    args = parser.parse_args()
+
+    shared = SharedDockerClient(pool_size=args.pool_size)
+    run("per-request", per_request_call, args.requests, args.concurrency)
+    run(
+        "shared",
+        lambda: shared.call(lambda client: client.containers.list(all=True)),
+        args.requests,
+        args.concurrency,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""/api/containers latency under concurrent load: dev server vs gunicorn.
+
+Run from the Web directory against a live Docker daemon:
+
+    python benchmarks/bench_serving.py --requests 2000 --concurrency 32 --streams 20
+
+Each server is started in turn on --port. --streams dashboard clients stay
+connected to /api/stream during the run, as open browser tabs would, while
+--concurrency threads poll /api/containers over keep-alive sessions.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+WEB_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVERS = {
+    # What `python app.py` runs (threaded Werkzeug server), on --port
+    "dev": [sys.executable, "-m", "flask", "--app", "app:create_app", "run", "--with-threads"],
+    "gunicorn": [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"],
+}
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def wait_ready(url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(url, timeout=2).status_code == 200:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    return False
+
+
+def hold_stream(url, stopped):
+    """Keep one /api/stream connection open until stopped"""
+    try:
+        with requests.get(url, stream=True, timeout=(5, 30)) as response:
+            for _ in response.iter_lines():
+                if stopped.is_set():
+                    return
+    except requests.RequestException:
+        pass
+
+
+def run(name, base_url, total, concurrency, streams):
+    stopped = threading.Event()
+    holders = [
+        threading.Thread(
+            target=hold_stream, args=(f"{base_url}/api/stream", stopped), daemon=True
+        )
+        for _ in range(streams)
+    ]
+    for holder in holders:
+        holder.start()
+    local = threading.local()
+    errors = []
+
+    def timed(_):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        started = time.perf_counter()
+        try:
+            response = session.get(f"{base_url}/api/containers", timeout=30)
+            if response.status_code != 200:
+                errors.append(response.status_code)
+        except requests.RequestException as e:
+            errors.append(type(e).__name__)
+        return (time.perf_counter() - started) * 1000
+
+    wall_started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(timed, range(total)))
+    wall = time.perf_counter() - wall_started
+    stopped.set()
+
+    print(
+        f"{name:<9} n={total:<5} c={concurrency:<3} streams={streams:<3} "
+        f"mean={statistics.mean(samples):7.2f}ms p50={percentile(samples, 50):7.2f}ms "
+        f"p99={percentile(samples, 99):7.2f}ms throughput={total / wall:7.1f} req/s "
+        f"errors={len(errors)}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--servers", nargs="+", choices=sorted(SERVERS), default=["dev", "gunicorn"])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--streams", type=int, default=20, help="open /api/stream clients")
+    parser.add_argument("--port", type=int, default=5055)
+    args = parser.parse_args()
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    env = {**os.environ, "WEB_BIND": f"127.0.0.1:{args.port}"}
+    for name in args.servers:
+        command = SERVERS[name] + (["--port", str(args.port)] if name == "dev" else [])
+        server = subprocess.Popen(
+            command, cwd=WEB_DIR, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            if not wait_ready(f"{base_url}/api/containers"):
+                print(f"{name:<9} did not become ready")
+                continue
+            run(name, base_url, args.requests, args.concurrency, args.streams)
+        finally:
+            server.terminate()
+            server.wait(10)
+
+
+if __name__ == "__main__":
+    main()
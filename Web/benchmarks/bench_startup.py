@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Cold-start cost of the Web app: import, create_app() and the first request.
+
+Run from the Web directory:
+
+    python benchmarks/bench_startup.py --runs 5
+
+Each run is a fresh interpreter. "create" is what gunicorn or ``python
+app.py`` pays before the app can accept connections; Docker and
+Elasticsearch are only touched by the first /api/containers request, which
+also reports how long the lab services took to start.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+WEB_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs inside the child interpreter and prints one JSON line
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app as web
+imported = time.perf_counter()
+application = web.create_app()
+created = time.perf_counter()
+heavy = [name for name in ("docker", "requests", "urllib3", "yaml") if name in sys.modules]
+response = application.test_client().get("/api/containers")
+answered = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "create_ms": (created - started) * 1000,
+    "first_request_ms": (answered - created) * 1000,
+    "services_init_ms": application.extensions["lab"].init_ms,
+    "status": response.status_code,
+    "heavy_modules_at_create": heavy,
+}))
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    results = []
+    for _ in range(args.runs):
+        output = subprocess.check_output(
+            [sys.executable, "-c", PROBE], cwd=WEB_DIR, text=True
+        )
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    for key in ("import_ms", "create_ms", "first_request_ms", "services_init_ms"):
+        values = [r[key] for r in results if r[key] is not None]
+        if values:
+            print(
+                f"{key:<18} median={statistics.median(values):8.1f}ms "
+                f"min={min(values):8.1f}ms max={max(values):8.1f}ms"
+            )
+    print(f"first request status: {sorted({r['status'] for r in results})}")
+    print(f"heavy modules loaded by create_app(): {results[0]['heavy_modules_at_create']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,606 @@
+import os
+import re
+import shlex
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import yaml
+from docker.errors import ImageNotFound, NotFound
+from docker.types import Ulimit
+
+# Seconds to wait for a dependency to reach its depends_on condition
+COMPOSE_WAIT_TIMEOUT = int(os.getenv("COMPOSE_WAIT_TIMEOUT", "600"))
+# Grace period (seconds) given to containers on stop
+COMPOSE_STOP_TIMEOUT = int(os.getenv("COMPOSE_STOP_TIMEOUT", "10"))
+
+_INTERPOLATION = re.compile(
+    r"\$(?:(?P<escaped>\$)|\{(?P<braced>[A-Za-z_][A-Za-z0-9_]*)"
+    r"(?:(?P<sep>:?[-?])(?P<default>[^}]*))?\}|(?P<named>[A-Za-z_][A-Za-z0-9_]*))"
+)
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|us|ns|h|m|s)")
+_DURATION_NS = {
+    "h": 3600 * 10**9,
+    "m": 60 * 10**9,
+    "s": 10**9,
+    "ms": 10**6,
+    "us": 10**3,
+    "ns": 1,
+}
+
+_projects = {}
+_projects_lock = threading.Lock()
+
+
+class ComposeError(Exception):
+    """Raised when a compose operation cannot be completed"""
+
+
+def load_env_file(path):
+    """Parse a compose .env file into a dict"""
+    env = {}
+    if not os.path.exists(path):
+        return env
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#") or "=" not in line:
+                continue
+            key, value = line.split("=", 1)
+            value = value.strip()
+            if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+                value = value[1:-1]
+            env[key.strip()] = value
+    return env
+
+
+def interpolate(value, env):
+    """Apply compose ${VAR} / ${VAR:-default} substitution recursively"""
+    if isinstance(value, dict):
+        return {k: interpolate(v, env) for k, v in value.items()}
+    if isinstance(value, list):
+        return [interpolate(v, env) for v in value]
+    if not isinstance(value, str):
+        return value
+
+    def replace(match):
+        if match.group("escaped"):
+            return "$"
+        name = match.group("braced") or match.group("named")
+        sep = match.group("sep")
+        current = env.get(name)
+        if sep in (":-", ":?") and not current:
+            current = None
+        if current is None:
+            if sep and sep.endswith("?"):
+                raise ComposeError(f"Required variable {name} is not set")
+            return match.group("default") or ""
+        return current
+
+    return _INTERPOLATION.sub(replace, value)
+
+
+def parse_duration(value):
+    """Convert a compose duration ("1m30s") to nanoseconds"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value * 10**9)
+    return sum(
+        int(float(amount) * _DURATION_NS[unit])
+        for amount, unit in _DURATION.findall(value)
+    )
+
+
+def split_image(image):
+    """Split "repo/name:tag" into (repository, tag)"""
+    repository, _, tag = image.rpartition(":")
+    if not repository or "/" in tag:
+        return image, "latest"
+    return repository, tag
+
+
+def _as_mapping(value):
+    """Normalize a "KEY=value" list (or mapping) into a dict"""
+    if isinstance(value, dict):
+        return dict(value)
+    return dict(
+        item.split("=", 1) if "=" in item else (item, None) for item in value or []
+    )
+
+
+def merge_config(base, override, key=None):
+    """Merge an override compose file into a base one like ``docker compose -f a -f b``"""
+    if key in ("environment", "labels"):
+        return {**_as_mapping(base), **_as_mapping(override)}
+    if key == "depends_on":
+        if isinstance(base, list):
+            base = {name: {"condition": "service_started"} for name in base}
+        if isinstance(override, list):
+            override = {name: {"condition": "service_started"} for name in override}
+    if key == "networks" and isinstance(base, list) != isinstance(override, list):
+        base = dict.fromkeys(base) if isinstance(base, list) else base
+        override = dict.fromkeys(override) if isinstance(override, list) else override
+    if isinstance(base, dict) and isinstance(override, dict):
+        merged = dict(base)
+        for name, value in override.items():
+            merged[name] = (
+                merge_config(merged[name], value, name) if name in merged else value
+            )
+        return merged
+    if (
+        isinstance(base, list)
+        and isinstance(override, list)
+        and key not in ("command", "entrypoint", "test")
+    ):
+        return base + [item for item in override if item not in base]
+    return override
+
+
+def compose_files(compose_path, env):
+    """The compose file plus any files listed in COMPOSE_FILE (from .env)"""
+    listed = env.get("COMPOSE_FILE")
+    if not listed:
+        return [compose_path]
+    working_dir = os.path.dirname(compose_path)
+    separator = env.get("COMPOSE_PATH_SEPARATOR", os.pathsep)
+    files = [
+        os.path.abspath(os.path.join(working_dir, path))
+        for path in listed.split(separator)
+        if path
+    ]
+    if compose_path not in files:
+        files.insert(0, compose_path)
+    return files
+
+
+def load_project(compose_path, project_name=None):
+    """Return the parsed project for a compose file, cached until it changes"""
+    compose_path = os.path.abspath(compose_path)
+    env_path = os.path.join(os.path.dirname(compose_path), ".env")
+    env = {**load_env_file(env_path), **os.environ}
+    stamp = (
+        tuple(
+            (path, os.path.getmtime(path) if os.path.exists(path) else None)
+            for path in compose_files(compose_path, env)
+        ),
+        os.path.getmtime(env_path) if os.path.exists(env_path) else None,
+        project_name,
+    )
+    with _projects_lock:
+        cached = _projects.get(compose_path)
+        if cached and cached[0] == stamp:
+            return cached[1]
+        project = ComposeProject(compose_path, project_name)
+        _projects[compose_path] = (stamp, project)
+        return project
+
+
+class ComposeProject:
+    """A compose file parsed once into a service graph and driven via the Docker API.
+
+    Container, volume and network names plus the ``com.docker.compose.*``
+    labels match what the compose CLI produces, so both drivers can manage
+    the same stack. ``up`` starts every service as soon as the services it
+    ``depends_on`` reach their condition, so independent services start in
+    parallel.
+    """
+
+    def __init__(self, compose_path, project_name=None):
+        self.path = compose_path
+        self.working_dir = os.path.dirname(compose_path)
+        self.env = {**load_env_file(os.path.join(self.working_dir, ".env")), **os.environ}
+        self.name = (
+            project_name
+            or self.env.get("COMPOSE_PROJECT_NAME")
+            or re.sub(r"[^a-z0-9_-]", "", os.path.basename(self.working_dir).lower())
+        )
+        config = {}
+        # Later files override earlier ones (COMPOSE_FILE, e.g. the ES nodes override)
+        for path in compose_files(compose_path, self.env):
+            if not os.path.exists(path):
+                raise ComposeError(f"Compose file not found: {path}")
+            with open(path, encoding="utf-8") as f:
+                config = merge_config(
+                    config, interpolate(yaml.safe_load(f) or {}, self.env)
+                )
+        self.services = config.get("services", {}) or {}
+        self.volumes = config.get("volumes", {}) or {}
+        self.networks = config.get("networks", {}) or {}
+        self.dependencies = {
+            name: self._parse_depends_on(service.get("depends_on"))
+            for name, service in self.services.items()
+        }
+
+    @staticmethod
+    def _parse_depends_on(depends_on):
+        if not depends_on:
+            return {}
+        if isinstance(depends_on, list):
+            return {name: "service_started" for name in depends_on}
+        return {
+            name: (options or {}).get("condition", "service_started")
+            for name, options in depends_on.items()
+        }
+
+    # Naming
+
+    def container_name(self, service):
+        return self.services[service].get(
+            "container_name", f"{self.name}-{service}-1"
+        )
+
+    def volume_name(self, volume):
+        config = self.volumes.get(volume) or {}
+        if config.get("external") or config.get("name"):
+            return config.get("name", volume)
+        return f"{self.name}_{volume}"
+
+    def network_name(self, network):
+        config = self.networks.get(network) or {}
+        if config.get("external") or config.get("name"):
+            return config.get("name", network)
+        return f"{self.name}_{network}"
+
+    def resolve(self, services=None):
+        """Requested services plus everything they depend on"""
+        pending = list(services or self.services)
+        selected = []
+        while pending:
+            service = pending.pop()
+            if service not in self.services:
+                raise ComposeError(f"No such service: {service}")
+            if service in selected:
+                continue
+            selected.append(service)
+            pending.extend(self.dependencies[service])
+        return selected
+
+    # Lifecycle
+
+    def up(self, client, services=None, log=print, wait_timeout=COMPOSE_WAIT_TIMEOUT):
+        """Create and start services, honouring depends_on conditions"""
+        selected = self.resolve(services)
+        self._ensure_networks(client, selected, log)
+        self._ensure_volumes(client, selected, log)
+
+        started = {service: threading.Event() for service in selected}
+        failed = {}
+
+        def bring_up(service):
+            try:
+                for dependency, condition in self.dependencies[service].items():
+                    started[dependency].wait()
+                    if dependency in failed:
+                        raise ComposeError(f"dependency {dependency} failed")
+                    self._wait_for(client, dependency, condition, wait_timeout, log)
+                self._start_service(client, service, log)
+            except Exception as e:
+                failed[service] = e
+                log(f"[!] {service}: {e}")
+            finally:
+                started[service].set()
+
+        with ThreadPoolExecutor(max_workers=len(selected)) as pool:
+            list(pool.map(bring_up, selected))
+        if failed:
+            raise ComposeError(
+                "; ".join(f"{service}: {error}" for service, error in failed.items())
+            )
+
+    def stop(self, client, services=None, log=print, timeout=COMPOSE_STOP_TIMEOUT):
+        """Stop service containers in parallel"""
+        names = [self.container_name(s) for s in (services or self.services)]
+
+        def stop_one(name):
+            try:
+                client.api.stop(name, timeout=timeout)
+                log(f"Container {name} stopped")
+            except NotFound:
+                pass
+
+        with ThreadPoolExecutor(max_workers=max(1, len(names))) as pool:
+            list(pool.map(stop_one, names))
+
+    def down(self, client, remove_volumes=False, log=print, timeout=COMPOSE_STOP_TIMEOUT):
+        """Stop and remove every project container, then its networks/volumes"""
+        containers = client.api.containers(
+            all=True, filters={"label": f"com.docker.compose.project={self.name}"}
+        )
+        names = {self.container_name(s) for s in self.services}
+        ids = {c["Id"] for c in containers}
+        for name in names:
+            try:
+                ids.add(client.api.inspect_container(name)["Id"])
+            except NotFound:
+                pass
+
+        def remove_one(container_id):
+            try:
+                client.api.stop(container_id, timeout=timeout)
+                client.api.remove_container(container_id, v=False, force=True)
+                log(f"Container {container_id[:12]} removed")
+            except NotFound:
+                pass
+
+        with ThreadPoolExecutor(max_workers=max(1, len(ids))) as pool:
+            list(pool.map(remove_one, ids))
+
+        for network, config in self.networks.items():
+            if (config or {}).get("external"):
+                continue
+            try:
+                client.api.remove_network(self.network_name(network))
+                log(f"Network {self.network_name(network)} removed")
+            except NotFound:
+                pass
+        if remove_volumes:
+            for volume, config in self.volumes.items():
+                if (config or {}).get("external"):
+                    continue
+                try:
+                    client.api.remove_volume(self.volume_name(volume))
+                    log(f"Volume {self.volume_name(volume)} removed")
+                except NotFound:
+                    pass
+
+    # Resources
+
+    def _service_networks(self, service):
+        networks = self.services[service].get("networks") or ["default"]
+        if isinstance(networks, dict):
+            return list(networks)
+        return networks
+
+    def _ensure_networks(self, client, services, log):
+        wanted = {n for s in services for n in self._service_networks(s)}
+        for network in wanted:
+            name = self.network_name(network)
+            if client.api.networks(names=[name]):
+                continue
+            config = self.networks.get(network) or {}
+            log(f"Network {name} creating")
+            client.api.create_network(
+                name,
+                driver=config.get("driver", "bridge"),
+                labels={
+                    "com.docker.compose.project": self.name,
+                    "com.docker.compose.network": network,
+                },
+            )
+
+    def _ensure_volumes(self, client, services, log):
+        for service in services:
+            for volume in self.services[service].get("volumes", []) or []:
+                source = volume.split(":", 1)[0] if isinstance(volume, str) else None
+                if source not in self.volumes:
+                    continue
+                name = self.volume_name(source)
+                try:
+                    client.api.inspect_volume(name)
+                except NotFound:
+                    log(f"Volume {name} creating")
+                    client.api.create_volume(
+                        name,
+                        driver=(self.volumes[source] or {}).get("driver", "local"),
+                        labels={
+                            "com.docker.compose.project": self.name,
+                            "com.docker.compose.volume": source,
+                        },
+                    )
+
+    # Containers
+
+    def _start_service(self, client, service, log):
+        name = self.container_name(service)
+        try:
+            state = client.api.inspect_container(name)["State"]
+        except NotFound:
+            state = None
+        if state and state.get("Running"):
+            log(f"Container {name} running")
+            return
+        if state is None:
+            self._create_container(client, service, log)
+        client.api.start(name)
+        log(f"Container {name} started")
+
+    def _create_container(self, client, service, log):
+        config = self.services[service]
+        name = self.container_name(service)
+        image = config.get("image")
+        if not image:
+            raise ComposeError(f"service {service} has no image")
+        try:
+            client.api.inspect_image(image)
+        except ImageNotFound:
+            if config.get("build"):
+                raise ComposeError(
+                    f"image {image} is not built, run 'python make.py install' first"
+                )
+            log(f"Pulling {image}")
+            repository, tag = split_image(image)
+            client.api.pull(repository, tag=tag)
+
+        ports, port_bindings = self._ports(config.get("ports", []))
+        networks = self._service_networks(service)
+        aliases = [service] + ([config["container_name"]] if "container_name" in config else [])
+        host_config = client.api.create_host_config(
+            binds=self._binds(config.get("volumes", [])),
+            port_bindings=port_bindings,
+            privileged=config.get("privileged", False),
+            cap_add=config.get("cap_add"),
+            security_opt=config.get("security_opt"),
+            tmpfs=self._tmpfs(config.get("tmpfs")),
+            mem_limit=config.get("mem_limit"),
+            ulimits=self._ulimits(config.get("ulimits")),
+            network_mode=self.network_name(networks[0]),
+            restart_policy=(
+                {"Name": config["restart"]} if config.get("restart") else None
+            ),
+        )
+        labels = {
+            **self._labels(config.get("labels")),
+            "com.docker.compose.project": self.name,
+            "com.docker.compose.service": service,
+            "com.docker.compose.container-number": "1",
+            "com.docker.compose.oneoff": "False",
+            "com.docker.compose.project.working_dir": self.working_dir,
+            "com.docker.compose.project.config_files": self.path,
+        }
+        command = config.get("command")
+        if isinstance(command, str):
+            command = shlex.split(command)
+        entrypoint = config.get("entrypoint")
+        if isinstance(entrypoint, str):
+            entrypoint = shlex.split(entrypoint)
+
+        log(f"Container {name} creating")
+        container = client.api.create_container(
+            image,
+            name=name,
+            command=command,
+            entrypoint=entrypoint,
+            user=str(config["user"]) if "user" in config else None,
+            hostname=config.get("hostname"),
+            environment=self._environment(config.get("environment")),
+            ports=ports,
+            labels=labels,
+            healthcheck=self._healthcheck(config.get("healthcheck")),
+            host_config=host_config,
+            networking_config=client.api.create_networking_config(
+                {
+                    self.network_name(networks[0]): client.api.create_endpoint_config(
+                        aliases=aliases
+                    )
+                }
+            ),
+        )
+        for network in networks[1:]:
+            client.api.connect_container_to_network(
+                container["Id"], self.network_name(network), aliases=aliases
+            )
+
+    def _wait_for(self, client, service, condition, timeout, log):
+        name = self.container_name(service)
+        deadline = time.monotonic() + timeout
+        delay = 0.5
+        logged = False
+        while True:
+            state = client.api.inspect_container(name)["State"]
+            health = (state.get("Health") or {}).get("Status")
+            if condition == "service_healthy" and health == "healthy":
+                return
+            if condition == "service_started" and (
+                state.get("Running") or state.get("Status") == "exited"
+            ):
+                return
+            if condition == "service_completed_successfully" and state.get("Status") == "exited":
+                if state.get("ExitCode") == 0:
+                    return
+                raise ComposeError(f"{service} exited with code {state.get('ExitCode')}")
+            if condition == "service_healthy" and state.get("Status") == "exited":
+                raise ComposeError(f"{service} exited before becoming healthy")
+            if time.monotonic() > deadline:
+                raise ComposeError(f"timed out waiting for {service} ({condition})")
+            if not logged:
+                log(f"Waiting for {name} ({condition})")
+                logged = True
+            time.sleep(delay)
+            delay = min(delay * 2, 5)
+
+    # Config conversion
+
+    @staticmethod
+    def _ports(entries):
+        ports, bindings = [], {}
+        for entry in entries or []:
+            entry = str(entry)
+            protocol = "tcp"
+            if "/" in entry:
+                entry, protocol = entry.split("/", 1)
+            parts = entry.split(":")
+            container_port = int(parts[-1])
+            key = container_port if protocol == "tcp" else (container_port, protocol)
+            ports.append(key)
+            if len(parts) == 2:
+                bindings[f"{container_port}/{protocol}"] = int(parts[0])
+            elif len(parts) == 3:
+                bindings[f"{container_port}/{protocol}"] = (parts[0], int(parts[1]))
+            else:
+                bindings[f"{container_port}/{protocol}"] = None
+        return ports, bindings
+
+    def _binds(self, volumes):
+        binds = []
+        for volume in volumes or []:
+            parts = volume.split(":")
+            source, target = parts[0], parts[1]
+            mode = parts[2] if len(parts) > 2 else "rw"
+            if source in self.volumes:
+                source = self.volume_name(source)
+            elif source.startswith("."):
+                source = os.path.normpath(os.path.join(self.working_dir, source))
+            binds.append(f"{source}:{target}:{mode}")
+        return binds
+
+    @staticmethod
+    def _tmpfs(tmpfs):
+        if not tmpfs:
+            return None
+        if isinstance(tmpfs, str):
+            tmpfs = [tmpfs]
+        return {path: "" for path in tmpfs}
+
+    @staticmethod
+    def _ulimits(ulimits):
+        if not ulimits:
+            return None
+        result = []
+        for name, value in ulimits.items():
+            if isinstance(value, dict):
+                result.append(Ulimit(name=name, soft=value["soft"], hard=value["hard"]))
+            else:
+                result.append(Ulimit(name=name, soft=value, hard=value))
+        return result
+
+    def _environment(self, environment):
+        if not environment:
+            return None
+        if not isinstance(environment, dict):
+            environment = dict(
+                item.split("=", 1) if "=" in item else (item, None)
+                for item in environment
+            )
+        result = {}
+        for key, value in environment.items():
+            if value is None:
+                # Bare names pass the caller's value through, or stay unset
+                if key not in self.env:
+                    continue
+                value = self.env[key]
+            result[key] = str(value)
+        return result
+
+    @staticmethod
+    def _labels(labels):
+        if not labels:
+            return {}
+        if isinstance(labels, dict):
+            return {k: str(v) for k, v in labels.items()}
+        return dict(label.split("=", 1) for label in labels)
+
+    @staticmethod
+    def _healthcheck(healthcheck):
+        if not healthcheck or healthcheck.get("disable"):
+            return None
+        test = healthcheck.get("test")
+        if isinstance(test, str):
+            test = ["CMD-SHELL", test]
+        return {
+            "test": test,
+            "interval": parse_duration(healthcheck.get("interval")),
+            "timeout": parse_duration(healthcheck.get("timeout")),
+            "retries": healthcheck.get("retries"),
+            "start_period": parse_duration(healthcheck.get("start_period")),
+        }
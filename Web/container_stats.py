@@ -0,0 +1,253 @@
+import os
+import threading
+import time
+from array import array
+
+import requests
+from docker.errors import DockerException
+
+from docker_client import SharedDockerClient
+
+# Samples kept per container (the daemon streams about one per second)
+STATS_HISTORY = int(os.getenv("STATS_HISTORY", "3600"))
+# Initial connections for the streaming readers, one per running lab container;
+# the pool grows when more containers run (tenant labs)
+STATS_POOL_SIZE = int(os.getenv("STATS_POOL_SIZE", "32"))
+# Spare connections kept above the number of running containers
+STATS_POOL_HEADROOM = int(os.getenv("STATS_POOL_HEADROOM", "8"))
+# Points returned by the stats endpoint before samples are averaged together
+STATS_MAX_POINTS = int(os.getenv("STATS_MAX_POINTS", "300"))
+# Seconds between pushes of every container's latest sample to /api/stream
+STATS_PUSH_INTERVAL = float(os.getenv("STATS_PUSH_INTERVAL", "5"))
+
+FIELDS = ("time", "cpu_percent", "mem_bytes", "mem_percent", "rx_bps", "tx_bps")
+
+
+class RingBuffer:
+    """Fixed-capacity columns of floats; the oldest sample is overwritten.
+
+    Each field is a preallocated ``array('d')``, so a buffer costs
+    ``capacity * len(fields) * 8`` bytes however long the container runs.
+    """
+
+    def __init__(self, capacity, fields=FIELDS):
+        self.capacity = capacity
+        self.fields = fields
+        self.columns = {name: array("d", bytes(8 * capacity)) for name in fields}
+        self.head = 0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def append(self, sample):
+        with self._lock:
+            for name in self.fields:
+                self.columns[name][self.head] = sample[name]
+            self.head = (self.head + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+
+    def since(self, start):
+        """Samples with time >= start, oldest first, as {field: [values]}"""
+        with self._lock:
+            first = (self.head - self.count) % self.capacity
+            order = [(first + i) % self.capacity for i in range(self.count)]
+            times = self.columns["time"]
+            order = [i for i in order if times[i] >= start]
+            return {
+                name: [self.columns[name][i] for i in order] for name in self.fields
+            }
+
+    def latest(self):
+        with self._lock:
+            if not self.count:
+                return None
+            index = (self.head - 1) % self.capacity
+            return {name: self.columns[name][index] for name in self.fields}
+
+
+def downsample(series, max_points):
+    """Average consecutive samples so at most max_points remain"""
+    length = len(series["time"])
+    if length <= max_points:
+        return series
+    step = length / max_points
+    result = {name: [] for name in series}
+    for point in range(max_points):
+        start, end = int(point * step), int((point + 1) * step)
+        for name, values in series.items():
+            chunk = values[start:end]
+            result[name].append(sum(chunk) / len(chunk))
+    return result
+
+
+def decode_sample(raw, previous):
+    """Turn one Docker stats frame into a sample; needs the previous frame for rates"""
+    cpu, precpu = raw.get("cpu_stats") or {}, raw.get("precpu_stats") or {}
+    cpu_delta = cpu.get("cpu_usage", {}).get("total_usage", 0) - precpu.get(
+        "cpu_usage", {}
+    ).get("total_usage", 0)
+    system_delta = cpu.get("system_cpu_usage", 0) - precpu.get("system_cpu_usage", 0)
+    cpus = cpu.get("online_cpus") or len(
+        cpu.get("cpu_usage", {}).get("percpu_usage") or [1]
+    )
+    cpu_percent = (
+        cpu_delta / system_delta * cpus * 100 if cpu_delta > 0 and system_delta > 0 else 0.0
+    )
+
+    memory = raw.get("memory_stats") or {}
+    # Match `docker stats`: page cache that can be reclaimed is not "used"
+    cache = (memory.get("stats") or {}).get("inactive_file", 0)
+    mem_bytes = max(0, memory.get("usage", 0) - cache)
+    limit = memory.get("limit") or 0
+    mem_percent = mem_bytes / limit * 100 if limit else 0.0
+
+    networks = (raw.get("networks") or {}).values()
+    rx = sum(n.get("rx_bytes", 0) for n in networks)
+    tx = sum(n.get("tx_bytes", 0) for n in networks)
+    now = time.time()
+    rx_bps = tx_bps = 0.0
+    if previous is not None:
+        elapsed = now - previous["time"]
+        if elapsed > 0:
+            rx_bps = max(0, rx - previous["rx"]) / elapsed
+            tx_bps = max(0, tx - previous["tx"]) / elapsed
+    sample = {
+        "time": now,
+        "cpu_percent": cpu_percent,
+        "mem_bytes": mem_bytes,
+        "mem_percent": mem_percent,
+        "rx_bps": rx_bps,
+        "tx_bps": tx_bps,
+    }
+    return sample, {"time": now, "rx": rx, "tx": tx}
+
+
+class StatsCollector:
+    """One streaming ``stats`` reader per running lab container.
+
+    Each reader thread keeps a single streaming ``stats`` API
+    response open and decodes its frames into that container's
+    ``RingBuffer``. Readers follow the inventory: they start when a container
+    is running and end when its stream closes. Buffers are dropped when the
+    container is removed. The streams hold their connections for as long as
+    they run, so they use their own Docker client rather than the pool the
+    routes share. That pool is kept larger than the number of running
+    containers: when it is too small, new readers get a client with a bigger
+    pool and the streams already open keep theirs.
+
+    Once started, the latest sample of every container is pushed through
+    ``publish("stats", {short_id: sample})`` every ``push_interval`` seconds,
+    so dashboards do not poll; ``history`` serves on-demand charts.
+    """
+
+    def __init__(
+        self,
+        docker_client,
+        inventory,
+        capacity=STATS_HISTORY,
+        publish=None,
+        push_interval=STATS_PUSH_INTERVAL,
+    ):
+        self.docker_client = docker_client
+        self.inventory = inventory
+        self.capacity = capacity
+        self.publish = publish
+        self.push_interval = push_interval
+        self.buffers = {}
+        self._readers = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._pusher = None
+
+    def start(self):
+        if self.publish is None or (self._pusher and self._pusher.is_alive()):
+            return
+        self._stopped.clear()
+        self._pusher = threading.Thread(target=self._push, name="stats-push", daemon=True)
+        self._pusher.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _push(self):
+        while not self._stopped.wait(self.push_interval):
+            latest = self.latest()
+            if latest:
+                self.publish("stats", latest)
+
+    def latest(self):
+        """Newest sample per container, keyed by short id"""
+        with self._lock:
+            buffers = list(self.buffers.items())
+        latest = {}
+        for container_id, buffer in buffers:
+            sample = buffer.latest()
+            if sample is not None:
+                latest[container_id[:12]] = sample
+        return latest
+
+    def sync(self, *_):
+        """Start readers for running containers and forget removed ones"""
+        records = {record["id"]: record for record in self.inventory.containers()}
+        running = sum(record["status"] == "running" for record in records.values())
+        with self._lock:
+            self._fit_pool(running)
+            for container_id in list(self.buffers):
+                if container_id not in records:
+                    del self.buffers[container_id]
+            for container_id, record in records.items():
+                reader = self._readers.get(container_id)
+                if record["status"] != "running" or (reader and reader.is_alive()):
+                    continue
+                self.buffers.setdefault(container_id, RingBuffer(self.capacity))
+                reader = threading.Thread(
+                    target=self._read,
+                    args=(container_id,),
+                    name=f"stats-{record['short_id']}",
+                    daemon=True,
+                )
+                self._readers[container_id] = reader
+                reader.start()
+
+    def _fit_pool(self, running):
+        """Make sure the client's pool has room for every stream"""
+        needed = running + STATS_POOL_HEADROOM
+        if needed <= self.docker_client.pool_size:
+            return
+        size = max(needed, self.docker_client.pool_size * 2)
+        print(f"Stats streams: {running} containers running, growing pool to {size}")
+        # Replacing (not resetting) the client leaves the open streams alone
+        self.docker_client = SharedDockerClient(
+            pool_size=size, timeout=self.docker_client.timeout
+        )
+
+    def _read(self, container_id):
+        previous = None
+        try:
+            stream = self.docker_client.call(
+                lambda client: client.api.stats(container_id, stream=True, decode=True)
+            )
+            for raw in stream:
+                if not raw.get("read") or raw["read"].startswith("0001-"):
+                    # Frame for a stopped container
+                    break
+                sample, previous = decode_sample(raw, previous)
+                buffer = self.buffers.get(container_id)
+                if buffer is None:
+                    break
+                buffer.append(sample)
+        except (requests.RequestException, DockerException) as e:
+            print(f"Stats stream for {container_id[:12]} ended: {e}")
+        finally:
+            with self._lock:
+                if self._readers.get(container_id) is threading.current_thread():
+                    del self._readers[container_id]
+
+    def history(self, container_id, seconds, max_points=None):
+        """Recent samples for one container, averaged down to max_points"""
+        buffer = self.buffers.get(container_id)
+        if buffer is None:
+            return None
+        series = downsample(
+            buffer.since(time.time() - seconds), max_points or STATS_MAX_POINTS
+        )
+        return {"latest": buffer.latest(), "samples": series}
@@ -0,0 +1,330 @@
+import collections
+import os
+import threading
+import time
+
+# Seconds between detector polls
+DETECTOR_INTERVAL = float(os.getenv("DETECTOR_INTERVAL", "2"))
+# Sliding window (seconds) the per source/target counters cover
+DETECTOR_WINDOW = float(os.getenv("DETECTOR_WINDOW", "60"))
+# Seconds re-read behind the newest document to catch late-indexed ones
+DETECTOR_LAG = float(os.getenv("DETECTOR_LAG", "10"))
+# Concurrent connections from one source to one target that count as a surge
+DETECTOR_CONNECTIONS = int(os.getenv("DETECTOR_CONNECTIONS", "100"))
+# Request timeouts (408) per window from one source to one target
+DETECTOR_TIMEOUTS = int(os.getenv("DETECTOR_TIMEOUTS", "20"))
+# Share of a source's open connections that must be slow (few bytes, long-lived)
+DETECTOR_SLOW_RATIO = float(os.getenv("DETECTOR_SLOW_RATIO", "0.5"))
+# Documents read per index per poll; the rest is picked up by the next poll
+DETECTOR_MAX_DOCS = int(os.getenv("DETECTOR_MAX_DOCS", "20000"))
+
+PAGE_SIZE = 1000
+PIT_KEEP_ALIVE = "30s"
+# A flow that sent at most this many bytes in this many seconds is "slow"
+SLOW_FLOW_BYTES = 4096
+SLOW_FLOW_SECONDS = 5
+# Status codes servers log when a client never finishes its request
+TIMEOUT_STATUS_CODES = (408,)
+# Access logs parsed into http.response.status_code by the Filebeat modules
+# of target-nginx (nginx) and target-httpd (apache)
+ACCESS_LOG_DATASETS = ("nginx.access", "apache.access")
+
+SOURCES = {
+    "packetbeat": {
+        "index": "packetbeat-*",
+        "query": {"term": {"event.dataset": "flow"}},
+        "fields": [
+            "host.name",
+            "flow.id",
+            "flow.final",
+            "source.ip",
+            "source.bytes",
+            "event.duration",
+        ],
+    },
+    "filebeat": {
+        "index": "filebeat-*",
+        "query": {
+            "bool": {
+                "filter": [
+                    {"terms": {"event.dataset": ACCESS_LOG_DATASETS}},
+                    {"terms": {"http.response.status_code": TIMEOUT_STATUS_CODES}},
+                ]
+            }
+        },
+        "fields": ["host.name", "source.address", "source.ip"],
+    },
+}
+
+
+def field(document, path):
+    for part in path.split("."):
+        if not isinstance(document, dict):
+            return None
+        document = document.get(part)
+    return document
+
+
+class TailCursor:
+    """Position of the detector in one index pattern.
+
+    Every poll opens a point in time, pages forward with ``search_after`` from
+    just behind the newest ``@timestamp`` already seen and closes it again.
+    Only documents newer than the cursor (minus the indexing lag) are read,
+    so a poll costs the same however large the indices get. Documents in the
+    lag overlap are skipped by id.
+    """
+
+    def __init__(self, es_pool, name, source, start):
+        self.es_pool = es_pool
+        self.name = name
+        self.source = source
+        self.high_water = int(start * 1000)
+        self.seen = {}
+
+    def _call(self, method, path, **kwargs):
+        response = self.es_pool.request(method, path, **kwargs)
+        if response.status_code != 200:
+            raise RuntimeError(
+                f"{self.name}: {method} {path} returned {response.status_code}: "
+                f"{response.text[:300]}"
+            )
+        return response.json()
+
+    def poll(self):
+        """Return new documents as (timestamp_ms, _source), oldest first"""
+        pit = self._call(
+            "POST",
+            f"/{self.source['index']}/_pit",
+            params={"keep_alive": PIT_KEEP_ALIVE, "ignore_unavailable": "true"},
+        )["id"]
+        since = self.high_water - int(DETECTOR_LAG * 1000)
+        documents = []
+        search_after = None
+        try:
+            while len(documents) < DETECTOR_MAX_DOCS:
+                body = {
+                    "size": PAGE_SIZE,
+                    "pit": {"id": pit, "keep_alive": PIT_KEEP_ALIVE},
+                    "sort": [{"@timestamp": "asc"}, {"_shard_doc": "asc"}],
+                    "_source": self.source["fields"],
+                    "track_total_hits": False,
+                    "query": {
+                        "bool": {
+                            "filter": [
+                                self.source["query"],
+                                {
+                                    "range": {
+                                        "@timestamp": {
+                                            "gte": since,
+                                            "format": "epoch_millis",
+                                        }
+                                    }
+                                },
+                            ]
+                        }
+                    },
+                }
+                if search_after:
+                    body["search_after"] = search_after
+                result = self._call("POST", "/_search", json=body)
+                pit = result.get("pit_id", pit)
+                hits = result["hits"]["hits"]
+                for hit in hits:
+                    timestamp = hit["sort"][0]
+                    if hit["_id"] in self.seen:
+                        continue
+                    self.seen[hit["_id"]] = timestamp
+                    self.high_water = max(self.high_water, timestamp)
+                    documents.append((timestamp, hit["_source"]))
+                if len(hits) < PAGE_SIZE:
+                    break
+                search_after = hits[-1]["sort"]
+        finally:
+            try:
+                self.es_pool.request("DELETE", "/_pit", json={"id": pit})
+            except OSError:
+                pass
+        # Ids older than the overlap can no longer come back
+        horizon = self.high_water - int(DETECTOR_LAG * 1000)
+        self.seen = {i: t for i, t in self.seen.items() if t >= horizon}
+        return documents
+
+
+class PairWindow:
+    """Sliding-window counters for one (source IP, target) pair"""
+
+    def __init__(self):
+        # flow.id -> (last report time, slow, final)
+        self.flows = {}
+        self.timeouts = collections.deque()
+
+    def add_flow(self, timestamp, document):
+        duration = (field(document, "event.duration") or 0) / 1e9
+        sent = field(document, "source.bytes") or 0
+        slow = duration >= SLOW_FLOW_SECONDS and sent <= SLOW_FLOW_BYTES
+        self.flows[field(document, "flow.id")] = (
+            timestamp,
+            slow,
+            bool(field(document, "flow.final")),
+        )
+
+    def add_timeout(self, timestamp):
+        self.timeouts.append(timestamp)
+
+    def expire(self, horizon):
+        while self.timeouts and self.timeouts[0] < horizon:
+            self.timeouts.popleft()
+        for flow_id in [f for f, (t, _, _) in self.flows.items() if t < horizon]:
+            del self.flows[flow_id]
+
+    def counts(self):
+        open_flows = [slow for _, slow, final in self.flows.values() if not final]
+        return {
+            "connections": len(open_flows),
+            "slow_connections": sum(open_flows),
+            "timeouts": len(self.timeouts),
+        }
+
+    def empty(self):
+        return not self.flows and not self.timeouts
+
+
+class SlowlorisDetector:
+    """Tail beats documents and raise alerts for the Slowloris signature.
+
+    The signs listed in Attacks/DoS/DoS.md are tracked per (source IP, target)
+    pair over a sliding window: many concurrent connections, most of them
+    long-lived and almost silent (Packetbeat flows), and servers timing out
+    incomplete requests (408s in the access logs). Alerts are pushed through
+    ``publish(event, data)`` when they start, change severity and clear.
+    """
+
+    def __init__(self, es_pool, publish, interval=DETECTOR_INTERVAL, window=DETECTOR_WINDOW):
+        self.es_pool = es_pool
+        self.publish = publish
+        self.interval = interval
+        self.window = window
+        self.pairs = {}
+        self.cursors = {}
+        self._active = {}
+        self._history = collections.deque(maxlen=100)
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.last_poll = None
+        self.last_error = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="detector", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self.poll()
+                self.last_error = None
+            except Exception as e:
+                if self.last_poll is None:
+                    # Never got going; start from a fresh window once ELK is up
+                    self.cursors = {}
+                # Typically ELK is not up yet; keep trying quietly
+                if str(e) != self.last_error:
+                    print(f"Detector poll failed: {e}")
+                self.last_error = str(e)
+            self._stopped.wait(self.interval)
+
+    def poll(self):
+        """Read new documents, update the counters and evaluate touched pairs"""
+        now = time.time()
+        if not self.cursors:
+            # Start at the current window instead of replaying the indices
+            self.cursors = {
+                name: TailCursor(self.es_pool, name, source, now - self.window)
+                for name, source in SOURCES.items()
+            }
+        touched = set()
+        for name, cursor in self.cursors.items():
+            for timestamp, document in cursor.poll():
+                target = field(document, "host.name")
+                if name == "packetbeat":
+                    source_ip = field(document, "source.ip")
+                else:
+                    source_ip = field(document, "source.address") or field(
+                        document, "source.ip"
+                    )
+                if not target or not source_ip:
+                    continue
+                key = (source_ip, target)
+                pair = self.pairs.setdefault(key, PairWindow())
+                if name == "packetbeat":
+                    pair.add_flow(timestamp / 1000, document)
+                else:
+                    pair.add_timeout(timestamp / 1000)
+                touched.add(key)
+
+        horizon = now - self.window
+        for key in list(self.pairs):
+            self.pairs[key].expire(horizon)
+            if self.pairs[key].empty():
+                del self.pairs[key]
+        # Pairs whose counters changed, plus active alerts that may have cleared
+        for key in touched | set(self._active):
+            self._evaluate(key, now)
+        self.last_poll = now
+
+    def _evaluate(self, key, now):
+        pair = self.pairs.get(key)
+        counts = pair.counts() if pair else {"connections": 0, "slow_connections": 0, "timeouts": 0}
+        signals = []
+        if counts["connections"] >= DETECTOR_CONNECTIONS:
+            signals.append("connection_surge")
+            if counts["slow_connections"] >= DETECTOR_SLOW_RATIO * counts["connections"]:
+                signals.append("slow_connections")
+        if counts["timeouts"] >= DETECTOR_TIMEOUTS:
+            signals.append("request_timeouts")
+        severity = None
+        if signals:
+            severity = "critical" if len(signals) > 1 else "warning"
+
+        with self._lock:
+            alert = self._active.get(key)
+            if severity is None:
+                if alert is None:
+                    return
+                del self._active[key]
+                alert = {**alert, "active": False, "cleared_at": now, "counts": counts}
+                self._history.appendleft(alert)
+            elif alert is None or alert["severity"] != severity or alert["signals"] != signals:
+                alert = {
+                    "id": alert["id"] if alert else f"{key[0]}>{key[1]}@{int(now)}",
+                    "source_ip": key[0],
+                    "target": key[1],
+                    "severity": severity,
+                    "signals": signals,
+                    "counts": counts,
+                    "started_at": alert["started_at"] if alert else now,
+                    "updated_at": now,
+                    "active": True,
+                }
+                self._active[key] = alert
+            else:
+                # Same state, only fresher counts; not worth a push
+                alert.update(counts=counts, updated_at=now)
+                return
+        self.publish("alert", alert)
+
+    def alerts(self):
+        with self._lock:
+            return {
+                "active": [dict(alert) for alert in self._active.values()],
+                "recent": list(self._history),
+                "last_poll": self.last_poll,
+                "error": self.last_error,
+            }
@@ -0,0 +1,122 @@
+import os
+import sys
+import threading
+
+import docker
+import requests
+
+# Size of the HTTP connection pool shared by every route
+DOCKER_POOL_SIZE = int(os.getenv("DOCKER_POOL_SIZE", "10"))
+# Timeout (seconds) for a single Docker API call
+DOCKER_TIMEOUT = int(os.getenv("DOCKER_TIMEOUT", "60"))
+
+
+def get_docker_socket_path():
+    """Get Docker socket path"""
+    # Check different platforms and tools
+    socket_paths = {
+        "darwin": [
+            "~/.orbstack/run/docker.sock",  # OrbStack
+            "/var/run/docker.sock",  # Docker Desktop
+            "~/.docker/run/docker.sock",  # Colima
+        ],
+        "linux": [
+            "/var/run/docker.sock",  # Standard Linux
+            "/run/user/1000/docker.sock",  # User-level Docker
+        ],
+        "win32": [
+            "//./pipe/docker_engine",  # Windows Docker Desktop
+        ],
+    }
+
+    # Get current platform
+    platform = sys.platform
+    if platform not in socket_paths:
+        platform = "linux"  # Default to Linux path
+
+    # Check all possible paths
+    for path in socket_paths[platform]:
+        if os.path.exists(os.path.expanduser(path)):
+            return os.path.expanduser(path)
+
+    # If no socket found, return default path
+    return socket_paths[platform][0]
+
+
+def get_docker_base_url():
+    """Get Docker daemon URL, honouring DOCKER_HOST when set"""
+    if os.getenv("DOCKER_HOST"):
+        return os.getenv("DOCKER_HOST")
+    socket_path = get_docker_socket_path()
+    if socket_path.startswith("//./pipe/"):
+        return f"npipe:{socket_path}"
+    return f"unix://{socket_path}"
+
+
+class SharedDockerClient:
+    """Process-wide Docker client backed by one pooled HTTP session.
+
+    The underlying ``docker.DockerClient`` is created on first use and reused
+    by every caller; its urllib3 pool holds up to ``pool_size`` keep-alive
+    connections to the daemon, so concurrent requests share sockets instead of
+    opening a new session each time. When the daemon connection breaks the
+    client is dropped and rebuilt on the next call.
+    """
+
+    def __init__(self, pool_size=DOCKER_POOL_SIZE, timeout=DOCKER_TIMEOUT):
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._client = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Return the shared client, connecting if necessary"""
+        client = self._client
+        if client is not None:
+            return client
+        with self._lock:
+            if self._client is None:
+                client = docker.DockerClient(
+                    base_url=get_docker_base_url(),
+                    timeout=self.timeout,
+                    max_pool_size=self.pool_size,
+                )
+                # Test connection
+                client.ping()
+                self._client = client
+            return self._client
+
+    def reset(self, client=None):
+        """Drop the shared client so the next call reconnects"""
+        with self._lock:
+            if self._client is None:
+                return
+            if client is not None and client is not self._client:
+                # Another thread already reconnected
+                return
+            try:
+                self._client.close()
+            except Exception:
+                pass
+            self._client = None
+
+    def call(self, func, *args, **kwargs):
+        """Run func(client, *args, **kwargs), reconnecting once on connection loss"""
+        client = self.get()
+        try:
+            return func(client, *args, **kwargs)
+        except requests.exceptions.ConnectionError as e:
+            # Only transport failures (typically a stale pooled socket) are
+            # retried; API and other errors are raised unchanged so that
+            # create/start/remove are not re-run after the daemon acted on them
+            print(f"Docker connection lost, reconnecting: {str(e)}")
+            self.reset(client)
+            return func(self.get(), *args, **kwargs)
+
+
+docker_client = SharedDockerClient()
+
+
+def get_docker_client():
+    """Get the shared Docker client"""
+    return docker_client.get()
@@ -0,0 +1,218 @@
+import os
+import threading
+import time
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import InsecureRequestWarning
+
+# The lab's Elasticsearch uses a self-signed CA
+urllib3.disable_warnings(InsecureRequestWarning)
+
+# Seconds between background probes
+ELK_HEALTH_INTERVAL = float(os.getenv("ELK_HEALTH_INTERVAL", "5"))
+# Seconds a probe result stays valid
+ELK_HEALTH_TTL = float(os.getenv("ELK_HEALTH_TTL", "30"))
+# Timeout (seconds) for a single probe request
+ELK_PROBE_TIMEOUT = float(os.getenv("ELK_PROBE_TIMEOUT", "5"))
+
+COMPONENTS = {
+    "elasticsearch": {
+        "container": "elk-es01-1",
+        "url_template": "https://{host}:9200",
+        "label": "Elasticsearch",
+        "code": "ES",
+    },
+    "kibana": {
+        "container": "elk-kibana-1",
+        "url_template": "http://{host}:5601",
+        "label": "Kibana",
+        "code": "KIBANA",
+    },
+}
+
+
+def make_session(auth=None, pool_size=2):
+    """Create a keep-alive session for probing one ELK component"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.verify = False
+    session.auth = auth
+    return session
+
+
+class ElkHealthMonitor:
+    """Probe Elasticsearch and Kibana in the background and cache the result.
+
+    Callers read the last known state through ``status()`` or ``snapshot()``
+    and never wait on the network. A result older than ``ttl`` seconds is
+    reported as stale rather than healthy. ``refresh()`` wakes the prober
+    early, e.g. when an ELK container changes state. With ``es_pool`` the
+    Elasticsearch probe goes through the shared node pool, so any running
+    node of a multi-node cluster can answer it.
+    """
+
+    def __init__(
+        self,
+        resolve_host,
+        elastic_password,
+        interval=ELK_HEALTH_INTERVAL,
+        ttl=ELK_HEALTH_TTL,
+        timeout=ELK_PROBE_TIMEOUT,
+        es_pool=None,
+    ):
+        self.resolve_host = resolve_host
+        self.es_pool = es_pool
+        self.interval = interval
+        self.ttl = ttl
+        self.timeout = timeout
+        self.sessions = {
+            "elasticsearch": make_session(auth=("elastic", elastic_password)),
+            "kibana": make_session(),
+        }
+        self._state = {name: {"healthy": False, "checked_at": None} for name in COMPONENTS}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="elk-health", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+
+    def refresh(self):
+        """Ask the background prober to run now"""
+        self._wake.set()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self.probe()
+            except Exception as e:
+                print(f"ELK health probe failed: {e}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def probe(self):
+        """Probe every component once and store the results"""
+        for name, component in COMPONENTS.items():
+            result = self._probe_component(name, component)
+            with self._lock:
+                previous = self._state[name]
+                if result["healthy"]:
+                    result["healthy_since"] = (
+                        previous.get("healthy_since")
+                        if previous.get("healthy")
+                        else result["checked_at"]
+                    )
+                self._state[name] = result
+
+    def _probe_component(self, name, component):
+        checked_at = time.time()
+        pooled = name == "elasticsearch" and self.es_pool is not None
+        if pooled:
+            hosts = self.es_pool.hosts()
+            host = hosts[0] if hosts else None
+        else:
+            host = self.resolve_host(component["container"])
+        if not host:
+            return {
+                "healthy": False,
+                "code": f"{component['code']}_IP_NOT_FOUND",
+                "message": f"Unable to get {component['label']} IP",
+                "details": f"{component['label']} container might not be running or network configuration is incorrect",
+                "checked_at": checked_at,
+                "latency_ms": None,
+            }
+
+        url = component["url_template"].format(host=host)
+        started = time.perf_counter()
+        try:
+            if pooled:
+                response = self.es_pool.request("GET", "/", timeout=self.timeout)
+                url = response.url
+            else:
+                response = self.sessions[name].get(url, timeout=self.timeout)
+        except requests.RequestException as e:
+            return {
+                "healthy": False,
+                "code": "REQUEST_FAILED",
+                "message": f"{component['label']} check failed",
+                "details": str(e),
+                "url": url,
+                "checked_at": checked_at,
+                "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+            }
+        latency_ms = round((time.perf_counter() - started) * 1000, 1)
+        if response.status_code != 200:
+            return {
+                "healthy": False,
+                "code": f"{component['code']}_NOT_READY",
+                "message": f"{component['label']} not running properly",
+                "details": f"Status code: {response.status_code}, Response: {response.text[:500]}",
+                "url": url,
+                "checked_at": checked_at,
+                "latency_ms": latency_ms,
+            }
+        return {
+            "healthy": True,
+            "code": "SUCCESS",
+            "message": f"{component['label']} running properly",
+            "details": "",
+            "url": url,
+            "checked_at": checked_at,
+            "latency_ms": latency_ms,
+        }
+
+    def snapshot(self):
+        """Last known state of every component, with staleness flags"""
+        now = time.time()
+        with self._lock:
+            components = {name: dict(state) for name, state in self._state.items()}
+        for state in components.values():
+            checked_at = state.get("checked_at")
+            state["age"] = round(now - checked_at, 1) if checked_at else None
+            state["stale"] = checked_at is None or now - checked_at > self.ttl
+        return {
+            "healthy": all(s["healthy"] and not s["stale"] for s in components.values()),
+            "checked_at": now,
+            "ttl": self.ttl,
+            "components": components,
+        }
+
+    def status(self):
+        """Return (ok, info) from the cached state without blocking"""
+        snapshot = self.snapshot()
+        for name in COMPONENTS:
+            state = snapshot["components"][name]
+            if state["stale"]:
+                # Nothing recent to go on; have the prober look right away
+                self.refresh()
+                return False, {
+                    "code": "CHECK_STALE",
+                    "message": "ELK environment status is not known yet",
+                    "details": f"No {COMPONENTS[name]['label']} probe in the last {self.ttl:g}s, try again shortly",
+                }
+            if not state["healthy"]:
+                return False, {
+                    "code": state["code"],
+                    "message": state["message"],
+                    "details": state["details"],
+                }
+        return True, {
+            "code": "SUCCESS",
+            "message": "ELK environment running properly",
+            "details": "All components are running and properly configured",
+        }
@@ -0,0 +1,90 @@
+import itertools
+import os
+import threading
+import time
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import InsecureRequestWarning
+
+# The lab's Elasticsearch uses a self-signed CA
+urllib3.disable_warnings(InsecureRequestWarning)
+
+# Keep-alive connections kept per Elasticsearch node
+ES_POOL_MAXSIZE = int(os.getenv("ES_POOL_MAXSIZE", "10"))
+# Seconds a node that refused a connection is skipped
+ES_NODE_COOLDOWN = float(os.getenv("ES_NODE_COOLDOWN", "10"))
+# Default timeout (seconds) for a single Elasticsearch request
+ES_REQUEST_TIMEOUT = float(os.getenv("ES_REQUEST_TIMEOUT", "10"))
+
+
+class EsNodePool:
+    """Spread Elasticsearch requests round-robin across the cluster's nodes.
+
+    ``resolve_hosts`` returns the addresses of the nodes that are currently
+    running (one for the default single-node stack, N after
+    ``make.py install --nodes N``). All nodes share one keep-alive session.
+    A node that fails to connect is skipped for ``cooldown`` seconds and the
+    request moves on to the next one, so a stopped node only costs one
+    failed attempt.
+    """
+
+    def __init__(
+        self,
+        resolve_hosts,
+        auth,
+        port=9200,
+        timeout=ES_REQUEST_TIMEOUT,
+        cooldown=ES_NODE_COOLDOWN,
+        pool_size=ES_POOL_MAXSIZE,
+    ):
+        self.resolve_hosts = resolve_hosts
+        self.port = port
+        self.timeout = timeout
+        self.cooldown = cooldown
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.verify = False
+        self.session.auth = auth
+        self._counter = itertools.count()
+        self._down_until = {}
+        self._lock = threading.Lock()
+
+    def hosts(self):
+        """Node addresses, in a stable order"""
+        return sorted(self.resolve_hosts())
+
+    def _candidates(self):
+        """Hosts to try for one request: rotated, nodes in cooldown last"""
+        hosts = self.hosts()
+        if not hosts:
+            return []
+        start = next(self._counter) % len(hosts)
+        rotated = hosts[start:] + hosts[:start]
+        now = time.monotonic()
+        with self._lock:
+            up = [h for h in rotated if self._down_until.get(h, 0) <= now]
+        return up + [h for h in rotated if h not in up]
+
+    def request(self, method, path, **kwargs):
+        """Send one request to the next node, failing over on connection errors"""
+        kwargs.setdefault("timeout", self.timeout)
+        candidates = self._candidates()
+        if not candidates:
+            raise requests.ConnectionError("No Elasticsearch node is running")
+        error = None
+        for host in candidates:
+            url = f"https://{host}:{self.port}{path}"
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = e
+                with self._lock:
+                    self._down_until[host] = time.monotonic() + self.cooldown
+                continue
+            with self._lock:
+                self._down_until.pop(host, None)
+            return response
+        raise error
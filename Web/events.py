@@ -0,0 +1,104 @@
+import json
+import queue
+import threading
+
+# Maximum number of undelivered messages buffered per client
+STREAM_QUEUE_SIZE = 100
+# Seconds between keep-alive comments on idle streams
+STREAM_HEARTBEAT = 15
+
+
+def format_sse(event, data):
+    """Encode one Server-Sent Events message"""
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+def diff_state(previous, current):
+    """Diff two {id: item} maps into upserted items and removed ids"""
+    upsert = [item for key, item in current.items() if previous.get(key) != item]
+    remove = [key for key in previous if key not in current]
+    if not upsert and not remove:
+        return None
+    return {"upsert": upsert, "remove": remove}
+
+
+class Subscription:
+    def __init__(self, max_queue):
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.closed = False
+
+
+class EventBroker:
+    """Fan out pre-encoded SSE messages to every connected client.
+
+    Each message is serialized once in ``publish`` and the same string is
+    queued for all subscribers. Queues are bounded: a client that falls
+    ``max_queue`` messages behind is disconnected with a ``resync`` message
+    and rebuilds its state from a fresh snapshot when the browser reconnects.
+    """
+
+    def __init__(self, max_queue=STREAM_QUEUE_SIZE, heartbeat=STREAM_HEARTBEAT):
+        self.max_queue = max_queue
+        self.heartbeat = heartbeat
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        subscription = Subscription(self.max_queue)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscription.closed = True
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, event, data):
+        """Queue one event for every subscriber"""
+        message = format_sse(event, data)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(message)
+            except queue.Full:
+                self._evict(subscription)
+
+    def _evict(self, subscription):
+        self.unsubscribe(subscription)
+        # Drop the backlog so the client only holds the resync notice
+        while True:
+            try:
+                subscription.queue.get_nowait()
+            except queue.Empty:
+                break
+        try:
+            subscription.queue.put_nowait(format_sse("resync", {"reason": "lagging"}))
+        except queue.Full:
+            pass
+
+    def stream(self, subscription, initial=None):
+        """Generator yielding SSE messages for one client"""
+        try:
+            # Ask the browser to reconnect quickly after an eviction
+            yield "retry: 2000\n\n"
+            if initial is not None:
+                yield format_sse(*initial)
+            while True:
+                try:
+                    message = subscription.queue.get(timeout=self.heartbeat)
+                except queue.Empty:
+                    if subscription.closed:
+                        return
+                    yield ": keep-alive\n\n"
+                    continue
+                yield message
+                if subscription.closed and subscription.queue.empty():
+                    return
+        finally:
+            self.unsubscribe(subscription)
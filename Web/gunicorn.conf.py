@@ -0,0 +1,16 @@
+import os
+
+bind = os.getenv("WEB_BIND", "0.0.0.0:5000")
+# One process: the inventory, job queue, push broker and detector live in
+# memory and must be shared by every request
+workers = 1
+# Threads serve the requests; each open dashboard (/api/stream) or job log
+# stream holds one for as long as it is connected
+worker_class = "gthread"
+threads = int(os.getenv("WEB_THREADS", "64"))
+# Streams and long lifecycle calls are not worker timeouts
+timeout = 0
+graceful_timeout = 10
+keepalive = 5
+accesslog = os.getenv("WEB_ACCESS_LOG") or None
+errorlog = "-"
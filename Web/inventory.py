@@ -0,0 +1,335 @@
+import threading
+import time
+
+from lab_query import (
+    CLUSTER_LABEL,
+    CLUSTERS,
+    inspect_lab_container,
+    list_lab_containers,
+    summarize_container,
+)
+
+# Container event actions that can change what the dashboard shows
+CONTAINER_ACTIONS = {
+    "create",
+    "start",
+    "restart",
+    "die",
+    "stop",
+    "kill",
+    "pause",
+    "unpause",
+    "rename",
+    "update",
+    "destroy",
+}
+NETWORK_ACTIONS = {"create", "destroy", "connect", "disconnect"}
+
+
+class ContainerInventory:
+    """In-memory view of lab containers and networks kept current by Docker events.
+
+    State is loaded once with a label-filtered, sparse listing and then
+    patched from ``client.events()``: each event re-inspects only the
+    container or network it refers to. Lookups by id, name, cluster and network are dictionary
+    reads. If the event stream drops the inventory reconnects and performs a
+    full resync, replaying events from just before the resync started so
+    nothing that happened in between is lost.
+    """
+
+    def __init__(self, docker_client, retry_delay=2, max_retry_delay=30):
+        self.docker_client = docker_client
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.last_sync = None
+        self.version = 0
+
+        self._lock = threading.RLock()
+        self._containers = {}
+        self._by_name = {}
+        self._by_cluster = {cluster: set() for cluster in CLUSTERS}
+        self._by_network = {}
+        self._networks = {}
+        self._listeners = []
+        self._stream = None
+        self._thread = None
+        self._stopped = threading.Event()
+        self._synced = threading.Event()
+
+    # Lifecycle
+
+    def start(self):
+        """Start the background event consumer"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="container-inventory", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background event consumer"""
+        self._stopped.set()
+        stream = self._stream
+        if stream is not None:
+            try:
+                stream.close()
+            except Exception:
+                pass
+
+    def add_listener(self, callback):
+        """Register callback(kind, action, record) for inventory changes"""
+        self._listeners.append(callback)
+
+    def ensure_synced(self, timeout=5):
+        """Wait for the first sync, loading state inline if the consumer is slow"""
+        if self._synced.wait(timeout):
+            return
+        self.resync()
+
+    def _run(self):
+        delay = self.retry_delay
+        while not self._stopped.is_set():
+            try:
+                # Replay events from just before the listing so none are missed
+                since = int(time.time()) - 1
+                self.resync()
+                self._stream = self.docker_client.call(
+                    lambda client: client.events(
+                        since=since,
+                        decode=True,
+                        filters={"type": ["container", "network"]},
+                    )
+                )
+                delay = self.retry_delay
+                for event in self._stream:
+                    self._handle_event(event)
+                    if self._stopped.is_set():
+                        break
+                if not self._stopped.is_set():
+                    print("Docker event stream ended, resyncing inventory")
+            except Exception as e:
+                if self._stopped.is_set():
+                    break
+                print(f"Inventory event stream failed: {e}")
+                self._stopped.wait(delay)
+                delay = min(delay * 2, self.max_retry_delay)
+            finally:
+                stream, self._stream = self._stream, None
+                if stream is not None:
+                    try:
+                        stream.close()
+                    except Exception:
+                        pass
+
+    # Loading
+
+    def resync(self):
+        """Reload every lab container and network from the Docker API"""
+        containers, networks = self.docker_client.call(
+            lambda client: (
+                list_lab_containers(client),
+                client.networks.list(),
+            )
+        )
+        records = {}
+        for container in containers:
+            record = summarize_container(container.attrs)
+            if record:
+                records[record["id"]] = record
+
+        with self._lock:
+            removed = [cid for cid in self._containers if cid not in records]
+            self._networks = {
+                network.name: self._build_network(network) for network in networks
+            }
+            for cid in removed:
+                self._remove(cid)
+            for record in records.values():
+                self._upsert(record)
+            self.last_sync = time.time()
+            self.version += 1
+        self._synced.set()
+        self._notify("sync", "resync", None)
+
+    @staticmethod
+    def _build_network(network):
+        return {
+            "id": network.id[:12],
+            "name": network.name,
+            "driver": network.attrs.get("Driver"),
+        }
+
+    # Event handling
+
+    def _handle_event(self, event):
+        kind = event.get("Type")
+        action = (event.get("Action") or event.get("status") or "").split(":")[0]
+        actor = event.get("Actor", {})
+        if kind == "container" and action in CONTAINER_ACTIONS:
+            # Events carry container labels; skip unrelated containers cheaply
+            attributes = actor.get("Attributes", {})
+            if (
+                CLUSTER_LABEL not in attributes
+                and actor.get("ID") not in self._containers
+            ):
+                return
+            if action == "destroy":
+                self._apply_removal(actor.get("ID"))
+            else:
+                self._refresh_container(actor.get("ID"))
+        elif kind == "network" and action in NETWORK_ACTIONS:
+            if action in ("connect", "disconnect"):
+                container_id = actor.get("Attributes", {}).get("container")
+                if container_id in self._containers:
+                    self._refresh_container(container_id)
+            else:
+                self._refresh_network(actor.get("ID"), action)
+
+    def _refresh_container(self, container_id):
+        if not container_id:
+            return
+        record = self.docker_client.call(
+            lambda client: inspect_lab_container(client, container_id)
+        )
+        if record is None:
+            # Already gone (e.g. removed right after the event)
+            self._apply_removal(container_id)
+            return
+        with self._lock:
+            previous = self._containers.get(record["id"])
+            if previous == record:
+                return
+            self._upsert(record)
+            self.version += 1
+        self._notify("container", "update", record)
+
+    def _refresh_network(self, network_id, action):
+        if not network_id:
+            return
+        network = None
+        if action != "destroy":
+            try:
+                network = self.docker_client.call(
+                    lambda client: client.networks.get(network_id)
+                )
+            except Exception:
+                network = None
+        with self._lock:
+            if network is None:
+                names = [
+                    name
+                    for name, info in self._networks.items()
+                    if network_id.startswith(info["id"])
+                ]
+                for name in names:
+                    del self._networks[name]
+            else:
+                self._networks[network.name] = self._build_network(network)
+            self.version += 1
+        self._notify("network", action, None)
+
+    def _apply_removal(self, container_id):
+        if not container_id:
+            return
+        with self._lock:
+            record = self._containers.get(container_id)
+            if record is None:
+                return
+            self._remove(container_id)
+            self.version += 1
+        self._notify("container", "remove", record)
+
+    # Index maintenance (caller holds the lock)
+
+    def _upsert(self, record):
+        previous = self._containers.get(record["id"])
+        if previous:
+            self._unindex(previous)
+        self._containers[record["id"]] = record
+        self._by_name[record["name"]] = record["id"]
+        self._by_cluster.setdefault(record["cluster"], set()).add(record["id"])
+        for network_name in record["ip_addresses"]:
+            self._by_network.setdefault(network_name, set()).add(record["id"])
+
+    def _remove(self, container_id):
+        record = self._containers.pop(container_id)
+        self._unindex(record)
+
+    def _unindex(self, record):
+        if self._by_name.get(record["name"]) == record["id"]:
+            del self._by_name[record["name"]]
+        self._by_cluster.get(record["cluster"], set()).discard(record["id"])
+        for network_name in record["ip_addresses"]:
+            members = self._by_network.get(network_name)
+            if members is not None:
+                members.discard(record["id"])
+                if not members:
+                    del self._by_network[network_name]
+
+    def _notify(self, kind, action, record):
+        for callback in list(self._listeners):
+            try:
+                callback(kind, action, record)
+            except Exception as e:
+                print(f"Inventory listener failed: {e}")
+
+    # Queries
+
+    def containers(self):
+        """All lab containers"""
+        with self._lock:
+            return list(self._containers.values())
+
+    def get(self, name_or_id):
+        """Look up a lab container by name, full id or short id"""
+        with self._lock:
+            container_id = self._by_name.get(name_or_id, name_or_id)
+            record = self._containers.get(container_id)
+            if record is None and len(name_or_id) >= 12:
+                record = next(
+                    (
+                        r
+                        for r in self._containers.values()
+                        if r["id"].startswith(name_or_id)
+                    ),
+                    None,
+                )
+            return record
+
+    def by_cluster(self, cluster):
+        """Lab containers belonging to one cluster"""
+        with self._lock:
+            return [self._containers[cid] for cid in self._by_cluster.get(cluster, ())]
+
+    def by_network(self, network_name):
+        """Lab containers attached to one network"""
+        with self._lock:
+            return [
+                self._containers[cid] for cid in self._by_network.get(network_name, ())
+            ]
+
+    def networks(self):
+        """Networks that contain at least one lab container"""
+        with self._lock:
+            network_list = []
+            for network_name, members in self._by_network.items():
+                info = self._networks.get(network_name)
+                if info is None:
+                    continue
+                network_list.append(
+                    {
+                        **info,
+                        "containers": [
+                            {
+                                "id": self._containers[cid]["short_id"],
+                                "name": self._containers[cid]["name"],
+                                "status": self._containers[cid]["status"],
+                                "cluster": self._containers[cid]["cluster"],
+                            }
+                            for cid in members
+                        ],
+                    }
+                )
+            return network_list
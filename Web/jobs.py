@@ -0,0 +1,187 @@
+import subprocess
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Lines of command output kept per job
+JOB_OUTPUT_LINES = 2000
+# Finished jobs kept for /api/jobs lookups
+JOB_HISTORY = 100
+
+
+class JobError(Exception):
+    """A job failure carrying the structured error returned to clients"""
+
+    def __init__(self, code, message, details=""):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.details = details
+
+
+class Job:
+    def __init__(self, key, description):
+        self.id = uuid.uuid4().hex[:12]
+        self.key = key
+        self.description = description
+        self.status = "queued"
+        self.result = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self._output = deque(maxlen=JOB_OUTPUT_LINES)
+        # Number of lines ever written; output[i] has offset total - len + i
+        self._total_lines = 0
+        self._cond = threading.Condition()
+
+    @property
+    def done(self):
+        return self.status in ("succeeded", "failed")
+
+    def log(self, line):
+        """Append one line of progress output"""
+        with self._cond:
+            self._output.append(line.rstrip("\n"))
+            self._total_lines += 1
+            self._cond.notify_all()
+
+    def _finish(self, status, result):
+        with self._cond:
+            self.status = status
+            self.result = result
+            self.finished = time.time()
+            self._cond.notify_all()
+
+    def output_since(self, offset):
+        """Return (lines, next_offset) for output written after offset"""
+        with self._cond:
+            first = self._total_lines - len(self._output)
+            start = max(offset, first) - first
+            return list(self._output)[start:], self._total_lines
+
+    def wait_output(self, offset, timeout):
+        """Block until output after offset exists or the job finishes"""
+        with self._cond:
+            self._cond.wait_for(
+                lambda: self._total_lines > offset or self.done, timeout=timeout
+            )
+        return self.output_since(offset)
+
+    def to_dict(self, since=None):
+        data = {
+            "id": self.id,
+            "key": self.key,
+            "description": self.description,
+            "status": self.status,
+            "result": self.result,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+        if since is not None:
+            data["output"], data["next_offset"] = self.output_since(since)
+        return data
+
+
+class JobManager:
+    """Run lab lifecycle operations in the background.
+
+    ``submit`` returns immediately with a Job. Submissions with the same key
+    while a job for that key is queued or running are coalesced onto the
+    in-flight job, so two users pressing "Start ELK" trigger one compose run.
+    """
+
+    def __init__(self, max_workers=1, history=JOB_HISTORY):
+        self.history = history
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="lab-job"
+        )
+        self._jobs = OrderedDict()
+        self._active = {}
+        self._lock = threading.Lock()
+
+    def submit(self, key, description, func, *args, **kwargs):
+        """Queue func(job, *args, **kwargs); return (job, created)"""
+        with self._lock:
+            active = self._active.get(key)
+            if active is not None and not active.done:
+                return active, False
+            job = Job(key, description)
+            self._jobs[job.id] = job
+            self._active[key] = job
+            while len(self._jobs) > self.history:
+                oldest_id, oldest = next(iter(self._jobs.items()))
+                if not oldest.done:
+                    break
+                del self._jobs[oldest_id]
+        self._executor.submit(self._run, job, func, args, kwargs)
+        return job, True
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def _run(self, job, func, args, kwargs):
+        job.status = "running"
+        job.started = time.time()
+        job.log(f"[*] {job.description}")
+        try:
+            result = func(job, *args, **kwargs)
+            job._finish("succeeded", result)
+        except JobError as e:
+            job.log(f"[!] {e.message}: {e.details}")
+            job._finish("failed", error_result(e.code, e.message, e.details))
+        except subprocess.CalledProcessError as e:
+            job.log(f"[!] Command failed: {e}")
+            job._finish(
+                "failed",
+                error_result(
+                    "DOCKER_COMPOSE_FAILED",
+                    "Docker Compose command failed",
+                    str(e),
+                ),
+            )
+        except Exception as e:
+            job.log(f"[!] Unexpected error: {e}")
+            job._finish(
+                "failed",
+                error_result("UNKNOWN_ERROR", "An unexpected error occurred", str(e)),
+            )
+        finally:
+            with self._lock:
+                if self._active.get(job.key) is job:
+                    del self._active[job.key]
+
+
+def error_result(code, message, details=""):
+    """Error payload understood by both old and new dashboard handlers"""
+    return {
+        "status": "error",
+        "message": message,
+        "error": {"code": code, "message": message, "details": details},
+    }
+
+
+def run_command(job, cmd, cwd=None, env=None):
+    """Run a command, streaming its combined output into the job log"""
+    job.log(f"$ {' '.join(cmd)}")
+    process = subprocess.Popen(
+        cmd,
+        cwd=cwd,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        bufsize=1,
+    )
+    for line in process.stdout:
+        job.log(line)
+    returncode = process.wait()
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd)
@@ -0,0 +1,92 @@
+from docker.errors import NotFound
+
+# Labels set on lab containers by the compose files and Machines/make.py
+CLUSTER_LABEL = "lnadlse.cluster"
+ROLE_LABEL = "lnadlse.role"
+TENANT_LABEL = "lnadlse.tenant"
+# "lab" holds the per-tenant labs created by 'Machines/make.py lab create'
+CLUSTERS = ("elk", "simulation", "lab")
+
+
+def lab_filters(cluster=None, status=None, network=None, role=None):
+    """Docker API filters selecting lab containers"""
+    labels = [f"{CLUSTER_LABEL}={cluster}" if cluster else CLUSTER_LABEL]
+    if role:
+        labels.append(f"{ROLE_LABEL}={role}")
+    filters = {"label": labels}
+    if status:
+        filters["status"] = status
+    if network:
+        filters["network"] = network
+    return filters
+
+
+def list_lab_containers(
+    client, cluster=None, status=None, network=None, role=None, sparse=True
+):
+    """List lab containers, filtered by the daemon.
+
+    With ``sparse`` (the default) the result comes from a single list call
+    and no container is inspected; use ``summarize_container`` or
+    ``container_name`` rather than model properties that need full attrs.
+    """
+    return client.containers.list(
+        all=True,
+        filters=lab_filters(cluster, status, network, role),
+        sparse=sparse,
+    )
+
+
+def container_name(container):
+    """Name of a container model, sparse or not"""
+    if container.attrs.get("Names"):
+        return container.attrs["Names"][0].lstrip("/")
+    return container.name
+
+
+def summarize_container(attrs):
+    """Normalize list or inspect attrs into a lab container record.
+
+    Returns None for containers without a lab cluster label.
+    """
+    if "Names" in attrs:
+        # Container list format
+        name = attrs["Names"][0].lstrip("/")
+        labels = attrs.get("Labels") or {}
+        status = attrs.get("State")
+        image = attrs.get("Image")
+    else:
+        # Container inspect format
+        name = attrs["Name"].lstrip("/")
+        labels = attrs.get("Config", {}).get("Labels") or {}
+        status = attrs.get("State", {}).get("Status")
+        image = attrs.get("Config", {}).get("Image")
+
+    cluster = labels.get(CLUSTER_LABEL)
+    if cluster not in CLUSTERS:
+        return None
+
+    networks = (attrs.get("NetworkSettings") or {}).get("Networks") or {}
+    return {
+        "id": attrs["Id"],
+        "short_id": attrs["Id"][:12],
+        "name": name,
+        "status": status,
+        "image": image,
+        "cluster": cluster,
+        "role": labels.get(ROLE_LABEL),
+        "tenant": labels.get(TENANT_LABEL),
+        "ip_addresses": {
+            network_name: network_info.get("IPAddress") or "N/A"
+            for network_name, network_info in networks.items()
+        },
+        "labels": labels,
+    }
+
+
+def inspect_lab_container(client, container_id):
+    """Inspect one container; None if it is gone or not a lab container"""
+    try:
+        return summarize_container(client.api.inspect_container(container_id))
+    except NotFound:
+        return None
@@ -0,0 +1,319 @@
+import os
+import threading
+import time
+
+# Seconds an aggregation result is shared by every viewer of a panel
+METRICS_CACHE_TTL = float(os.getenv("METRICS_CACHE_TTL", "10"))
+# Entries kept before expired ones are swept
+METRICS_CACHE_SIZE = int(os.getenv("METRICS_CACHE_SIZE", "256"))
+
+FILEBEAT_INDEX = "filebeat-*"
+PACKETBEAT_INDEX = "packetbeat-*"
+
+# Time windows the dashboard may ask for, in seconds
+WINDOWS = {"5m": 300, "15m": 900, "1h": 3600, "6h": 21600, "24h": 86400}
+# Histogram buckets per window
+HISTOGRAM_BUCKETS = 60
+TOP_CLIENTS = 10
+
+
+class MetricsError(Exception):
+    """Elasticsearch rejected or failed an aggregation"""
+
+
+class TtlCache:
+    """Cache results for ``ttl`` seconds with one computation per key.
+
+    The first caller for a key runs the query; callers arriving while it is
+    in flight wait for that result instead of issuing their own request.
+    Failures are handed to the waiting callers but not cached.
+    """
+
+    def __init__(self, ttl=METRICS_CACHE_TTL, max_entries=METRICS_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, compute):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.monotonic():
+                return entry[1]
+            waiter = self._inflight.get(key)
+            if waiter is None:
+                waiter = self._inflight[key] = {"done": threading.Event()}
+                owner = True
+            else:
+                owner = False
+
+        if not owner:
+            waiter["done"].wait()
+            if "error" in waiter:
+                raise waiter["error"]
+            return waiter["value"]
+
+        try:
+            waiter["value"] = compute()
+        except Exception as e:
+            waiter["error"] = e
+            raise
+        else:
+            with self._lock:
+                if len(self._entries) >= self.max_entries:
+                    self._sweep()
+                self._entries[key] = (time.monotonic() + self.ttl, waiter["value"])
+            return waiter["value"]
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            waiter["done"].set()
+
+    def _sweep(self):
+        now = time.monotonic()
+        for key in [k for k, (expires, _) in self._entries.items() if expires <= now]:
+            del self._entries[key]
+        while len(self._entries) >= self.max_entries:
+            self._entries.pop(next(iter(self._entries)))
+
+
+def target_filter(target, window_end, window):
+    return {
+        "bool": {
+            "filter": [
+                {"term": {"host.name": target}},
+                {
+                    "range": {
+                        "@timestamp": {
+                            "gte": (window_end - window) * 1000,
+                            "lt": window_end * 1000,
+                            "format": "epoch_millis",
+                        }
+                    }
+                },
+            ]
+        }
+    }
+
+
+class AttackMetrics:
+    """Per-target request and traffic aggregations for the dashboard.
+
+    Queries go through the shared ``EsNodePool``. The end of each window is
+    rounded down to the cache TTL, so every viewer of a panel within one
+    bucket sends the same query and shares the cached answer.
+    """
+
+    PANELS = ("requests", "status", "clients", "network")
+
+    def __init__(self, es_pool, cache=None):
+        self.es_pool = es_pool
+        self.cache = cache or TtlCache()
+
+    def panel(self, name, target, window="15m"):
+        seconds = WINDOWS[window]
+        bucket = int(self.cache.ttl) or 1
+        window_end = int(time.time()) // bucket * bucket + bucket
+        key = (name, target, window, window_end)
+        return self.cache.get(
+            key, lambda: getattr(self, f"_{name}")(target, window_end, seconds)
+        )
+
+    def summary(self, target, window="15m"):
+        return {name: self.panel(name, target, window) for name in self.PANELS}
+
+    def _search(self, index, body):
+        """Run one search and return the decoded response.
+
+        Before any beat has shipped there is no index yet and the response
+        has no ``aggregations``; panels read them through ``aggregation()``
+        and come back empty instead of failing.
+        """
+        try:
+            response = self.es_pool.request(
+                "POST",
+                f"/{index}/_search",
+                params={"ignore_unavailable": "true", "allow_no_indices": "true"},
+                json=body,
+            )
+        except OSError as e:
+            raise MetricsError(f"Elasticsearch unreachable: {e}") from e
+        if response.status_code != 200:
+            raise MetricsError(
+                f"Elasticsearch returned {response.status_code}: {response.text[:500]}"
+            )
+        return response.json()
+
+    @staticmethod
+    def aggregation(result, name):
+        return (result.get("aggregations") or {}).get(name) or {}
+
+    @staticmethod
+    def _interval(seconds):
+        return f"{max(1, seconds // HISTOGRAM_BUCKETS)}s"
+
+    def _requests(self, target, window_end, seconds):
+        """Requests per histogram bucket, split into 4xx and 5xx"""
+        result = self._search(
+            FILEBEAT_INDEX,
+            {
+                "size": 0,
+                "track_total_hits": True,
+                "query": target_filter(target, window_end, seconds),
+                "aggs": {
+                    "over_time": {
+                        "date_histogram": {
+                            "field": "@timestamp",
+                            "fixed_interval": self._interval(seconds),
+                            "min_doc_count": 0,
+                            "extended_bounds": {
+                                "min": (window_end - seconds) * 1000,
+                                "max": window_end * 1000 - 1,
+                            },
+                        },
+                        "aggs": {
+                            "errors": {
+                                "range": {
+                                    "field": "http.response.status_code",
+                                    "keyed": True,
+                                    "ranges": [
+                                        {"key": "4xx", "from": 400, "to": 500},
+                                        {"key": "5xx", "from": 500, "to": 600},
+                                    ],
+                                }
+                            }
+                        },
+                    }
+                },
+            },
+        )
+        interval = max(1, seconds // HISTOGRAM_BUCKETS)
+        return {
+            "window_end": window_end,
+            "interval": interval,
+            "total": result.get("hits", {}).get("total", {}).get("value", 0),
+            "buckets": [
+                {
+                    "time": bucket["key"] // 1000,
+                    "count": bucket["doc_count"],
+                    "rate": round(bucket["doc_count"] / interval, 2),
+                    "4xx": bucket["errors"]["buckets"]["4xx"]["doc_count"],
+                    "5xx": bucket["errors"]["buckets"]["5xx"]["doc_count"],
+                }
+                for bucket in self.aggregation(result, "over_time").get("buckets", [])
+            ],
+        }
+
+    def _status(self, target, window_end, seconds):
+        """Response counts per status code (composite, paged) and error ratios"""
+        query = target_filter(target, window_end, seconds)
+        codes = {}
+        after = None
+        while True:
+            composite = {
+                "size": 100,
+                "sources": [
+                    {"code": {"terms": {"field": "http.response.status_code"}}}
+                ],
+            }
+            if after:
+                composite["after"] = after
+            result = self._search(
+                FILEBEAT_INDEX,
+                {"size": 0, "query": query, "aggs": {"codes": {"composite": composite}}},
+            )
+            aggregation = self.aggregation(result, "codes")
+            buckets = aggregation.get("buckets", [])
+            for bucket in buckets:
+                codes[str(bucket["key"]["code"])] = bucket["doc_count"]
+            after = aggregation.get("after_key")
+            if not after or not buckets:
+                break
+        total = sum(codes.values())
+
+        def ratio(prefix):
+            count = sum(n for code, n in codes.items() if code.startswith(prefix))
+            return round(count / total, 4) if total else 0.0
+
+        return {
+            "window_end": window_end,
+            "total": total,
+            "codes": codes,
+            "ratio_4xx": ratio("4"),
+            "ratio_5xx": ratio("5"),
+        }
+
+    def _clients(self, target, window_end, seconds):
+        """Busiest client IPs"""
+        result = self._search(
+            FILEBEAT_INDEX,
+            {
+                "size": 0,
+                "query": target_filter(target, window_end, seconds),
+                "aggs": {
+                    "clients": {
+                        "terms": {"field": "source.address", "size": TOP_CLIENTS},
+                        "aggs": {
+                            "errors": {
+                                "range": {
+                                    "field": "http.response.status_code",
+                                    "ranges": [{"from": 400}],
+                                }
+                            }
+                        },
+                    }
+                },
+            },
+        )
+        return {
+            "window_end": window_end,
+            "clients": [
+                {
+                    "ip": bucket["key"],
+                    "requests": bucket["doc_count"],
+                    "errors": bucket["errors"]["buckets"][0]["doc_count"],
+                }
+                for bucket in self.aggregation(result, "clients").get("buckets", [])
+            ],
+        }
+
+    def _network(self, target, window_end, seconds):
+        """Packetbeat flows and bytes per histogram bucket"""
+        result = self._search(
+            PACKETBEAT_INDEX,
+            {
+                "size": 0,
+                "query": target_filter(target, window_end, seconds),
+                "aggs": {
+                    "over_time": {
+                        "date_histogram": {
+                            "field": "@timestamp",
+                            "fixed_interval": self._interval(seconds),
+                            "min_doc_count": 0,
+                            "extended_bounds": {
+                                "min": (window_end - seconds) * 1000,
+                                "max": window_end * 1000 - 1,
+                            },
+                        },
+                        "aggs": {
+                            "bytes": {"sum": {"field": "network.bytes"}},
+                            "sources": {"cardinality": {"field": "source.ip"}},
+                        },
+                    }
+                },
+            },
+        )
+        return {
+            "window_end": window_end,
+            "interval": max(1, seconds // HISTOGRAM_BUCKETS),
+            "buckets": [
+                {
+                    "time": bucket["key"] // 1000,
+                    "events": bucket["doc_count"],
+                    "bytes": int(bucket["bytes"]["value"] or 0),
+                    "sources": bucket["sources"]["value"],
+                }
+                for bucket in self.aggregation(result, "over_time").get("buckets", [])
+            ],
+        }
@@ -0,0 +1,115 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from lab_query import container_name
+
+# Grace period (seconds) a container gets between SIGTERM and SIGKILL
+TEARDOWN_STOP_TIMEOUT = int(os.getenv("TEARDOWN_STOP_TIMEOUT", "5"))
+# Upper bound (seconds) for tearing down the whole set
+TEARDOWN_DEADLINE = float(os.getenv("TEARDOWN_DEADLINE", "30"))
+# Containers stopped at the same time
+TEARDOWN_WORKERS = int(os.getenv("TEARDOWN_WORKERS", "8"))
+# Seconds the force-removals after the deadline may take before giving up
+TEARDOWN_KILL_TIMEOUT = float(os.getenv("TEARDOWN_KILL_TIMEOUT", "10"))
+
+
+def _teardown_one(container, stop_timeout):
+    started = time.monotonic()
+    entry = {"id": container.id[:12], "name": container_name(container)}
+    try:
+        try:
+            container.stop(timeout=stop_timeout)
+            entry["result"] = "stopped"
+        except Exception as e:
+            # Daemon did not confirm the stop in time; kill it outright
+            entry["stop_error"] = str(e)
+            entry["result"] = "killed"
+        container.remove(force=True)
+        entry["removed"] = True
+    except Exception as e:
+        entry["result"] = "failed"
+        entry["removed"] = False
+        entry["error"] = str(e)
+    entry["elapsed"] = round(time.monotonic() - started, 2)
+    return entry
+
+
+def _force_remove(container):
+    entry = {"id": container.id[:12], "name": container_name(container)}
+    try:
+        container.remove(force=True)
+        entry.update(result="killed", removed=True, error="deadline exceeded")
+    except Exception as e:
+        entry.update(result="failed", removed=False, error=str(e))
+    return entry
+
+
+def teardown_containers(
+    containers,
+    stop_timeout=TEARDOWN_STOP_TIMEOUT,
+    deadline=TEARDOWN_DEADLINE,
+    workers=TEARDOWN_WORKERS,
+    kill_timeout=TEARDOWN_KILL_TIMEOUT,
+    log=print,
+):
+    """Stop and remove containers concurrently; return one report entry each.
+
+    Every container gets ``stop_timeout`` seconds to exit before the daemon
+    kills it. Containers still pending when ``deadline`` expires are
+    force-removed (SIGKILL) in parallel and reported as ``killed``; those
+    the daemon does not remove within ``kill_timeout`` either are reported
+    as ``failed`` rather than waited for, so the call returns within about
+    ``deadline + kill_timeout`` seconds.
+    """
+    if not containers:
+        return []
+    started = time.monotonic()
+    pool = ThreadPoolExecutor(
+        max_workers=max(1, min(workers, len(containers))),
+        thread_name_prefix="teardown",
+    )
+    futures = {
+        pool.submit(_teardown_one, container, stop_timeout): container
+        for container in containers
+    }
+    done, pending = wait(futures, timeout=deadline)
+    # Do not wait for workers stuck on an unresponsive daemon call
+    pool.shutdown(wait=False, cancel_futures=True)
+
+    report = [future.result() for future in done]
+    if pending:
+        # Fresh workers: the stop pool's threads may be stuck on the daemon
+        kill_pool = ThreadPoolExecutor(
+            max_workers=max(1, min(workers, len(pending))),
+            thread_name_prefix="teardown-kill",
+        )
+        kills = {
+            kill_pool.submit(_force_remove, futures[future]): futures[future]
+            for future in pending
+        }
+        killed, stuck = wait(kills, timeout=kill_timeout)
+        kill_pool.shutdown(wait=False, cancel_futures=True)
+        for future in killed:
+            entry = future.result()
+            entry["elapsed"] = round(time.monotonic() - started, 2)
+            report.append(entry)
+        for future in stuck:
+            container = kills[future]
+            report.append(
+                {
+                    "id": container.id[:12],
+                    "name": container_name(container),
+                    "result": "failed",
+                    "removed": False,
+                    "error": f"not removed within {deadline + kill_timeout:g}s",
+                    "elapsed": round(time.monotonic() - started, 2),
+                }
+            )
+
+    for entry in report:
+        if entry["result"] == "failed":
+            log(f"Error stopping container {entry['name']}: {entry['error']}")
+        else:
+            log(f"Container {entry['name']} {entry['result']} ({entry['elapsed']}s)")
+    return sorted(report, key=lambda entry: entry["name"])